@@ -5,6 +5,8 @@ from collections import deque
 from typing import Dict, Union, Tuple, Optional, Callable
 
 from base58 import b58decode, b58encode
+from common.serializers.serialization import proof_nodes_serializer, \
+    state_roots_serializer
 from plenum import config
 
 from plenum.client.client import Client as PlenumClient
@@ -13,17 +15,21 @@ from stp_core.common.log import getlogger
 from plenum.common.startable import Status
 
 from plenum.common.constants import REPLY, NAME, VERSION, REQACK, REQNACK, \
-    TXN_ID, TARGET_NYM, NONCE, STEWARD, OP_FIELD_NAME, REJECT, TYPE
+    TXN_ID, TARGET_NYM, NONCE, STEWARD, OP_FIELD_NAME, REJECT, TYPE, \
+    STATE_PROOF, ROOT_HASH, PROOF_NODES
 from plenum.common.types import f
 from plenum.common.util import libnacl
 from plenum.server.router import Router
 from stp_core.network.auth_mode import AuthMode
 from stp_raet.rstack import SimpleRStack
 from stp_zmq.simple_zstack import SimpleZStack
+from state.pruning_state import PruningState
 
 from indy_common.constants import TXN_TYPE, ATTRIB, DATA, GET_NYM, ROLE, \
     NYM, GET_TXNS, LAST_TXN, TXNS, SCHEMA, CLAIM_DEF, SKEY, DISCLO, \
-    GET_ATTR, TRUST_ANCHOR, GET_CLAIM_DEF, GET_SCHEMA, SIGNATURE_TYPE, REF
+    GET_ATTR, TRUST_ANCHOR, GET_CLAIM_DEF, GET_SCHEMA, SIGNATURE_TYPE, REF, \
+    GET_NYMS, GET_ATTRS, GET_SCHEMAS, GET_CLAIM_DEFS, STATE_VALUE, DESTS, \
+    ATTRS, RAW, ENC, HASH
 
 from indy_client.persistence.client_req_rep_store_file import ClientReqRepStoreFile
 from indy_client.persistence.client_txn_log import ClientTxnLog
@@ -136,18 +142,92 @@ class Client(PlenumClient):
     def hasConsensus(self, identifier: str, reqId: int) -> Optional[str]:
         return super().hasConsensus(identifier, reqId)
 
-    def prepare_for_state(self, result):
+    def validate_proof(self, result):
+        """
+        Validates state proof, batched reads carry one proof covering
+        every requested key. Domain state values can be encoded either as
+        JSON or in the binary format depending on the pool's settings and
+        the seq no of the txn, so a value is accepted if it is proven in
+        any of them
+        """
+        request_type = result[TYPE]
+        state_root_hash = state_roots_serializer.deserialize(
+            result[STATE_PROOF][ROOT_HASH])
+        proof_nodes = result[STATE_PROOF][PROOF_NODES]
+        if isinstance(proof_nodes, str):
+            proof_nodes = proof_nodes.encode()
+        proof_nodes = proof_nodes_serializer.deserialize(proof_nodes)
+        if request_type in (GET_NYMS, GET_ATTRS) and \
+                not self.has_every_requested_key(result):
+            return False
+        if request_type == GET_NYMS:
+            candidates = [[pair] for pair in
+                          domain.prepare_get_nyms_for_state(result)]
+        elif request_type == GET_ATTRS:
+            candidates = zip(
+                domain.prepare_get_attrs_for_state(result),
+                domain.prepare_get_attrs_for_state(result,
+                                                   binary_since_seq_no=0))
+        elif request_type == GET_SCHEMAS:
+            candidates = zip(
+                domain.prepare_get_schemas_for_state(result),
+                domain.prepare_get_schemas_for_state(result,
+                                                     binary_since_seq_no=0))
+        elif request_type == GET_CLAIM_DEFS:
+            candidates = zip(
+                domain.prepare_get_claim_defs_for_state(result),
+                domain.prepare_get_claim_defs_for_state(
+                    result, binary_since_seq_no=0))
+        elif result.get(STATE_VALUE) is not None:
+            # The value is passed as stored, only the path is made here
+            path, _ = self.prepare_for_state(result)
+            candidates = [[(path,
+                            domain.state_value_from_reply(result[STATE_VALUE]))]]
+        else:
+            candidates = [(self.prepare_for_state(result),
+                           self.prepare_for_state(result, binary=True))]
+        return all(any(PruningState.verify_state_proof(state_root_hash,
+                                                       key,
+                                                       value,
+                                                       proof_nodes,
+                                                       serialized=True)
+                       for key, value in pairs)
+                   for pairs in candidates)
+
+    @staticmethod
+    def has_every_requested_key(result):
+        """
+        Checks that a GET_NYMS or GET_ATTRS result has exactly one item for
+        every requested key, the proof is checked only for returned items
+        """
+        def attr_key(item):
+            attr_type = RAW if RAW in item else ENC if ENC in item else HASH
+            return item[TARGET_NYM], attr_type, item.get(attr_type)
+
+        items = result.get(DATA) or []
+        if result[TYPE] == GET_NYMS:
+            requested = result.get(DESTS) or []
+            returned = [item[TARGET_NYM] for item in items]
+        else:
+            requested = [attr_key(item) for item in result.get(ATTRS) or []]
+            returned = [attr_key(item) for item in items]
+        return sorted(requested) == sorted(returned)
+
+    def prepare_for_state(self, result, binary=False):
         request_type = result[TYPE]
+        binary_since_seq_no = 0 if binary else None
         if request_type == GET_NYM:
             return domain.prepare_get_nym_for_state(result)
         if request_type == GET_ATTR:
             path, value, hashed_value, value_bytes = \
-                domain.prepare_get_attr_for_state(result)
+                domain.prepare_get_attr_for_state(result, binary_since_seq_no)
             return path, value_bytes
         if request_type == GET_CLAIM_DEF:
-            return domain.prepare_get_claim_def_for_state(result)
+            return domain.prepare_get_claim_def_for_state(result,
+                                                          binary_since_seq_no)
         if request_type == GET_SCHEMA:
-            return domain.prepare_get_schema_for_state(result)
+            return domain.prepare_get_schema_for_state(result,
+                                                       binary_since_seq_no)
         raise ValueError("Cannot make state key for "
                          "request of type {}"
                          .format(request_type))
@@ -81,32 +81,115 @@ class Authoriser:
 
         return True
 
+    # Decision table compiled from the rules of `ruleSource`, see `compile`
+    _decisions = None
+
+    @staticmethod
+    def ruleSource():
+        """
+        Rules to compile into the decision table as pairs of
+        ((typ, field, oldVal, newVal), {role: details}), by default the
+        ones of `AuthMap`. Can be replaced to take rules from elsewhere,
+        `compile` has to be called after that.
+        """
+        return authMapRules(Authoriser.AuthMap)
+
+    @staticmethod
+    def compile():
+        """
+        Compiles the rules into a decision table keyed by (typ, field).
+        Each entry has the decisions of the rules for exact values keyed by
+        (oldVal, newVal) and the decision of the rule for any values, a
+        decision is the access of each allowed role. Done on the first
+        authorisation, has to be called again if the rules are changed
+        after it.
+        """
+        decisions = {}
+        for (typ, field, oldVal, newVal), roles in Authoriser.ruleSource():
+            exact, anyValues = decisions.get((typ, field), ({}, None))
+            decision = {role: _access(details)
+                        for role, details in roles.items()}
+            if oldVal == ANY_VALUE and newVal == ANY_VALUE:
+                anyValues = decision
+            else:
+                exact[(oldVal, newVal)] = decision
+            decisions[(typ, field)] = exact, anyValues
+        Authoriser._decisions = decisions
+        return decisions
+
     @staticmethod
     def authorised(typ, field, actorRole, oldVal=None, newVal=None,
                    isActorOwnerOfSubject=None) -> (bool, str):
-        oldVal = '' if oldVal is None else \
-            str(oldVal).replace('"', '').replace("'", '')
-        newVal = '' if newVal is None else \
-            str(newVal).replace('"', '').replace("'", '')
-        key = '_'.join([typ, field, oldVal, newVal])
-        if key not in Authoriser.AuthMap:
-            anyKey = '_'.join([typ, field, '<any>', '<any>'])
-            if anyKey not in Authoriser.AuthMap:
-                msg = "key '{}' not found in authorized map". \
-                    format(key)
-                logger.debug(msg)
-                return False, msg
-            else:
-                key = anyKey
-        roles = Authoriser.AuthMap[key]
-        if actorRole not in roles:
-            roles_as_str = [Roles.nameFromValue(role) for role in roles.keys()]
+        decisions = Authoriser._decisions or Authoriser.compile()
+        exact, decision = decisions.get((typ, field), (None, None))
+        # Values are only looked at if there are rules for exact values
+        if exact:
+            # Most values are strings without quotes and need no normalising
+            if oldVal is None:
+                oldVal = ''
+            elif type(oldVal) is not str or '"' in oldVal or "'" in oldVal:
+                oldVal = normaliseAuthValue(oldVal)
+            if newVal is None:
+                newVal = ''
+            elif type(newVal) is not str or '"' in newVal or "'" in newVal:
+                newVal = normaliseAuthValue(newVal)
+            decision = exact.get((oldVal, newVal), decision)
+        if decision is None:
+            msg = "key '{}' not found in authorized map". \
+                format('_'.join([typ, field, normaliseAuthValue(oldVal),
+                                 normaliseAuthValue(newVal)]))
+            logger.debug(msg)
+            return False, msg
+        access = decision.get(actorRole)
+        if access is _ALLOWED:
+            return True, ''
+        if access is None:
+            roles_as_str = [Roles.nameFromValue(role)
+                            for role in decision.keys()]
             return False, '{} not in allowed roles {}'.\
                 format(Roles.nameFromValue(actorRole), roles_as_str)
-        roleDetails = roles[actorRole]
-        if len(roleDetails) == 0:
-            return True, ''
-        else:
-            r = OWNER in roleDetails and isActorOwnerOfSubject
-            msg = '' if r else 'Only owner is allowed'
-            return r, msg
+        r = access is _OWNER_ONLY and isActorOwnerOfSubject
+        msg = '' if r else 'Only owner is allowed'
+        return r, msg
+
+
+ANY_VALUE = '<any>'
+
+# Access of a role allowed by a rule
+_ALLOWED = 'allowed'
+_OWNER_ONLY = 'owner only'
+_DENIED = 'denied'
+
+
+def _access(details):
+    if not details:
+        return _ALLOWED
+    return _OWNER_ONLY if OWNER in details else _DENIED
+
+
+def normaliseAuthValue(value) -> str:
+    """
+    Value of a field as it is matched against the rules, quotes are
+    dropped so that lists of strings look the same however serialised
+    """
+    if value is None:
+        return ''
+    if type(value) is list:
+        # Lists of services are usually empty or have one plain name, their
+        # str() is known without making it
+        if not value:
+            return '[]'
+        if len(value) == 1 and type(value[0]) is str and value[0].isalnum():
+            return '[{}]'.format(value[0])
+    return str(value).replace('"', '').replace("'", '')
+
+
+def authMapRules(authMap):
+    """
+    Rules of a map keyed by 'typ_field_oldVal_newVal' strings, fields may
+    have underscores, types and values do not
+    """
+    for key, roles in authMap.items():
+        typ, rest = key.split('_', 1)
+        field, oldVal, newVal = rest.rsplit('_', 2)
+        yield (typ, field, oldVal, newVal), roles
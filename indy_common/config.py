@@ -47,10 +47,73 @@ primaryStorage = None
 configStateStorage = KeyValueStorageType.Leveldb
 idrCacheStorage = KeyValueStorageType.Leveldb
 attrStorage = KeyValueStorageType.Leveldb
+authorIndexStorage = KeyValueStorageType.Leveldb
+stateRootIndexStorage = KeyValueStorageType.Leveldb
 
 configStateDbName = 'config_state'
 attrDbName = 'attr_db'
 idrCacheDbName = 'idr_cache_db'
+authorIndexDbName = 'author_index_db'
+stateRootIndexDbName = 'state_root_index_db'
+
+# Max number of already decoded records kept in memory by IdrCache,
+# for each of committed and uncommitted views
+idrCacheLruSize = 10000
+
+# Max total size in bytes of the state proofs cached for GET_* replies
+stateProofCacheMaxBytes = 16 * 1024 * 1024
+
+# Max total size in bytes of the encoded values of SCHEMAs and CLAIM_DEFs
+# kept decoded for GET_* replies
+stateValueCacheMaxBytes = 16 * 1024 * 1024
+
+# RAW and ENC attribute values of this size in bytes and larger are stored
+# compressed in attr_db, None disables compression
+attrCompressionThreshold = 1024
+# Max number of attribute values kept in memory after being read
+attrCacheSize = 1000
+
+# Number of threads verifying signatures of the client requests received in
+# one pass over the client stack, 0 verifies them one by one as they are
+# received
+clientSigVerificationWorkers = 4
+
+# Number of domain txns received in catchup applied to the state and the
+# domain stores at once, the state is committed and the stores are written
+# once per chunk. 0 applies and commits every txn separately
+catchupStateApplyChunkSize = 1000
+
+# Number of threads opening the node's key-value stores which do not depend
+# on each other on start, while its ledgers are opened, 0 opens them one by
+# one as they are needed
+storeOpeningWorkers = 4
+
+# Admission of read requests: each client DID and each client connection has
+# a bucket of tokens refilled at the rate (per second) up to the burst, a read
+# takes a token from both. Reads finding no tokens wait in a queue of their
+# connection and DID and are served as tokens are refilled, queues taking
+# turns. Reads beyond the number of queued reads per connection are rejected.
+readAdmissionEnabled = False
+clientReadRate = 100
+clientReadBurst = 500
+connectionReadRate = 200
+connectionReadBurst = 1000
+maxQueuedReadsPerConnection = 1000
+
+# Read replica: when the feed is enabled the node appends every committed
+# domain batch to `readReplicaFeedFile` in its data directory, a read replica
+# process follows it keeping its own stores in `readReplicaDirName`
+readReplicaFeedEnabled = False
+readReplicaFeedFile = 'read_replica_feed'
+readReplicaDirName = 'read_replica'
+# Number of ledger txns per feed record when the feed is created for a node
+# which already has a ledger
+readReplicaBootstrapChunkSize = 1000
+# Size in bytes after which the feed continues in a new segment, segments
+# the replica has applied are removed by the node
+readReplicaFeedSegmentSize = 16 * 1024 * 1024
+# Max number of feed records applied by the replica per looper iteration
+readReplicaFollowBatch = 100
 
 RAETLogLevel = "concise"
 RAETLogLevelCli = "mute"
@@ -41,6 +41,15 @@ REVOCATION = "revocation"
 
 WRITES = "writes"
 
+DESTS = "dests"
+ATTRS = "attrs"
+FROM = "from"
+LIMIT = "limit"
+NEXT = "next"
+PASS_STATE_VALUE = "passStateValue"
+STATE_VALUE = "stateValue"
+TIMESTAMP = "timestamp"
+
 allOpKeys = (
     TXN_TYPE,
     TARGET_NYM,
@@ -66,7 +75,13 @@ allOpKeys = (
     SIGNATURE_TYPE,
     FORCE,
     WRITES,
-    REINSTALL)
+    REINSTALL,
+    DESTS,
+    ATTRS,
+    FROM,
+    LIMIT,
+    PASS_STATE_VALUE,
+    TIMESTAMP)
 
 reqOpKeys = (TXN_TYPE,)
 
@@ -89,6 +104,10 @@ GET_NYM = IndyTransactions.GET_NYM.value
 GET_TXNS = IndyTransactions.GET_TXNS.value
 GET_SCHEMA = IndyTransactions.GET_SCHEMA.value
 GET_CLAIM_DEF = IndyTransactions.GET_CLAIM_DEF.value
+GET_NYMS = IndyTransactions.GET_NYMS.value
+GET_ATTRS = IndyTransactions.GET_ATTRS.value
+GET_SCHEMAS = IndyTransactions.GET_SCHEMAS.value
+GET_CLAIM_DEFS = IndyTransactions.GET_CLAIM_DEFS.value
 
 POOL_UPGRADE = IndyTransactions.POOL_UPGRADE.value
 NODE_UPGRADE = IndyTransactions.NODE_UPGRADE.value
@@ -114,7 +133,11 @@ IDENTITY_TXN_TYPES = {NYM,
                       SCHEMA,
                       GET_SCHEMA,
                       CLAIM_DEF,
-                      GET_CLAIM_DEF}
+                      GET_CLAIM_DEF,
+                      GET_NYMS,
+                      GET_ATTRS,
+                      GET_SCHEMAS,
+                      GET_CLAIM_DEFS}
 
 validTxnTypes = set()
 validTxnTypes.update(POOL_TXN_TYPES)
@@ -123,3 +146,14 @@ validTxnTypes.update(CONFIG_TXN_TYPES)
 
 CONFIG_LEDGER_ID = 2
 JUSTIFICATION_MAX_SIZE = 1000
+# Max number of keys which can be asked for in one GET_NYMS or GET_ATTRS,
+# also the max page size of GET_SCHEMAS and GET_CLAIM_DEFS
+BATCHED_READ_MAX_KEYS = 100
+# Seq no of the first domain txn whose ATTRIB, SCHEMA or CLAIM_DEF state
+# value is stored in the compact binary format instead of JSON, None keeps
+# JSON for all of them. It affects the state root, so it is a part of the
+# protocol and not of a node's config: it is changed only by a release
+# upgraded to by the whole pool, to a seq no not yet reached by the ledgers
+# of the pools running it. Values written before it stay JSON and both
+# formats are read.
+DOMAIN_STATE_BINARY_VALUES_SINCE_SEQ_NO = None
@@ -0,0 +1,96 @@
+import math
+
+
+class LatencyHistogram:
+    """
+    Counts of durations in buckets whose bounds grow by a factor of 2, from
+    1 microsecond to about a minute, longer ones fall in the last bucket.
+    Adding a duration is a few integer operations, percentiles are
+    estimated as the upper bound of the bucket they fall in (but not more
+    than the longest duration added), so they are at most 2 times the real
+    ones.
+    """
+
+    BUCKETS = 27
+
+    def __init__(self):
+        # Bucket i counts durations shorter than 2 ** i microseconds and
+        # not shorter than 2 ** (i - 1)
+        self.counts = [0] * (self.BUCKETS + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        bucket = int(seconds * 1000000).bit_length()
+        self.counts[bucket if bucket < self.BUCKETS else self.BUCKETS] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, percent):
+        """
+        :return: estimate of the duration in seconds which the percent of
+            durations do not exceed, None if nothing was added
+        """
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * percent / 100))
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                if bucket == self.BUCKETS:
+                    return self.max
+                return min(2 ** bucket / 1000000, self.max)
+
+    @property
+    def stats(self):
+        """
+        Durations in milliseconds
+        """
+        def ms(seconds):
+            return None if seconds is None else round(seconds * 1000, 3)
+
+        return {
+            'count': self.count,
+            'mean': ms(self.total / self.count) if self.count else None,
+            'p50': ms(self.percentile(50)),
+            'p95': ms(self.percentile(95)),
+            'p99': ms(self.percentile(99)),
+            'max': ms(self.max) if self.count else None,
+        }
+
+
+class LatencyHistograms:
+    """
+    Histograms of durations of operations by the operation and the kind of
+    thing operated on, e.g. by the txn type, each created with the first
+    duration added
+    """
+
+    def __init__(self, kindName=str):
+        """
+        :param kindName: gives the name a kind is reported with
+        """
+        self._histograms = {}
+        self._kindName = kindName
+
+    def add(self, operation, kind, seconds):
+        histogram = self._histograms.get((operation, kind))
+        if histogram is None:
+            histogram = self._histograms[(operation, kind)] = \
+                LatencyHistogram()
+        histogram.add(seconds)
+
+    def get(self, operation, kind):
+        return self._histograms.get((operation, kind))
+
+    @property
+    def stats(self):
+        stats = {}
+        for (operation, kind), histogram in self._histograms.items():
+            stats.setdefault(operation, {})[self._kindName(kind)] = \
+                histogram.stats
+        return stats
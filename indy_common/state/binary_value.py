@@ -0,0 +1,195 @@
+"""
+Compact binary format of domain state values, the alternative to the JSON
+encoding of `{lsn, lut, val}` dicts.
+
+    <version byte> <lsn> <lut> <val>
+
+Each of `lsn`, `lut` and `val` is a tagged value. Since the last seq no and
+update time go first they can be read without decoding the payload. Dict
+keys are written in sorted order so encoding is deterministic, which is
+required as state values are a part of the state root. Strings of decimal
+digits (the big integers of CLAIM_DEF keys) are stored as big-endian
+integers taking less than a half of their textual size.
+
+JSON encoded values always start with `{`, so the version byte tells the
+formats apart.
+"""
+
+import re
+import struct
+
+BINARY_VALUE_V1 = 0x01
+
+_NONE = 0x00
+_FALSE = 0x01
+_TRUE = 0x02
+_UINT = 0x03
+_NINT = 0x04
+_STR = 0x05
+_DEC_STR = 0x06
+_FLOAT = 0x07
+_LIST = 0x08
+_DICT = 0x09
+
+# Shorter decimal strings do not get smaller as integers, longer ones hit
+# the limit of int/str conversion of recent Python versions
+_DEC_STR_MIN_LEN = 8
+_DEC_STR_MAX_LEN = 4300
+_DEC_STR_RE = re.compile(r'[1-9][0-9]*')
+
+_float = struct.Struct('>d')
+
+
+def is_binary_value(data) -> bool:
+    return len(data) > 0 and data[0] == BINARY_VALUE_V1
+
+
+def encode_binary_value(value, seqNo, txnTime) -> bytes:
+    out = bytearray([BINARY_VALUE_V1])
+    _write(out, seqNo)
+    _write(out, txnTime)
+    _write(out, value)
+    return bytes(out)
+
+
+def decode_binary_value(data):
+    """
+    :return: value, last seq no, last update time
+    """
+    lsn, lut, pos = _read_header(data)
+    value, _ = _read(data, pos)
+    return value, lsn, lut
+
+
+def decode_binary_value_header(data):
+    """
+    :return: last seq no, last update time; the value is not decoded
+    """
+    lsn, lut, _ = _read_header(data)
+    return lsn, lut
+
+
+def _read_header(data):
+    if not is_binary_value(data):
+        raise ValueError('unknown state value version')
+    lsn, pos = _read(data, 1)
+    lut, pos = _read(data, pos)
+    return lsn, lut, pos
+
+
+def _write_uvarint(out, n):
+    while n > 0x7f:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_uvarint(data, pos):
+    n = 0
+    shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        n |= (b & 0x7f) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _write_str(out, s):
+    b = s.encode()
+    _write_uvarint(out, len(b))
+    out += b
+
+
+def _read_str(data, pos):
+    length, pos = _read_uvarint(data, pos)
+    end = pos + length
+    return bytes(data[pos:end]).decode(), end
+
+
+def _write(out, value):
+    if value is None:
+        out.append(_NONE)
+    elif value is True:
+        out.append(_TRUE)
+    elif value is False:
+        out.append(_FALSE)
+    elif isinstance(value, int):
+        if value >= 0:
+            out.append(_UINT)
+            _write_uvarint(out, value)
+        else:
+            out.append(_NINT)
+            _write_uvarint(out, -value)
+    elif isinstance(value, str):
+        if _DEC_STR_MIN_LEN <= len(value) <= _DEC_STR_MAX_LEN and \
+                _DEC_STR_RE.fullmatch(value):
+            n = int(value)
+            out.append(_DEC_STR)
+            b = n.to_bytes((n.bit_length() + 7) // 8, 'big')
+            _write_uvarint(out, len(b))
+            out += b
+        else:
+            out.append(_STR)
+            _write_str(out, value)
+    elif isinstance(value, float):
+        out.append(_FLOAT)
+        out += _float.pack(value)
+    elif isinstance(value, (list, tuple)):
+        out.append(_LIST)
+        _write_uvarint(out, len(value))
+        for item in value:
+            _write(out, item)
+    elif isinstance(value, dict):
+        out.append(_DICT)
+        _write_uvarint(out, len(value))
+        for k in sorted(value):
+            if not isinstance(k, str):
+                raise TypeError('state value keys should be strings, got {}'
+                                .format(type(k)))
+            _write_str(out, k)
+            _write(out, value[k])
+    else:
+        raise TypeError('{} can not be a part of state value'
+                        .format(type(value)))
+
+
+def _read(data, pos):
+    tag = data[pos]
+    pos += 1
+    if tag == _NONE:
+        return None, pos
+    if tag == _TRUE:
+        return True, pos
+    if tag == _FALSE:
+        return False, pos
+    if tag == _UINT:
+        return _read_uvarint(data, pos)
+    if tag == _NINT:
+        n, pos = _read_uvarint(data, pos)
+        return -n, pos
+    if tag == _STR:
+        return _read_str(data, pos)
+    if tag == _DEC_STR:
+        length, pos = _read_uvarint(data, pos)
+        end = pos + length
+        return str(int.from_bytes(data[pos:end], 'big')), end
+    if tag == _FLOAT:
+        end = pos + _float.size
+        return _float.unpack(data[pos:end])[0], end
+    if tag == _LIST:
+        count, pos = _read_uvarint(data, pos)
+        items = []
+        for _ in range(count):
+            item, pos = _read(data, pos)
+            items.append(item)
+        return items, pos
+    if tag == _DICT:
+        count, pos = _read_uvarint(data, pos)
+        d = {}
+        for _ in range(count):
+            k, pos = _read_str(data, pos)
+            d[k], pos = _read(data, pos)
+        return d, pos
+    raise ValueError('unknown tag {} in state value'.format(tag))
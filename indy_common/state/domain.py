@@ -1,10 +1,15 @@
+import base64
 import json
+from functools import lru_cache
 from hashlib import sha256
 from common.serializers.serialization import domain_state_serializer
 from plenum.common.constants import RAW, ENC, HASH, TXN_TIME, TXN_TYPE, TARGET_NYM, DATA, NAME, VERSION, ORIGIN
 from plenum.common.types import f
 from indy_common.serialization import attrib_raw_data_serializer
-from indy_common.constants import ATTRIB, GET_ATTR, REF, SIGNATURE_TYPE
+from indy_common.constants import ATTRIB, GET_ATTR, REF, SIGNATURE_TYPE, \
+    DESTS, ATTRS
+from indy_common.state.binary_value import encode_binary_value, \
+    decode_binary_value, decode_binary_value_header, is_binary_value
 
 MARKER_ATTR = "\01"
 MARKER_SCHEMA = "\02"
@@ -68,23 +73,31 @@ def prepare_get_nym_for_state(txn):
     return key, value
 
 
-def prepare_attr_for_state(txn):
+def prepare_get_nyms_for_state(result):
+    """
+    Make key(path)-value pairs for state from every item of GET_NYMS result
+    """
+    return [prepare_get_nym_for_state(item) for item in result[DATA]]
+
+
+def prepare_attr_for_state(txn, binary_since_seq_no=None):
     """
     Make key(path)-value pair for state from ATTRIB or GET_ATTR
+    :param binary_since_seq_no: see `encode_state_value_for_seq_no`
     :return: state path, state value, value for attribute store
     """
     assert txn[TXN_TYPE] in {ATTRIB, GET_ATTR}
     nym = txn[TARGET_NYM]
-    attr_key, value = parse_attr_txn(txn)
-    hashed_value = hash_of(value) if value else ''
+    attr_key, value, hashed_value = parse_attr_txn_with_hash(txn)
     seq_no = txn[f.SEQ_NO.nm]
     txn_time = txn[TXN_TIME]
-    value_bytes = encode_state_value(hashed_value, seq_no, txn_time)
+    value_bytes = encode_state_value_for_seq_no(hashed_value, seq_no, txn_time,
+                                                binary_since_seq_no)
     path = make_state_path_for_attr(nym, attr_key)
     return path, value, hashed_value, value_bytes
 
 
-def prepare_claim_def_for_state(txn):
+def prepare_claim_def_for_state(txn, binary_since_seq_no=None):
     origin = txn.get(f.IDENTIFIER.nm)
     schema_seq_no = txn.get(REF)
     if schema_seq_no is None:
@@ -99,11 +112,12 @@ def prepare_claim_def_for_state(txn):
     path = make_state_path_for_claim_def(origin, schema_seq_no, signature_type)
     seq_no = txn[f.SEQ_NO.nm]
     txn_time = txn[TXN_TIME]
-    value_bytes = encode_state_value(data, seq_no, txn_time)
+    value_bytes = encode_state_value_for_seq_no(data, seq_no, txn_time,
+                                                binary_since_seq_no)
     return path, value_bytes
 
 
-def prepare_get_claim_def_for_state(txn):
+def prepare_get_claim_def_for_state(txn, binary_since_seq_no=None):
     origin = txn.get(ORIGIN)
     schema_seq_no = txn.get(REF)
     if schema_seq_no is None:
@@ -118,11 +132,12 @@ def prepare_get_claim_def_for_state(txn):
     data = txn.get(DATA)
     if data is not None:
         txn_time = txn[TXN_TIME]
-        value_bytes = encode_state_value(data, seq_no, txn_time)
+        value_bytes = encode_state_value_for_seq_no(data, seq_no, txn_time,
+                                                    binary_since_seq_no)
     return path, value_bytes
 
 
-def prepare_schema_for_state(txn):
+def prepare_schema_for_state(txn, binary_since_seq_no=None):
     origin = txn.get(f.IDENTIFIER.nm)
     data = txn.get(DATA)
     schema_name = data.pop(NAME)
@@ -130,11 +145,12 @@ def prepare_schema_for_state(txn):
     path = make_state_path_for_schema(origin, schema_name, schema_version)
     seq_no = txn[f.SEQ_NO.nm]
     txn_time = txn[TXN_TIME]
-    value_bytes = encode_state_value(data, seq_no, txn_time)
+    value_bytes = encode_state_value_for_seq_no(data, seq_no, txn_time,
+                                                binary_since_seq_no)
     return path, value_bytes
 
 
-def prepare_get_schema_for_state(txn):
+def prepare_get_schema_for_state(txn, binary_since_seq_no=None):
     origin = txn.get(TARGET_NYM)
     data = txn[DATA].copy()
     schema_name = data.pop(NAME)
@@ -144,11 +160,32 @@ def prepare_get_schema_for_state(txn):
     if len(data) != 0:
         seq_no = txn[f.SEQ_NO.nm]
         txn_time = txn[TXN_TIME]
-        value_bytes = encode_state_value(data, seq_no, txn_time)
+        value_bytes = encode_state_value_for_seq_no(data, seq_no, txn_time,
+                                                    binary_since_seq_no)
     return path, value_bytes
 
 
-def encode_state_value(value, seqNo, txnTime):
+def prepare_get_schemas_for_state(result, binary_since_seq_no=None):
+    """
+    Make key(path)-value pairs for state from every item of GET_SCHEMAS
+    result
+    """
+    return [prepare_get_schema_for_state(item, binary_since_seq_no)
+            for item in result[DATA]]
+
+
+def prepare_get_claim_defs_for_state(result, binary_since_seq_no=None):
+    """
+    Make key(path)-value pairs for state from every item of GET_CLAIM_DEFS
+    result
+    """
+    return [prepare_get_claim_def_for_state(item, binary_since_seq_no)
+            for item in result[DATA]]
+
+
+def encode_state_value(value, seqNo, txnTime, binary=False):
+    if binary:
+        return encode_binary_value(value, seqNo, txnTime)
     return domain_state_serializer.serialize({
         LAST_SEQ_NO: seqNo,
         LAST_UPDATE_TIME: txnTime,
@@ -156,7 +193,23 @@ def encode_state_value(value, seqNo, txnTime):
     })
 
 
+def encode_state_value_for_seq_no(value, seqNo, txnTime,
+                                  binary_since_seq_no=None):
+    """
+    Values of txns with seq no starting from `binary_since_seq_no` are
+    encoded in the binary format, the rest and all of them if it is None
+    are encoded as JSON. Since the format depends only on the txn, every
+    node gets the same state no matter when the setting was applied,
+    as long as it was applied before the pool reached that seq no.
+    """
+    binary = binary_since_seq_no is not None and \
+        seqNo is not None and seqNo >= binary_since_seq_no
+    return encode_state_value(value, seqNo, txnTime, binary=binary)
+
+
 def decode_state_value(ecnoded_value):
+    if is_binary_value(ecnoded_value):
+        return decode_binary_value(ecnoded_value)
     decoded = domain_state_serializer.deserialize(ecnoded_value)
     value = decoded.get(VALUE)
     last_seq_no = decoded.get(LAST_SEQ_NO)
@@ -164,6 +217,44 @@ def decode_state_value(ecnoded_value):
     return value, last_seq_no, last_update_time
 
 
+def decode_state_value_header(encoded_value):
+    """
+    Returns last seq no and last update time of a state value, the value
+    itself is not decoded when it is in the binary format
+    """
+    if is_binary_value(encoded_value):
+        return decode_binary_value_header(encoded_value)
+    _, last_seq_no, last_update_time = decode_state_value(encoded_value)
+    return last_seq_no, last_update_time
+
+
+def state_value_to_reply(encoded_value):
+    """
+    Makes a stored state value a part of a reply without decoding it. JSON
+    encoded values go as they are, binary ones in base64, which has no `{`
+    so the formats are told apart by the first character
+    """
+    if encoded_value is None:
+        return None
+    encoded_value = bytes(encoded_value)
+    if is_binary_value(encoded_value):
+        return base64.b64encode(encoded_value).decode()
+    return encoded_value.decode()
+
+
+def state_value_from_reply(reply_value) -> bytes:
+    """
+    Returns the exact bytes of the state value made a part of a reply with
+    `state_value_to_reply`, they can be verified against the state proof
+    and decoded with `decode_state_value`
+    """
+    if reply_value is None:
+        return None
+    if reply_value.startswith('{'):
+        return reply_value.encode()
+    return base64.b64decode(reply_value)
+
+
 def hash_of(text) -> str:
     if not isinstance(text, (str, bytes)):
         text = domain_state_serializer.serialize(text)
@@ -174,7 +265,35 @@ def hash_of(text) -> str:
 
 def parse_attr_txn(txn):
     attr_type, attr = _extract_attr_typed_value(txn)
+    return _parse_attr(attr_type, attr)
+
 
+def parse_attr_txn_with_hash(txn):
+    """
+    Same as `parse_attr_txn` but also returns the hash of the attribute
+    value, which is what the ledger and the state keep instead of the value
+
+    :return: attribute key, value, hash of the value or '' if there is no
+        value
+    """
+    attr_type, attr = _extract_attr_typed_value(txn)
+    return _parse_attr_with_hash(attr_type, attr)
+
+
+# The ledger form and the state value of an ATTRIB txn are made one right
+# after another, so the last parsed attribute is kept to hash its data once
+@lru_cache(maxsize=1)
+def _parse_attr_with_hash(attr_type, attr):
+    attr_key, value = _parse_attr(attr_type, attr)
+    if not value:
+        return attr_key, value, ''
+    if attr_type == ENC:
+        # The key of an encrypted attribute is the hash of its value
+        return attr_key, value, attr_key
+    return attr_key, value, hash_of(value)
+
+
+def _parse_attr(attr_type, attr):
     if attr_type == RAW:
         data = attrib_raw_data_serializer.deserialize(attr)
         # To exclude user-side formatting issues
@@ -188,7 +307,7 @@ def parse_attr_txn(txn):
         return attr, None
 
 
-def prepare_get_attr_for_state(txn):
+def prepare_get_attr_for_state(txn, binary_since_seq_no=None):
     nym = txn[TARGET_NYM]
     attr_type, attr_key = _extract_attr_typed_value(txn)
     data = txn.get(DATA)
@@ -196,7 +315,7 @@ def prepare_get_attr_for_state(txn):
         txn = txn.copy()
         data = txn.pop(DATA)
         txn[attr_type] = data
-        return prepare_attr_for_state(txn)
+        return prepare_attr_for_state(txn, binary_since_seq_no)
 
     if attr_type == ENC:
         attr_key = hash_of(attr_key)
@@ -205,6 +324,19 @@ def prepare_get_attr_for_state(txn):
     return path, None, None, None
 
 
+def prepare_get_attrs_for_state(result, binary_since_seq_no=None):
+    """
+    Make key(path)-value pairs for state from every item of GET_ATTRS result
+    """
+    pairs = []
+    for item in result[DATA]:
+        path, _, _, value_bytes = \
+            prepare_get_attr_for_state({**item, TXN_TYPE: GET_ATTR},
+                                       binary_since_seq_no)
+        pairs.append((path, value_bytes))
+    return pairs
+
+
 def _extract_attr_typed_value(txn):
     """
     ATTR and GET_ATTR can have one of 'raw', 'enc' and 'hash' fields.
@@ -0,0 +1,49 @@
+import pytest
+from plenum.common.constants import STEWARD, TRUSTEE, NODE, SERVICES, \
+    VALIDATOR
+
+from indy_common.auth import Authoriser, authMapRules
+from indy_common.constants import OWNER, NYM
+
+
+@pytest.fixture()
+def custom_rules():
+    rules = {
+        NYM + '_field_<any>_<any>': {TRUSTEE: [], STEWARD: [OWNER]},
+        NYM + '_field_old_new': {TRUSTEE: []},
+    }
+    ruleSource = Authoriser.ruleSource
+    Authoriser.ruleSource = staticmethod(lambda: authMapRules(rules))
+    Authoriser.compile()
+    yield
+    Authoriser.ruleSource = staticmethod(ruleSource)
+    Authoriser.compile()
+
+
+def test_auth_map_rules_split_keys():
+    assert list(authMapRules({'0_client_port_a_b': {TRUSTEE: []}})) == \
+        [(('0', 'client_port', 'a', 'b'), {TRUSTEE: []})]
+
+
+def test_compiled_from_auth_map():
+    exact, _ = Authoriser.compile()[(NODE, SERVICES)]
+    assert ('[]', '[VALIDATOR]') in exact
+    assert Authoriser.authorised(NODE, SERVICES, TRUSTEE,
+                                 oldVal=[VALIDATOR], newVal=[])[0]
+    assert Authoriser.authorised(NODE, SERVICES, TRUSTEE,
+                                 oldVal="['VALIDATOR']", newVal='[]')[0]
+
+
+def test_custom_rule_source(custom_rules):
+    # Exact values are looked up first, any values are the fallback
+    assert Authoriser.authorised(NYM, 'field', TRUSTEE, 'old', 'new') == \
+        (True, '')
+    assert not Authoriser.authorised(NYM, 'field', STEWARD, 'old', 'new',
+                                     isActorOwnerOfSubject=True)[0]
+    assert Authoriser.authorised(NYM, 'field', STEWARD, 'x', 'y',
+                                 isActorOwnerOfSubject=True) == (True, '')
+    assert Authoriser.authorised(NYM, 'field', STEWARD, 'x', 'y',
+                                 isActorOwnerOfSubject=False) == \
+        (False, 'Only owner is allowed')
+    assert Authoriser.authorised(NYM, 'other', TRUSTEE, 'x', 'y') == \
+        (False, "key '{}_other_x_y' not found in authorized map".format(NYM))
@@ -0,0 +1,64 @@
+import pytest
+
+from indy_common.state import domain
+from indy_common.state.binary_value import is_binary_value
+
+CLAIM_DEF_DATA = {
+    'primary': {
+        'n': '9' * 600,
+        's': '10' * 300,
+        'r': {'name': '1' * 600, 'age': '20' * 300},
+        'rctxt': '0',
+        'z': '123',
+    },
+    'revocation': None,
+}
+
+
+@pytest.mark.parametrize('value', [
+    CLAIM_DEF_DATA,
+    '4f8e2a8c1b2d3e4f',
+    '',
+    {'attr_names': ['name', 'age'], 'flag': True, 'neg': -5, 'f': 1.5},
+    ['00123456789', '-12345678901', '1' * 5000, '123456789\n'],
+])
+def test_binary_value_round_trip(value):
+    encoded = domain.encode_state_value(value, 12, 1520000000, binary=True)
+    assert is_binary_value(encoded)
+    assert domain.decode_state_value(encoded) == (value, 12, 1520000000)
+    assert domain.decode_state_value_header(encoded) == (12, 1520000000)
+
+
+def test_json_values_still_decoded():
+    encoded = domain.encode_state_value(CLAIM_DEF_DATA, 3, None)
+    assert not is_binary_value(encoded)
+    assert domain.decode_state_value(encoded) == (CLAIM_DEF_DATA, 3, None)
+    assert domain.decode_state_value_header(encoded) == (3, None)
+
+
+def test_binary_value_is_deterministic_and_compact():
+    reordered = dict(reversed(list(CLAIM_DEF_DATA.items())))
+    encoded = domain.encode_state_value(CLAIM_DEF_DATA, 1, 2, binary=True)
+    assert encoded == domain.encode_state_value(reordered, 1, 2, binary=True)
+    json_encoded = domain.encode_state_value(CLAIM_DEF_DATA, 1, 2)
+    assert len(encoded) < len(json_encoded) / 2
+
+
+def test_format_chosen_by_seq_no():
+    def encode(seq_no, since):
+        return domain.encode_state_value_for_seq_no('v', seq_no, 1, since)
+
+    assert not is_binary_value(encode(10, None))
+    assert not is_binary_value(encode(9, 10))
+    assert is_binary_value(encode(10, 10))
+    assert is_binary_value(encode(11, 10))
+
+
+@pytest.mark.parametrize('binary', [False, True])
+def test_state_value_passed_through_reply(binary):
+    encoded = domain.encode_state_value(CLAIM_DEF_DATA, 12, 1520000000,
+                                        binary=binary)
+    reply_value = domain.state_value_to_reply(encoded)
+    assert isinstance(reply_value, str)
+    assert domain.state_value_from_reply(reply_value) == encoded
+    assert domain.state_value_to_reply(None) is None
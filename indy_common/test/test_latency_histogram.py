@@ -0,0 +1,34 @@
+from indy_common.latency_histogram import LatencyHistogram, LatencyHistograms
+
+
+def test_percentiles_are_bucket_upper_bounds():
+    histogram = LatencyHistogram()
+    assert histogram.stats == {'count': 0, 'mean': None, 'p50': None,
+                               'p95': None, 'p99': None, 'max': None}
+    # 90 durations of 3 microseconds, 9 of 1 ms and 1 of 50 ms
+    for seconds in [0.000003] * 90 + [0.001] * 9 + [0.05]:
+        histogram.add(seconds)
+    assert histogram.percentile(50) == 0.000004
+    assert histogram.percentile(95) == 0.001024
+    assert histogram.percentile(99) == 0.001024
+    # Not more than the longest one
+    assert histogram.percentile(100) == 0.05
+    assert histogram.stats['count'] == 100
+    assert histogram.stats['p99'] == 1.024
+
+
+def test_very_long_durations_in_last_bucket():
+    histogram = LatencyHistogram()
+    histogram.add(3600)
+    assert histogram.counts[-1] == 1
+    assert histogram.percentile(50) == 3600
+
+
+def test_histograms_by_operation_and_kind():
+    histograms = LatencyHistograms(kindName={'1': 'NYM'}.get)
+    histograms.add('apply', '1', 0.001)
+    histograms.add('apply', '1', 0.002)
+    assert histograms.get('apply', '1').count == 2
+    assert histograms.get('apply', '100') is None
+    assert list(histograms.stats) == ['apply']
+    assert histograms.stats['apply']['NYM']['count'] == 2
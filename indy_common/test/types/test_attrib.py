@@ -1,14 +1,17 @@
 import itertools
+from hashlib import sha256
+
 import pytest
 
 from plenum.common.constants import TARGET_NYM, RAW, ENC, HASH
+from plenum.common.types import OPERATION
 from indy_common.constants import TXN_TYPE, allOpKeys, ATTRIB, GET_ATTR, \
     DATA, GET_NYM, reqOpKeys, GET_TXNS, GET_SCHEMA, GET_CLAIM_DEF, ACTION, \
     NODE_UPGRADE, COMPLETE, FAIL, CONFIG_LEDGER_ID, POOL_UPGRADE, POOL_CONFIG, \
     IN_PROGRESS, DISCLO, ATTR_NAMES, REVOCATION, SCHEMA, ENDPOINT, CLAIM_DEF, \
     REF, SIGNATURE_TYPE, SCHEDULE, SHA256, \
     TIMEOUT, JUSTIFICATION, JUSTIFICATION_MAX_SIZE, REINSTALL, WRITES
-from indy_common.types import ClientAttribOperation
+from indy_common.types import ClientAttribOperation, Request
 
 
 validator = ClientAttribOperation()
@@ -170,3 +173,23 @@ def test_attrib_with_raw_having_endpoint_ha_with_invalid_ip_address_fails():
     ex_info.match(
         "validation error \[ClientAttribOperation\]: invalid endpoint address "
         "\(ha=256.8.8.8:9700\)")
+
+
+def test_attrib_signing_state_has_hashed_data_and_keeps_operation():
+    raw = '{"name": "%s"}' % ('x' * 1000)
+    operation = {
+        TXN_TYPE: ATTRIB,
+        TARGET_NYM: VALID_TARGET_NYM,
+        RAW: raw,
+    }
+    request = Request(identifier=VALID_TARGET_NYM, reqId=1,
+                      operation=operation)
+    signing_operation = request.signingState()[OPERATION]
+    assert signing_operation == {
+        TXN_TYPE: ATTRIB,
+        TARGET_NYM: VALID_TARGET_NYM,
+        RAW: sha256(raw.encode()).hexdigest(),
+    }
+    assert operation[RAW] == raw
+    # The data is hashed only once per request
+    assert request.signingState()[OPERATION] is signing_operation
@@ -1,13 +1,15 @@
 from collections import OrderedDict
 
 from indy_common.types import ClientClaimDefGetOperation
-from plenum.common.messages.fields import ConstantField, LimitedLengthStringField, TxnSeqNoField, IdentifierField
+from plenum.common.messages.fields import ConstantField, LimitedLengthStringField, TxnSeqNoField, IdentifierField, \
+    BooleanField
 
 EXPECTED_ORDERED_FIELDS = OrderedDict([
     ("type", ConstantField),
     ("ref", TxnSeqNoField),
     ("origin", IdentifierField),
     ('signature_type', LimitedLengthStringField),
+    ('passStateValue', BooleanField),
 ])
 
 
@@ -1,13 +1,16 @@
 import pytest
+from indy_common.constants import GET_ATTR
 from indy_common.types import ClientGetAttribOperation
 from collections import OrderedDict
-from plenum.common.messages.fields import ConstantField, LimitedLengthStringField, IdentifierField
+from plenum.common.messages.fields import ConstantField, LimitedLengthStringField, IdentifierField, \
+    TimestampField
 
 
 EXPECTED_ORDERED_FIELDS = OrderedDict([
     ("type", ConstantField),
     ("dest", IdentifierField),
     ("raw", LimitedLengthStringField),
+    ("timestamp", TimestampField),
 ])
 
 
@@ -20,3 +23,16 @@ def test_has_expected_validators():
     schema = dict(ClientGetAttribOperation.schema)
     for field, validator in EXPECTED_ORDERED_FIELDS.items():
         assert isinstance(schema[field], validator)
+
+
+def test_huge_timestamp_rejected():
+    operation = {
+        'type': GET_ATTR,
+        'dest': 'L5AD5g65TDQr1PPHHRoiGf',
+        'raw': 'name',
+        'timestamp': 2 ** 64,
+    }
+    with pytest.raises(TypeError, match='should be less than'):
+        ClientGetAttribOperation().validate(operation)
+    operation['timestamp'] = 1500000000
+    ClientGetAttribOperation().validate(operation)
@@ -0,0 +1,38 @@
+import pytest
+from plenum.common.constants import TARGET_NYM, RAW, ENC
+from indy_common.constants import TXN_TYPE, GET_ATTRS, ATTRS
+from indy_common.types import ClientGetAttrsOperation
+
+VALID_TARGET_NYM = 'a' * 43
+
+validator = ClientGetAttrsOperation()
+
+
+def test_valid_batch():
+    validator.validate({
+        TXN_TYPE: GET_ATTRS,
+        ATTRS: [
+            {TARGET_NYM: VALID_TARGET_NYM, RAW: 'endpoint'},
+            {TARGET_NYM: VALID_TARGET_NYM, ENC: 'foo'},
+        ],
+    })
+
+
+def test_item_with_two_keys_fails():
+    with pytest.raises(TypeError) as ex_info:
+        validator.validate({
+            TXN_TYPE: GET_ATTRS,
+            ATTRS: [
+                {TARGET_NYM: VALID_TARGET_NYM, RAW: 'endpoint', ENC: 'foo'},
+            ],
+        })
+    ex_info.match("only one field")
+
+
+def test_item_without_key_fails():
+    with pytest.raises(TypeError) as ex_info:
+        validator.validate({
+            TXN_TYPE: GET_ATTRS,
+            ATTRS: [{TARGET_NYM: VALID_TARGET_NYM}],
+        })
+    ex_info.match("missed fields")
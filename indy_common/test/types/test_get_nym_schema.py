@@ -1,12 +1,15 @@
 import pytest
+from indy_common.constants import GET_NYM
 from indy_common.types import ClientGetNymOperation
 from collections import OrderedDict
-from plenum.common.messages.fields import ConstantField, IdentifierField
+from plenum.common.messages.fields import ConstantField, IdentifierField, \
+    TimestampField
 
 
 EXPECTED_ORDERED_FIELDS = OrderedDict([
     ("type", ConstantField),
     ("dest", IdentifierField),
+    ("timestamp", TimestampField),
 ])
 
 
@@ -19,3 +22,15 @@ def test_has_expected_validators():
     schema = dict(ClientGetNymOperation.schema)
     for field, validator in EXPECTED_ORDERED_FIELDS.items():
         assert isinstance(schema[field], validator)
+
+
+def test_huge_timestamp_rejected():
+    operation = {
+        'type': GET_NYM,
+        'dest': 'L5AD5g65TDQr1PPHHRoiGf',
+        'timestamp': 2 ** 64,
+    }
+    with pytest.raises(TypeError, match='should be less than'):
+        ClientGetNymOperation().validate(operation)
+    operation['timestamp'] = 1500000000
+    ClientGetNymOperation().validate(operation)
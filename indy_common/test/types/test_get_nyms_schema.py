@@ -0,0 +1,52 @@
+import pytest
+from indy_common.constants import TXN_TYPE, GET_NYMS, DESTS, \
+    BATCHED_READ_MAX_KEYS
+from indy_common.types import ClientGetNymsOperation
+from collections import OrderedDict
+from plenum.common.messages.fields import ConstantField, IterableField
+
+
+EXPECTED_ORDERED_FIELDS = OrderedDict([
+    ("type", ConstantField),
+    ("dests", IterableField),
+])
+
+VALID_TARGET_NYM = 'a' * 43
+
+validator = ClientGetNymsOperation()
+
+
+def test_has_expected_fields():
+    actual_field_names = OrderedDict(ClientGetNymsOperation.schema).keys()
+    assert actual_field_names == EXPECTED_ORDERED_FIELDS.keys()
+
+
+def test_has_expected_validators():
+    schema = dict(ClientGetNymsOperation.schema)
+    for field, validator in EXPECTED_ORDERED_FIELDS.items():
+        assert isinstance(schema[field], validator)
+
+
+def test_valid_batch():
+    validator.validate({
+        TXN_TYPE: GET_NYMS,
+        DESTS: [VALID_TARGET_NYM, VALID_TARGET_NYM],
+    })
+
+
+def test_empty_batch_fails():
+    with pytest.raises(TypeError) as ex_info:
+        validator.validate({
+            TXN_TYPE: GET_NYMS,
+            DESTS: [],
+        })
+    ex_info.match("should not be empty")
+
+
+def test_too_big_batch_fails():
+    with pytest.raises(TypeError) as ex_info:
+        validator.validate({
+            TXN_TYPE: GET_NYMS,
+            DESTS: [VALID_TARGET_NYM] * (BATCHED_READ_MAX_KEYS + 1),
+        })
+    ex_info.match("should contain at most")
@@ -1,7 +1,8 @@
 import pytest
 from indy_common.types import SchemaField, ClientGetSchemaOperation, GetSchemaField
 from collections import OrderedDict
-from plenum.common.messages.fields import ConstantField, IdentifierField, VersionField, LimitedLengthStringField
+from plenum.common.messages.fields import ConstantField, IdentifierField, VersionField, LimitedLengthStringField, \
+    BooleanField
 
 
 EXPECTED_ORDERED_FIELDS_SCHEMA = OrderedDict([
@@ -26,6 +27,7 @@ EXPECTED_ORDERED_FIELDS = OrderedDict([
     ("type", ConstantField),
     ("dest", IdentifierField),
     ('data', GetSchemaField),
+    ('passStateValue', BooleanField),
 ])
 
 
@@ -0,0 +1,72 @@
+import pytest
+from indy_common.constants import TXN_TYPE, GET_SCHEMAS, GET_CLAIM_DEFS, \
+    REF, FROM, LIMIT, BATCHED_READ_MAX_KEYS
+from indy_common.types import ClientGetSchemasOperation, \
+    ClientGetClaimDefsOperation
+from collections import OrderedDict
+from plenum.common.constants import TARGET_NYM
+from plenum.common.messages.fields import ConstantField, IdentifierField, \
+    LimitedLengthStringField, TxnSeqNoField
+from plenum.common.messages.node_messages import NonNegativeNumberField
+
+
+EXPECTED_ORDERED_FIELDS = OrderedDict([
+    ("type", ConstantField),
+    ("dest", IdentifierField),
+    ("from", LimitedLengthStringField),
+    ("limit", NonNegativeNumberField),
+])
+
+VALID_TARGET_NYM = 'a' * 43
+
+validator = ClientGetSchemasOperation()
+
+
+def test_has_expected_fields():
+    actual_field_names = OrderedDict(ClientGetSchemasOperation.schema).keys()
+    assert actual_field_names == EXPECTED_ORDERED_FIELDS.keys()
+
+
+def test_has_expected_validators():
+    schema = dict(ClientGetSchemasOperation.schema)
+    for field, validator in EXPECTED_ORDERED_FIELDS.items():
+        assert isinstance(schema[field], validator)
+
+
+def test_valid_first_and_next_page():
+    validator.validate({
+        TXN_TYPE: GET_SCHEMAS,
+        TARGET_NYM: VALID_TARGET_NYM,
+    })
+    validator.validate({
+        TXN_TYPE: GET_SCHEMAS,
+        TARGET_NYM: VALID_TARGET_NYM,
+        FROM: 'schema:1.0',
+        LIMIT: BATCHED_READ_MAX_KEYS,
+    })
+
+
+@pytest.mark.parametrize('limit', [0, BATCHED_READ_MAX_KEYS + 1])
+def test_invalid_page_size_fails(limit):
+    with pytest.raises(TypeError) as ex_info:
+        validator.validate({
+            TXN_TYPE: GET_SCHEMAS,
+            TARGET_NYM: VALID_TARGET_NYM,
+            LIMIT: limit,
+        })
+    ex_info.match("should be from 1 to")
+
+
+def test_claim_defs_need_schema_seq_no():
+    claim_defs_validator = ClientGetClaimDefsOperation()
+    assert isinstance(dict(ClientGetClaimDefsOperation.schema)[REF],
+                      TxnSeqNoField)
+    claim_defs_validator.validate({
+        TXN_TYPE: GET_CLAIM_DEFS,
+        REF: 12,
+    })
+    with pytest.raises(TypeError):
+        claim_defs_validator.validate({
+            TXN_TYPE: GET_CLAIM_DEFS,
+            REF: 0,
+        })
@@ -24,3 +24,8 @@ class IndyTransactions(Transactions):
     POOL_CONFIG = "111"
 
     CHANGE_KEY = "112"
+
+    GET_NYMS = "113"
+    GET_ATTRS = "114"
+    GET_SCHEMAS = "115"
+    GET_CLAIM_DEFS = "116"
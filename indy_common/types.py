@@ -1,5 +1,4 @@
 import json
-from copy import deepcopy
 from hashlib import sha256
 
 from plenum.common.constants import TARGET_NYM, NONCE, RAW, ENC, HASH, NAME, VERSION, ORIGIN, FORCE
@@ -12,7 +11,8 @@ from plenum.common.request import Request as PRequest
 from plenum.common.types import OPERATION
 from plenum.common.messages.node_messages import NonNegativeNumberField
 from plenum.common.messages.fields import ConstantField, IdentifierField, LimitedLengthStringField, TxnSeqNoField, \
-    Sha256HexField, JsonField, MapField, BooleanField, VersionField, ChooseField
+    Sha256HexField, JsonField, MapField, BooleanField, VersionField, ChooseField, \
+    TimestampField
 from plenum.common.messages.client_request import ClientOperationField as PClientOperationField
 from plenum.common.messages.client_request import ClientMessageValidator as PClientMessageValidator
 from plenum.common.util import is_network_ip_address_valid, is_network_port_valid
@@ -25,7 +25,20 @@ from indy_common.constants import TXN_TYPE, allOpKeys, ATTRIB, GET_ATTR, \
     DATA, GET_NYM, reqOpKeys, GET_TXNS, GET_SCHEMA, GET_CLAIM_DEF, ACTION, \
     NODE_UPGRADE, COMPLETE, FAIL, CONFIG_LEDGER_ID, POOL_UPGRADE, POOL_CONFIG, \
     DISCLO, ATTR_NAMES, REVOCATION, SCHEMA, ENDPOINT, CLAIM_DEF, REF, SIGNATURE_TYPE, SCHEDULE, SHA256, \
-    TIMEOUT, JUSTIFICATION, JUSTIFICATION_MAX_SIZE, REINSTALL, WRITES, PRIMARY, START, CANCEL
+    TIMEOUT, JUSTIFICATION, JUSTIFICATION_MAX_SIZE, REINSTALL, WRITES, PRIMARY, START, CANCEL, \
+    GET_NYMS, GET_ATTRS, DESTS, ATTRS, BATCHED_READ_MAX_KEYS, GET_SCHEMAS, \
+    GET_CLAIM_DEFS, FROM, LIMIT, PASS_STATE_VALUE, TIMESTAMP
+
+
+def attrib_signing_operation(operation):
+    """
+    The operation of an ATTRIB as it is signed, the data of the attribute
+    is replaced by its hash. Only the operation dict is copied, its other
+    values are shared with the original one
+    """
+    keyName = {RAW, ENC, HASH}.intersection(operation.keys()).pop()
+    return {**operation,
+            keyName: sha256(operation[keyName].encode()).hexdigest()}
 
 
 class Request(PRequest):
@@ -35,22 +48,56 @@ class Request(PRequest):
         before signing
         :return: state to be used when signing
         """
+        state = super().signingState(identifier=identifier)
         if self.operation.get(TXN_TYPE) == ATTRIB:
-            d = deepcopy(super().signingState(identifier=identifier))
-            op = d[OPERATION]
-            keyName = {RAW, ENC, HASH}.intersection(set(op.keys())).pop()
-            op[keyName] = sha256(op[keyName].encode()).hexdigest()
-            return d
-        return super().signingState(identifier=identifier)
+            state[OPERATION] = self._attribSigningOperation()
+        return state
+
+    def _attribSigningOperation(self):
+        # The data is hashed once per request, unless the operation is
+        # replaced
+        operation, signingOperation = getattr(self, '_signingOperation',
+                                              (None, None))
+        if operation is not self.operation:
+            signingOperation = attrib_signing_operation(self.operation)
+            self._signingOperation = (self.operation, signingOperation)
+        return signingOperation
+
+
+class StateTimestampField(TimestampField):
+    """
+    Time the state is read as of, bounded so it fits the 64-bit times of
+    the state root index
+    """
+    _newest_time = 2 ** 63 - 1
+
+    def _specific_validation(self, val):
+        err = super()._specific_validation(val)
+        if err:
+            return err
+        if val > self._newest_time:
+            return 'should be less than {} but was {}'. \
+                format(self._newest_time, val)
 
 
 class ClientGetNymOperation(MessageValidator):
     schema = (
         (TXN_TYPE, ConstantField(GET_NYM)),
         (TARGET_NYM, IdentifierField()),
+        (TIMESTAMP, StateTimestampField(optional=True)),
     )
 
 
+class ClientGetNymsOperation(MessageValidator):
+    schema = (
+        (TXN_TYPE, ConstantField(GET_NYMS)),
+        (DESTS, IterableField(IdentifierField())),
+    )
+
+    def _validate_message(self, msg):
+        _validate_batched_read_size(self, DESTS, msg[DESTS])
+
+
 class ClientDiscloOperation(MessageValidator):
     schema = (
         (TXN_TYPE, ConstantField(DISCLO)),
@@ -95,6 +142,7 @@ class ClientGetSchemaOperation(MessageValidator):
         (TXN_TYPE, ConstantField(GET_SCHEMA)),
         (TARGET_NYM, IdentifierField()),
         (DATA, GetSchemaField()),
+        (PASS_STATE_VALUE, BooleanField(optional=True)),
     )
 
 
@@ -161,8 +209,83 @@ class ClientGetAttribOperation(MessageValidator):
         (TXN_TYPE, ConstantField(GET_ATTR)),
         (TARGET_NYM, IdentifierField(optional=True)),
         (RAW, LimitedLengthStringField(max_length=RAW_FIELD_LIMIT)),
+        (TIMESTAMP, StateTimestampField(optional=True)),
+    )
+
+
+class GetAttrsItemField(MessageValidator):
+    schema = (
+        (TARGET_NYM, IdentifierField()),
+        (RAW, LimitedLengthStringField(max_length=RAW_FIELD_LIMIT, optional=True)),
+        (ENC, LimitedLengthStringField(max_length=ENC_FIELD_LIMIT, optional=True)),
+        (HASH, LimitedLengthStringField(max_length=HASH_FIELD_LIMIT, optional=True)),
     )
 
+    def _validate_message(self, msg):
+        fields_n = sum(1 for f in (RAW, ENC, HASH) if f in msg)
+        if fields_n == 0:
+            self._raise_missed_fields(RAW, ENC, HASH)
+        if fields_n > 1:
+            self._raise_invalid_message(
+                "only one field from {}, {}, {} is expected".format(
+                    RAW, ENC, HASH)
+            )
+
+
+class ClientGetAttrsOperation(MessageValidator):
+    schema = (
+        (TXN_TYPE, ConstantField(GET_ATTRS)),
+        (ATTRS, IterableField(GetAttrsItemField())),
+    )
+
+    def _validate_message(self, msg):
+        _validate_batched_read_size(self, ATTRS, msg[ATTRS])
+
+
+def _validate_batched_read_size(validator, field, keys):
+    if not keys:
+        validator._raise_invalid_fields(field, keys, 'should not be empty')
+    if len(keys) > BATCHED_READ_MAX_KEYS:
+        validator._raise_invalid_fields(
+            field, len(keys),
+            'should contain at most {} items'.format(BATCHED_READ_MAX_KEYS))
+
+
+# Pages are continued from an index key suffix, the longest one is a schema
+# name with its version
+PAGE_FROM_FIELD_LIMIT = NAME_FIELD_LIMIT + 1 + VERSION_FIELD_LIMIT
+
+
+class ClientGetSchemasOperation(MessageValidator):
+    schema = (
+        (TXN_TYPE, ConstantField(GET_SCHEMAS)),
+        (TARGET_NYM, IdentifierField()),
+        (FROM, LimitedLengthStringField(max_length=PAGE_FROM_FIELD_LIMIT, optional=True)),
+        (LIMIT, NonNegativeNumberField(optional=True)),
+    )
+
+    def _validate_message(self, msg):
+        _validate_page_limit(self, msg.get(LIMIT))
+
+
+class ClientGetClaimDefsOperation(MessageValidator):
+    schema = (
+        (TXN_TYPE, ConstantField(GET_CLAIM_DEFS)),
+        (REF, TxnSeqNoField()),
+        (FROM, LimitedLengthStringField(max_length=PAGE_FROM_FIELD_LIMIT, optional=True)),
+        (LIMIT, NonNegativeNumberField(optional=True)),
+    )
+
+    def _validate_message(self, msg):
+        _validate_page_limit(self, msg.get(LIMIT))
+
+
+def _validate_page_limit(validator, limit):
+    if limit is not None and not 0 < limit <= BATCHED_READ_MAX_KEYS:
+        validator._raise_invalid_fields(
+            LIMIT, limit,
+            'should be from 1 to {}'.format(BATCHED_READ_MAX_KEYS))
+
 
 class ClientClaimDefSubmitOperation(MessageValidator):
     schema = (
@@ -179,6 +302,7 @@ class ClientClaimDefGetOperation(MessageValidator):
         (REF, TxnSeqNoField()),
         (ORIGIN, IdentifierField()),
         (SIGNATURE_TYPE, LimitedLengthStringField(max_length=SIGNATURE_TYPE_FIELD_LIMIT)),
+        (PASS_STATE_VALUE, BooleanField(optional=True)),
     )
 
 
@@ -217,6 +341,10 @@ class ClientOperationField(PClientOperationField):
         GET_CLAIM_DEF: ClientClaimDefGetOperation(),
         DISCLO: ClientDiscloOperation(),
         GET_NYM: ClientGetNymOperation(),
+        GET_NYMS: ClientGetNymsOperation(),
+        GET_ATTRS: ClientGetAttrsOperation(),
+        GET_SCHEMAS: ClientGetSchemasOperation(),
+        GET_CLAIM_DEFS: ClientGetClaimDefsOperation(),
         GET_SCHEMA: ClientGetSchemaOperation(),
         POOL_UPGRADE: ClientPoolUpgradeOperation(),
         POOL_CONFIG: ClientPoolConfigOperation(),
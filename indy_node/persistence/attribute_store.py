@@ -1,24 +1,168 @@
+import os
+import time
+import zlib
+from contextlib import contextmanager
+
 from storage.kv_store import KeyValueStorage
 
+from indy_common.latency_histogram import LatencyHistogram
+from indy_node.persistence.lru_cache import LRUCache
+
 
 class AttributeStore:
     """
     Stores attributes as key value pair where the key is hash of the
     attribute as stored in ledger and value is the actual value if the attribute
+    Values larger than `compressionThreshold` bytes are stored compressed
+    with a header telling the format, the header starts with a byte which
+    never appears in UTF-8 so values stored verbatim (including the ones
+    written before compression was introduced) are read as is
+    Values are immutable (the key is their hash), so the ones already read
+    are kept in a small read-through cache, and a whole set of values can
+    be read in one pass in sorted key order with `getMany` or `prefetched`
     """
 
-    def __init__(self, keyValueStorage: KeyValueStorage):
+    DEFAULT_COMPRESSION_THRESHOLD = 1024
+    DEFAULT_CACHE_SIZE = 1000
+    COMPRESSED_MARKER = b'\xff'
+    FORMAT_ZLIB = b'\x01'
+
+    def __init__(self, keyValueStorage: KeyValueStorage,
+                 compressionThreshold=DEFAULT_COMPRESSION_THRESHOLD,
+                 cacheSize=DEFAULT_CACHE_SIZE):
         self._keyValueStorage = keyValueStorage
+        self.compressionThreshold = compressionThreshold
+        self._cache = LRUCache(cacheSize)
+        self._prefetched = {}
+        # Counted for values set since the store was opened
+        self._setCount = 0
+        self._compressedCount = 0
+        self._rawBytes = 0
+        self._storedBytes = 0
+        # Durations of reads of values not in the cache from the db
+        self.readLatency = LatencyHistogram()
+
+    @staticmethod
+    def packValue(value, compressionThreshold=DEFAULT_COMPRESSION_THRESHOLD):
+        if isinstance(value, str):
+            value = value.encode()
+        if compressionThreshold is None or len(value) < compressionThreshold:
+            return value
+        compressed = AttributeStore.COMPRESSED_MARKER + \
+            AttributeStore.FORMAT_ZLIB + zlib.compress(value)
+        # Not compressible data is kept as is
+        return compressed if len(compressed) < len(value) else value
+
+    @staticmethod
+    def unpackValue(stored) -> str:
+        stored = bytes(stored)
+        if stored[:1] != AttributeStore.COMPRESSED_MARKER:
+            return stored.decode()
+        fmt = stored[1:2]
+        if fmt == AttributeStore.FORMAT_ZLIB:
+            return zlib.decompress(stored[2:]).decode()
+        raise ValueError('Unknown attribute compression format {}'
+                         .format(fmt))
+
+    def _pack(self, value):
+        packed = self.packValue(value, self.compressionThreshold)
+        self._setCount += 1
+        self._rawBytes += len(value.encode() if isinstance(value, str)
+                              else value)
+        self._storedBytes += len(packed)
+        if packed[:1] == self.COMPRESSED_MARKER:
+            self._compressedCount += 1
+        return packed
 
     def set(self, key, value):
-        self._keyValueStorage.put(key, value)
+        self._keyValueStorage.put(key, self._pack(value))
+        self._forget(key)
+
+    def setMany(self, values):
+        """
+        Sets the values of a dict of key -> value in one write batch
+        """
+        self._keyValueStorage.setBatch([(key, self._pack(value))
+                                        for key, value in values.items()])
+        for key in values:
+            self._forget(key)
 
     def get(self, key):
-        val = self._keyValueStorage.get(key)
-        return val.decode()
+        if key in self._prefetched:
+            return self._prefetched[key]
+        value = self._cache.get(key)
+        if value is None:
+            start = time.perf_counter()
+            try:
+                value = self.unpackValue(self._keyValueStorage.get(key))
+            finally:
+                self.readLatency.add(time.perf_counter() - start)
+            self._cache.put(key, value)
+        return value
+
+    def getMany(self, keys) -> dict:
+        """
+        Reads values for all the keys visiting the db in sorted key order,
+        keys absent in the store are absent in the result
+        """
+        values = {}
+        for key in sorted(set(keys)):
+            value = self._cache.get(key)
+            if value is None:
+                # Not put in the cache, a large batch would just evict
+                # everything else from it
+                try:
+                    value = self.unpackValue(self._keyValueStorage.get(key))
+                except KeyError:
+                    continue
+            values[key] = value
+        return values
+
+    @contextmanager
+    def prefetched(self, keys):
+        """
+        Within the context `get` for any of the keys touches neither the db
+        nor the cache, no matter how many keys there are
+        """
+        self._prefetched = self.getMany(keys)
+        try:
+            yield
+        finally:
+            self._prefetched = {}
 
     def remove(self, key):
         self._keyValueStorage.remove(key)
+        self._forget(key)
+
+    def _forget(self, key):
+        self._cache.remove(key)
+        self._prefetched.pop(key, None)
 
     def close(self):
         self._keyValueStorage.close()
+
+    @property
+    def dbSize(self):
+        """
+        Size of the db files in bytes, 0 for not file based dbs
+        """
+        # In memory storages have `db_path` as a method
+        path = getattr(self._keyValueStorage, 'db_path', None)
+        if not isinstance(path, str) or not os.path.isdir(path):
+            return 0
+        return sum(os.path.getsize(os.path.join(path, name))
+                   for name in os.listdir(path))
+
+    @property
+    def stats(self):
+        return {
+            'db_size': self.dbSize,
+            'set': self._setCount,
+            'compressed': self._compressedCount,
+            'raw_bytes': self._rawBytes,
+            'stored_bytes': self._storedBytes,
+            'compression_ratio': self._rawBytes / self._storedBytes
+            if self._storedBytes else None,
+            'cache': self._cache.stats,
+            'read_latency': self.readLatency.stats,
+        }
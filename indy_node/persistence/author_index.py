@@ -0,0 +1,164 @@
+from plenum.common.constants import THREE_PC_PREFIX
+from storage.kv_store import KeyValueStorage
+from storage.optimistic_kv_store import OptimisticKVStore
+from stp_core.common.log import getlogger
+
+from indy_node.persistence.storage_utils import iterate_from
+
+logger = getlogger()
+
+
+class AuthorIndex(OptimisticKVStore):
+    """
+    Secondary index of the domain state which allows to list SCHEMAs of an
+    author DID and CLAIM_DEFs of a schema page by page, the state keys only
+    support exact lookups
+    The key is a prefix telling what is listed followed by a suffix telling
+    the entry apart, keys sharing a prefix are neighbours in the db:
+        S:<author DID>:<schema name>:<schema version>
+        C:<schema seq no>:<author DID>:<signature type>
+    The value is the state path of the indexed SCHEMA or CLAIM_DEF, so the
+    values themselves and their proofs come from the state
+    Like in IdrCache uncommitted entries are kept in memory, the db is only
+    written when a batch is committed, together with the state root the
+    committed entries correspond to
+    """
+
+    SCHEMA_PREFIX = 'S'
+    CLAIM_DEF_PREFIX = 'C'
+    STATE_ROOT_KEY = b'\x00committedStateRoot'
+
+    def __init__(self, name, keyValueStorage: KeyValueStorage):
+        self._keyValueStorage = keyValueStorage
+        super().__init__(self._keyValueStorage)
+        self._name = name
+
+    def __repr__(self):
+        return self._name
+
+    @staticmethod
+    def schemasPrefix(author) -> str:
+        return '{}:{}:'.format(AuthorIndex.SCHEMA_PREFIX, author)
+
+    @staticmethod
+    def claimDefsPrefix(schemaSeqNo) -> str:
+        return '{}:{}:'.format(AuthorIndex.CLAIM_DEF_PREFIX, schemaSeqNo)
+
+    @staticmethod
+    def schemaKey(author, schemaName, schemaVersion) -> bytes:
+        return '{}{}:{}'.format(AuthorIndex.schemasPrefix(author),
+                                schemaName, schemaVersion).encode()
+
+    @staticmethod
+    def claimDefKey(author, schemaSeqNo, signatureType) -> bytes:
+        return '{}{}:{}'.format(AuthorIndex.claimDefsPrefix(schemaSeqNo),
+                                author, signatureType).encode()
+
+    def addSchema(self, author, schemaName, schemaVersion, path,
+                  isCommitted=False):
+        self.set(self.schemaKey(author, schemaName, schemaVersion), path,
+                 is_committed=isCommitted)
+
+    def addClaimDef(self, author, schemaSeqNo, signatureType, path,
+                    isCommitted=False):
+        self.set(self.claimDefKey(author, schemaSeqNo, signatureType), path,
+                 is_committed=isCommitted)
+
+    def listSchemas(self, author, start=None, limit=None):
+        """
+        Committed SCHEMAs of the author ordered by name and version
+
+        :param start: `next` returned for the previous page
+        :return: list of (schema name, schema version, state path) and the
+            position of the next page, None if this page is the last one
+        """
+        entries, nextStart = self._page(self.schemasPrefix(author),
+                                        start, limit)
+        # Versions have no colons, names may have
+        return [tuple(suffix.rsplit(':', 1)) + (path,)
+                for suffix, path in entries], nextStart
+
+    def listClaimDefs(self, schemaSeqNo, start=None, limit=None):
+        """
+        Committed CLAIM_DEFs of the schema ordered by author and signature
+        type
+
+        :param start: `next` returned for the previous page
+        :return: list of (author DID, signature type, state path) and the
+            position of the next page, None if this page is the last one
+        """
+        entries, nextStart = self._page(self.claimDefsPrefix(schemaSeqNo),
+                                        start, limit)
+        # DIDs have no colons
+        return [tuple(suffix.split(':', 1)) + (path,)
+                for suffix, path in entries], nextStart
+
+    def _page(self, prefix, start, limit):
+        prefix = prefix.encode()
+        first = prefix + (start or '').encode()
+        entries = []
+        for key, path in iterate_from(self._keyValueStorage, first):
+            key = bytes(key)
+            if not key.startswith(prefix):
+                break
+            suffix = key[len(prefix):].decode()
+            if limit is not None and len(entries) == limit:
+                return entries, suffix
+            entries.append((suffix, bytes(path)))
+        return entries, None
+
+    def commit_batch(self):
+        if not self.un_committed:
+            raise ValueError
+        batch_idr, ops = self.un_committed[0]
+        batch = list(ops.items())
+        batch.append((self.STATE_ROOT_KEY, batch_idr))
+        self._keyValueStorage.setBatch(batch)
+        self.un_committed = self.un_committed[1:]
+        return batch_idr
+
+    @property
+    def committedStateRoot(self):
+        """
+        State root the committed entries correspond to, None if the index
+        has never been committed or built
+        """
+        try:
+            return bytes(self._keyValueStorage.get(self.STATE_ROOT_KEY))
+        except KeyError:
+            return None
+
+    def setCommittedBatch(self, entries, stateRoot):
+        """
+        Writes committed entries, given as a dict of key -> state path, and
+        the state root they correspond to in one write batch
+        """
+        batch = list(entries.items())
+        batch.append((self.STATE_ROOT_KEY, stateRoot))
+        self._keyValueStorage.setBatch(batch)
+
+    def setCommittedStateRoot(self, stateRoot):
+        """
+        Used when committed entries are written directly, not through
+        batches
+        """
+        self._keyValueStorage.put(self.STATE_ROOT_KEY, stateRoot)
+
+    def close(self):
+        self._keyValueStorage.close()
+
+    def currentBatchCreated(self, stateRoot):
+        super().create_batch_from_current(stateRoot)
+
+    def batchRejected(self):
+        self.reject_batch()
+
+    def onBatchCommitted(self, stateRoot):
+        batch_idr = super().first_batch_idr
+        if batch_idr != stateRoot:
+            logger.warning('{}{} is trying to commit a batch with state root'
+                           ' {} but the first uncommitted one is {}'
+                           .format(THREE_PC_PREFIX, self, stateRoot,
+                                   batch_idr))
+            return
+        self.commit_batch()
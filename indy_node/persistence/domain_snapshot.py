@@ -0,0 +1,365 @@
+import os
+import shutil
+import struct
+import time
+from hashlib import sha256
+
+import rlp
+from common.serializers.msgpack_serializer import MsgPackSerializer
+from common.serializers.serialization import state_roots_serializer
+from crypto.bls.bls_multi_signature import MultiSignature
+from plenum.common.constants import DOMAIN_LEDGER_ID
+from plenum.common.types import f
+from state.pruning_state import PruningState
+from state.trie.pruning_trie import BLANK_ROOT
+from state.util.utils import sha3
+from storage.kv_store import KeyValueStorage
+
+from indy_common.state import domain
+from indy_node.persistence.attribute_store import AttributeStore
+from indy_node.persistence.author_index import AuthorIndex
+from indy_node.persistence.domain_stores_rebuilder import \
+    DomainStoresRebuilder
+from indy_node.persistence.idr_cache import IdrCache
+
+SNAPSHOT_LEDGER = 'ledger'
+SNAPSHOT_STATE = 'state'
+SNAPSHOT_ATTRS = 'attrs'
+
+MANIFEST_VERSION = 'version'
+MANIFEST_SEQ_NO = 'seq_no'
+MANIFEST_STATE_ROOT = 'state_root'
+MANIFEST_LEDGER_ROOT = 'ledger_root'
+MANIFEST_MULTI_SIG = 'multi_sig'
+MANIFEST_CHUNKS = 'chunks'
+CHUNK_STORE = 'store'
+CHUNK_COUNT = 'count'
+CHUNK_HASH = 'hash'
+CHUNK_ITEMS = 'items'
+
+snapshot_serializer = MsgPackSerializer()
+
+
+def stateNodes(keyValueStorage: KeyValueStorage, root: bytes):
+    """
+    Trie nodes of the state with the root as (node hash, rlp encoded node),
+    nodes of older roots are not included
+
+    :raises ValueError: if a node is not in the storage
+    """
+    if root == BLANK_ROOT:
+        return
+    seen = set()
+    refs = [root]
+    while refs:
+        ref = refs.pop()
+        if isinstance(ref, list):
+            # A node shorter than its hash is embedded in its parent
+            refs.extend(_childRefs(ref))
+            continue
+        if not ref or ref in seen:
+            continue
+        seen.add(ref)
+        try:
+            encoded = bytes(keyValueStorage.get(ref))
+        except KeyError:
+            raise ValueError('trie node {} is missing'.format(ref.hex()))
+        yield ref, encoded
+        refs.extend(_childRefs(rlp.decode(encoded)))
+
+
+def _childRefs(node):
+    if len(node) == 17:
+        # Branch, the last item is the value
+        return node[:16]
+    if len(node) == 2 and not (node[0][0] >> 4) & 2:
+        # Extension, a leaf has the terminator flag in its path
+        return node[1:]
+    return []
+
+
+class DomainSnapshotWriter:
+    """
+    Writes a snapshot of the committed domain ledger, state and attribute
+    values to a single file: a manifest with the seq no, the state root,
+    the ledger root, the BLS multi-signature of the state root if there is
+    one and the hash of every chunk, followed by the chunks of key-value
+    pairs of each store, `chunkSize` pairs per chunk. Only the trie nodes of
+    the committed state root are written, older roots are not in the
+    snapshot. IdrCache and AuthorIndex are not written, they are rebuilt
+    from the ledger on import.
+    """
+
+    VERSION = 2
+    MAGIC = b'INDY-DOMAIN-SNAPSHOT\n'
+    _length = struct.Struct('>I')
+
+    def __init__(self, chunkSize=10000):
+        self.chunkSize = chunkSize
+
+    def write(self, path, ledger, stateStorage: KeyValueStorage,
+              attrStorage: KeyValueStorage, multiSig=None):
+        """
+        :param ledger: domain ledger, the snapshot is at its size
+        :param stateStorage: key-value storage of the domain state
+        :param attrStorage: key-value storage of the AttributeStore
+        :param multiSig: BLS multi-signature of the state root as dict
+        :return: the manifest
+        """
+        stateRoot = bytes(stateStorage.get(PruningState.rootHashKey))
+        seqNo = ledger.size
+        chunks = []
+        # Chunks are hashed as they are written, the manifest goes first so
+        # they are written to a temporary file and appended to it
+        tmpPath = path + '.chunks'
+        with open(tmpPath, 'wb') as tmp:
+            sources = [(SNAPSHOT_LEDGER, self._ledgerEntries(ledger, seqNo)),
+                       (SNAPSHOT_STATE, stateNodes(stateStorage, stateRoot)),
+                       (SNAPSHOT_ATTRS, self._pairs(attrStorage))]
+            for name, items in sources:
+                for chunk in self._chunked(items):
+                    payload = snapshot_serializer.serialize(
+                        {CHUNK_STORE: name, CHUNK_ITEMS: chunk})
+                    self._writeRecord(tmp, payload)
+                    chunks.append({CHUNK_STORE: name,
+                                   CHUNK_COUNT: len(chunk),
+                                   CHUNK_HASH: sha256(payload).hexdigest()})
+        manifest = {
+            MANIFEST_VERSION: self.VERSION,
+            MANIFEST_SEQ_NO: seqNo,
+            MANIFEST_STATE_ROOT: state_roots_serializer.serialize(stateRoot),
+            MANIFEST_LEDGER_ROOT: ledger.root_hash,
+            MANIFEST_MULTI_SIG: multiSig,
+            MANIFEST_CHUNKS: chunks,
+        }
+        try:
+            with open(path, 'wb') as f:
+                f.write(self.MAGIC)
+                self._writeRecord(f, snapshot_serializer.serialize(manifest))
+                with open(tmpPath, 'rb') as tmp:
+                    shutil.copyfileobj(tmp, f)
+        finally:
+            os.remove(tmpPath)
+        return manifest
+
+    @staticmethod
+    def _ledgerEntries(ledger, seqNo):
+        # Txns as they are stored, the ledger recomputes the tree from them
+        for key, entry in ledger._transactionLog.iterator():
+            if int(key) > seqNo:
+                return
+            yield [int(key), bytes(entry)]
+
+    @staticmethod
+    def _pairs(storage):
+        for key, value in storage.iterator():
+            yield [key if isinstance(key, str) else bytes(key),
+                   value if isinstance(value, str) else bytes(value)]
+
+    def _chunked(self, items):
+        chunk = []
+        for item in items:
+            chunk.append(list(item))
+            if len(chunk) >= self.chunkSize:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    @classmethod
+    def _writeRecord(cls, f, payload):
+        f.write(cls._length.pack(len(payload)))
+        f.write(payload)
+
+
+class DomainSnapshotReader:
+    """
+    Reads a snapshot written by `DomainSnapshotWriter`. Nothing in the
+    snapshot is trusted but the BLS multi-signature of the pool for the
+    state root and the ledger root, which is verified before anything is
+    written. Every chunk is checked with its hash in the manifest, which
+    only tells a damaged file, every trie node with the hash it is stored
+    under and every attribute value with its key. The ledger root and the
+    completeness of the state trie are checked after everything is
+    written, IdrCache and AuthorIndex are then rebuilt from the ledger.
+    The stores are to be new ones which replace the node's stores only if
+    the import succeeds.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        magic = self._file.read(len(DomainSnapshotWriter.MAGIC))
+        if magic != DomainSnapshotWriter.MAGIC:
+            self.close()
+            raise ValueError('{} is not a domain snapshot'.format(path))
+        payload = self._readRecord()
+        if payload is None:
+            self.close()
+            raise ValueError('manifest of {} is truncated'.format(path))
+        self.manifest = snapshot_serializer.deserialize(payload)
+        if self.manifest[MANIFEST_VERSION] != DomainSnapshotWriter.VERSION:
+            self.close()
+            raise ValueError('snapshot version {} is not supported'
+                             .format(self.manifest[MANIFEST_VERSION]))
+        self.stats = {
+            'seq_no': self.manifest[MANIFEST_SEQ_NO],
+            'txns_added': 0,
+            'state_nodes': 0,
+            'attrs': 0,
+            'nyms': 0,
+            'seconds': 0.0,
+        }
+
+    @property
+    def stateRoot(self) -> bytes:
+        return state_roots_serializer.deserialize(
+            self.manifest[MANIFEST_STATE_ROOT])
+
+    @property
+    def multiSig(self):
+        """
+        BLS multi-signature of the pool for the state root, None if the
+        snapshot has none
+
+        :raises ValueError: if it is not for the state root and the ledger
+            root of the snapshot
+        """
+        data = self.manifest[MANIFEST_MULTI_SIG]
+        if data is None:
+            return None
+        multiSig = MultiSignature.from_dict(**data)
+        if multiSig.value.ledger_id != DOMAIN_LEDGER_ID or \
+                multiSig.value.state_root_hash != \
+                self.manifest[MANIFEST_STATE_ROOT] or \
+                multiSig.value.txn_root_hash != \
+                self.manifest[MANIFEST_LEDGER_ROOT]:
+            raise ValueError('multi-signature of the snapshot is not for its '
+                             'state root and ledger root')
+        return multiSig
+
+    def verifyMultiSig(self, multiSigVerifier):
+        """
+        :param multiSigVerifier: PoolMultiSigVerifier with the keys of the
+            pool
+        :raises ValueError: if the snapshot has no multi-signature or it is
+            not valid with the keys of the pool
+        """
+        multiSig = self.multiSig
+        if multiSig is None:
+            raise ValueError('snapshot has no multi-signature')
+        if not multiSigVerifier.verify(multiSig):
+            raise ValueError('multi-signature of the snapshot is not valid '
+                             'with the BLS keys of the pool')
+
+    def importInto(self, ledger, stateStorage: KeyValueStorage,
+                   attrStorage: KeyValueStorage,
+                   idrCacheStorage: KeyValueStorage,
+                   authorIndexStorage: KeyValueStorage,
+                   multiSigVerifier=None):
+        """
+        Writes the snapshot to new, empty stores of a node
+
+        :param multiSigVerifier: PoolMultiSigVerifier the multi-signature is
+            verified with before anything is written, None to import a
+            snapshot which is not verified
+        :return: stats of the import
+        :raises ValueError: if the snapshot is not valid, the stores are
+            then to be dropped
+        """
+        start = time.perf_counter()
+        if multiSigVerifier is not None:
+            self.verifyMultiSig(multiSigVerifier)
+        if ledger.size:
+            raise ValueError('ledger has {} txns, it is to be empty'
+                             .format(ledger.size))
+        for index, expected in enumerate(self.manifest[MANIFEST_CHUNKS]):
+            payload = self._readRecord()
+            if payload is None or \
+                    sha256(payload).hexdigest() != expected[CHUNK_HASH]:
+                raise ValueError('chunk {} of the snapshot is corrupted'
+                                 .format(index))
+            chunk = snapshot_serializer.deserialize(payload)
+            name, items = chunk[CHUNK_STORE], chunk[CHUNK_ITEMS]
+            if name == SNAPSHOT_LEDGER:
+                self._addTxns(ledger, items)
+            elif name == SNAPSHOT_STATE:
+                stateStorage.setBatch(self._checkedStateNodes(items))
+                self.stats['state_nodes'] += len(items)
+            elif name == SNAPSHOT_ATTRS:
+                attrStorage.setBatch(self._checkedAttrs(items))
+                self.stats['attrs'] += len(items)
+            else:
+                raise ValueError('store {} of the snapshot is not known'
+                                 .format(name))
+        self._check(ledger, stateStorage)
+        stateStorage.put(PruningState.rootHashKey, self.stateRoot)
+        self._rebuildStores(ledger, idrCacheStorage, authorIndexStorage)
+        self.stats['seconds'] = time.perf_counter() - start
+        return self.stats
+
+    def _addTxns(self, ledger, items):
+        for seqNo, entry in items:
+            if seqNo != ledger.size + 1:
+                raise ValueError('txn {} of the snapshot follows txn {}'
+                                 .format(seqNo, ledger.size))
+            ledger.add(ledger.txn_serializer.deserialize(entry))
+            self.stats['txns_added'] += 1
+
+    @staticmethod
+    def _checkedStateNodes(items):
+        nodes = []
+        for key, node in items:
+            if sha3(node) != key:
+                raise ValueError('trie node {} of the snapshot does not '
+                                 'match its hash'.format(key.hex()))
+            nodes.append((key, node))
+        return nodes
+
+    @staticmethod
+    def _checkedAttrs(items):
+        attrs = []
+        for key, stored in items:
+            key = key if isinstance(key, str) else bytes(key).decode()
+            if domain.hash_of(AttributeStore.unpackValue(stored)) != key:
+                raise ValueError('attribute {} of the snapshot does not '
+                                 'match its hash'.format(key))
+            attrs.append((key, stored))
+        return attrs
+
+    def _check(self, ledger, stateStorage):
+        if ledger.size != self.manifest[MANIFEST_SEQ_NO] or \
+                ledger.root_hash != self.manifest[MANIFEST_LEDGER_ROOT]:
+            raise ValueError('ledger of {} txns with root {} does not match '
+                             'the snapshot'.format(ledger.size,
+                                                   ledger.root_hash))
+        reachable = sum(1 for _ in stateNodes(stateStorage, self.stateRoot))
+        if reachable != self.stats['state_nodes']:
+            raise ValueError('snapshot has {} trie nodes, {} of them are in '
+                             'the state'.format(self.stats['state_nodes'],
+                                                reachable))
+
+    def _rebuildStores(self, ledger, idrCacheStorage, authorIndexStorage):
+        rebuilder = DomainStoresRebuilder(
+            idrCacheStorage=idrCacheStorage,
+            authorIndexStorage=authorIndexStorage)
+        stats = rebuilder.rebuild(self._ledgerTxns(ledger))
+        self.stats['nyms'] = stats['nyms']
+        idrCacheStorage.put(IdrCache.STATE_ROOT_KEY, self.stateRoot)
+        authorIndexStorage.put(AuthorIndex.STATE_ROOT_KEY, self.stateRoot)
+
+    @staticmethod
+    def _ledgerTxns(ledger):
+        for seqNo, txn in ledger.getAllTxn():
+            txn[f.SEQ_NO.nm] = seqNo
+            yield txn
+
+    def _readRecord(self):
+        header = self._file.read(DomainSnapshotWriter._length.size)
+        if len(header) < DomainSnapshotWriter._length.size:
+            return None
+        length, = DomainSnapshotWriter._length.unpack(header)
+        payload = self._file.read(length)
+        return payload if len(payload) == length else None
+
+    def close(self):
+        self._file.close()
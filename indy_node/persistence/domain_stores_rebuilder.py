@@ -0,0 +1,206 @@
+import time
+
+from plenum.common.constants import TXN_TYPE, TARGET_NYM, VERKEY, \
+    TXN_TIME, RAW, ENC, DATA, NAME, VERSION
+from plenum.common.types import f
+from storage.kv_store import KeyValueStorage
+from stp_core.common.log import getlogger
+
+from indy_common.constants import NYM, ATTRIB, ROLE, SCHEMA, CLAIM_DEF, \
+    REF, SIGNATURE_TYPE
+from indy_common.state import domain
+from indy_node.persistence.attribute_store import AttributeStore
+from indy_node.persistence.author_index import AuthorIndex
+from indy_node.persistence.idr_cache import IdrCache
+
+logger = getlogger()
+
+
+class DomainStoresRebuilder:
+    """
+    Rebuilds the IdrCache, AttributeStore and AuthorIndex databases of a
+    stopped node
+    from domain txns without replaying them through the request handler:
+    neither the state trie nor the uncommitted views are touched, entries
+    are collected in memory and written with one write batch per
+    `batchSize` txns.
+
+    The seq no of the last applied txn is written in the same batch, so an
+    interrupted rebuild resumes from it. Re-applying txns after it is safe
+    as the result depends only on the order of txns.
+
+    The ledger keeps only hashes of RAW and ENC attributes, so the
+    AttributeStore can only be rebuilt from txns with the attribute values,
+    like the ones of the read replica feed.
+    """
+
+    CHECKPOINT_KEY = b'\x00rebuiltTillSeqNo'
+
+    def __init__(self,
+                 idrCacheStorage: KeyValueStorage=None,
+                 attrStorage: KeyValueStorage=None,
+                 batchSize=10000,
+                 attrCompressionThreshold=AttributeStore.DEFAULT_COMPRESSION_THRESHOLD,
+                 authorIndexStorage: KeyValueStorage=None):
+        assert idrCacheStorage or attrStorage or authorIndexStorage, \
+            'nothing to rebuild'
+        self.idrCacheStorage = idrCacheStorage
+        self.attrStorage = attrStorage
+        self.authorIndexStorage = authorIndexStorage
+        self.batchSize = batchSize
+        self.attrCompressionThreshold = attrCompressionThreshold
+        self._nyms = {}
+        self._attrs = {}
+        self._indexEntries = {}
+        self._pendingTxns = 0
+        self.stats = {
+            'txns': 0,
+            'nyms': 0,
+            'attrs': 0,
+            'schemas': 0,
+            'claim_defs': 0,
+            'skipped': 0,
+            'seconds': 0.0,
+            'txns_per_second': None,
+        }
+
+    @property
+    def _storages(self):
+        return [s for s in (self.idrCacheStorage, self.attrStorage,
+                            self.authorIndexStorage) if s]
+
+    @property
+    def checkpoint(self):
+        """
+        Seq no of the last txn applied to all of the rebuilt stores
+        """
+        seqNos = []
+        for storage in self._storages:
+            try:
+                seqNos.append(int(storage.get(self.CHECKPOINT_KEY)))
+            except KeyError:
+                return 0
+        return min(seqNos)
+
+    def rebuild(self, txns):
+        """
+        :param txns: iterable of domain txns ordered by seq no
+        :return: stats of the rebuild
+        """
+        start = time.perf_counter()
+        checkpoint = self.checkpoint
+        if checkpoint:
+            logger.info('{} resuming after seq no {}'
+                        .format(self, checkpoint))
+        lastSeqNo = checkpoint
+        for txn in txns:
+            seqNo = txn[f.SEQ_NO.nm]
+            if seqNo <= checkpoint:
+                self.stats['skipped'] += 1
+                continue
+            self._apply(txn)
+            lastSeqNo = seqNo
+            self._pendingTxns += 1
+            if self._pendingTxns >= self.batchSize:
+                self._flush(lastSeqNo)
+                self._reportProgress(start, lastSeqNo)
+        self._flush(lastSeqNo)
+        # Rebuild is complete, the checkpoint is not needed anymore
+        for storage in self._storages:
+            if self.CHECKPOINT_KEY in storage:
+                storage.remove(self.CHECKPOINT_KEY)
+        self._updateThroughput(start)
+        logger.info('{} done: {}'.format(self, self.stats))
+        return self.stats
+
+    def _apply(self, txn):
+        self.stats['txns'] += 1
+        typ = txn.get(TXN_TYPE)
+        if typ == NYM and self.idrCacheStorage:
+            self._applyNym(txn)
+        elif typ == ATTRIB and self.attrStorage:
+            self._applyAttrib(txn)
+        elif typ == SCHEMA and self.authorIndexStorage:
+            self._applySchema(txn)
+        elif typ == CLAIM_DEF and self.authorIndexStorage:
+            self._applyClaimDef(txn)
+
+    def _applyNym(self, txn):
+        # Same merging of the new txn with the existing record as
+        # `DomainReqHandler.updateNym` does
+        nym = txn[TARGET_NYM].encode()
+        existing = self._nyms.get(nym) or self._storedNym(nym)
+        _, _, _, role, verkey = existing or (None,) * 5
+        if ROLE in txn:
+            role = txn[ROLE]
+        if VERKEY in txn:
+            verkey = txn[VERKEY]
+        self._nyms[nym] = (txn[f.SEQ_NO.nm], txn.get(TXN_TIME),
+                           txn.get(f.IDENTIFIER.nm), role, verkey)
+        self.stats['nyms'] += 1
+
+    def _storedNym(self, nym):
+        try:
+            return IdrCache.unpackIdrValue(self.idrCacheStorage.get(nym))
+        except KeyError:
+            return None
+
+    def _applyAttrib(self, txn):
+        if txn.get(RAW) is None and txn.get(ENC) is None:
+            # HASH attributes have nothing in the store
+            return
+        _, value = domain.parse_attr_txn(txn)
+        self._attrs[domain.hash_of(value)] = \
+            AttributeStore.packValue(value, self.attrCompressionThreshold)
+        self.stats['attrs'] += 1
+
+    def _applySchema(self, txn):
+        author = txn[f.IDENTIFIER.nm]
+        name, version = txn[DATA][NAME], txn[DATA][VERSION]
+        self._indexEntries[AuthorIndex.schemaKey(author, name, version)] = \
+            domain.make_state_path_for_schema(author, name, version)
+        self.stats['schemas'] += 1
+
+    def _applyClaimDef(self, txn):
+        author = txn[f.IDENTIFIER.nm]
+        signatureType = txn.get(SIGNATURE_TYPE, 'CL')
+        self._indexEntries[
+            AuthorIndex.claimDefKey(author, txn[REF], signatureType)] = \
+            domain.make_state_path_for_claim_def(author, txn[REF],
+                                                 signatureType)
+        self.stats['claim_defs'] += 1
+
+    def _flush(self, lastSeqNo):
+        checkpoint = (self.CHECKPOINT_KEY, str(lastSeqNo))
+        if self.idrCacheStorage:
+            batch = [(nym, IdrCache.packIdrValue(*value))
+                     for nym, value in self._nyms.items()]
+            batch.append(checkpoint)
+            self.idrCacheStorage.setBatch(batch)
+        if self.attrStorage:
+            batch = list(self._attrs.items())
+            batch.append(checkpoint)
+            self.attrStorage.setBatch(batch)
+        if self.authorIndexStorage:
+            batch = list(self._indexEntries.items())
+            batch.append(checkpoint)
+            self.authorIndexStorage.setBatch(batch)
+        self._nyms.clear()
+        self._attrs.clear()
+        self._indexEntries.clear()
+        self._pendingTxns = 0
+
+    def _updateThroughput(self, start):
+        self.stats['seconds'] = time.perf_counter() - start
+        if self.stats['seconds'] > 0:
+            self.stats['txns_per_second'] = \
+                self.stats['txns'] / self.stats['seconds']
+
+    def _reportProgress(self, start, lastSeqNo):
+        self._updateThroughput(start)
+        logger.info('{} applied txns till seq no {}, {:.0f} txns/sec'
+                    .format(self, lastSeqNo,
+                            self.stats['txns_per_second'] or 0))
+
+    def __repr__(self):
+        return self.__class__.__name__
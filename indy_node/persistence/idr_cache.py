@@ -1,10 +1,15 @@
+import time
+
 import rlp
+from base58 import b58decode, b58encode
 from plenum.common.constants import VERKEY, TRUSTEE, STEWARD, THREE_PC_PREFIX, \
     TXN_TIME
 from plenum.common.types import f
 from storage.kv_store import KeyValueStorage
 
 from indy_common.constants import ROLE, TGB, TRUST_ANCHOR
+from indy_common.latency_histogram import LatencyHistogram
+from indy_node.persistence.lru_cache import LRUCache
 from storage.optimistic_kv_store import OptimisticKVStore
 from stp_core.common.log import getlogger
 
@@ -18,15 +23,34 @@ class IdrCache(OptimisticKVStore):
     The key is the identifier and value is a pack of fields in rlp
     The first item is the trust anchor, the second item is verkey and the
     third item is role
+    Already unpacked values are kept in two bounded LRU caches, one for the
+    committed and one for the uncommitted view, so hot identifiers do not
+    need to be decoded on every lookup
+    Verkeys of the uncommitted view as used to verify signatures, with
+    abbreviated ones expanded, are kept in another LRU cache and dropped
+    for an identifier as soon as its record is changed, rejected or
+    committed
+    The db also keeps the state root the committed data corresponds to, it
+    is written in the same write batch as the data of a committed batch
     """
 
     unsetVerkey = b'-'
+    STATE_ROOT_KEY = b'\x00committedStateRoot'
 
-    def __init__(self, name, keyValueStorage: KeyValueStorage):
+    def __init__(self, name, keyValueStorage: KeyValueStorage,
+                 cacheSize=10000):
         logger.debug('Initializing identity cache {}'.format(name))
         self._keyValueStorage = keyValueStorage
         super().__init__(self._keyValueStorage)
         self._name = name
+        self._committedCache = LRUCache(cacheSize)
+        self._uncommittedCache = LRUCache(cacheSize)
+        self._resolvedVerkeys = LRUCache(cacheSize)
+        # Durations of lookups of records not in the LRU caches
+        self.missLatency = LatencyHistogram()
+        # Incremented on every change of the uncommitted view
+        self._uncommittedVersion = 0
+        self.lookupContext = IdrLookupContext(self)
 
     def __repr__(self):
         return self._name
@@ -72,14 +96,116 @@ class IdrCache(OptimisticKVStore):
 
     def get(self, idr, isCommitted=True):
         idr = idr.encode()
-        value = super().get(idr, is_committed=isCommitted)
-        return self.unpackIdrValue(value)
+        cache = self._committedCache if isCommitted \
+            else self._uncommittedCache
+        unpacked = cache.get(idr)
+        if unpacked is not None:
+            return unpacked
+        start = time.perf_counter()
+        try:
+            value = super().get(idr, is_committed=isCommitted)
+        finally:
+            self.missLatency.add(time.perf_counter() - start)
+        unpacked = self.unpackIdrValue(value)
+        if unpacked is not None:
+            cache.put(idr, unpacked)
+        return unpacked
 
     def set(self, idr, seqNo, txnTime,
             ta=None, role=None, verkey=None, isCommitted=True):
         idr = idr.encode()
         val = self.packIdrValue(seqNo, txnTime, ta, role, verkey)
         super().set(idr, val, is_committed=isCommitted)
+        self._uncommittedCache.remove(idr)
+        self._resolvedVerkeys.remove(idr)
+        self._uncommittedVersion += 1
+        if isCommitted:
+            self._committedCache.remove(idr)
+
+    def remove(self, key, is_committed=False):
+        super().remove(key, is_committed=is_committed)
+        if isinstance(key, str):
+            key = key.encode()
+        self._uncommittedCache.remove(key)
+        self._resolvedVerkeys.remove(key)
+        self._uncommittedVersion += 1
+        if is_committed:
+            self._committedCache.remove(key)
+
+    def reject_batch(self):
+        # The uncommitted view of every key touched by the rejected batch
+        # (and by the not yet created one) changes
+        rejected = [k for k, _ in self.current_batch_ops]
+        if self.un_committed:
+            rejected.extend(self.un_committed[-1][1].keys())
+        super().reject_batch()
+        for idr in rejected:
+            self._uncommittedCache.remove(idr)
+            self._resolvedVerkeys.remove(idr)
+        self._uncommittedVersion += 1
+
+    def commit_batch(self):
+        # Data of the batch and the state root after it are written at once
+        # so the db never has one without the other
+        if not self.un_committed:
+            raise ValueError
+        batch_idr, ops = self.un_committed[0]
+        batch = list(ops.items())
+        batch.append((self.STATE_ROOT_KEY, batch_idr))
+        self._keyValueStorage.setBatch(batch)
+        self.un_committed = self.un_committed[1:]
+        # Committing does not change the uncommitted view, only the
+        # committed one
+        for idr in ops.keys():
+            self._committedCache.remove(idr)
+            self._resolvedVerkeys.remove(idr)
+        return batch_idr
+
+    def setCommittedBatch(self, records, stateRoot):
+        """
+        Writes committed records of many identifiers, given as a dict of
+        identifier -> (seqNo, txnTime, ta, role, verkey), and the state root
+        they correspond to in one write batch
+        """
+        batch = [(idr.encode(), self.packIdrValue(*record))
+                 for idr, record in records.items()]
+        batch.append((self.STATE_ROOT_KEY, stateRoot))
+        self._keyValueStorage.setBatch(batch)
+        for idr, _ in batch[:-1]:
+            self._committedCache.remove(idr)
+            self._uncommittedCache.remove(idr)
+            self._resolvedVerkeys.remove(idr)
+        self._uncommittedVersion += 1
+
+    @property
+    def committedStateRoot(self):
+        """
+        State root the committed data corresponds to, None if it is not
+        known, like for the dbs written before the root was stored
+        """
+        try:
+            return bytes(self._keyValueStorage.get(self.STATE_ROOT_KEY))
+        except KeyError:
+            return None
+
+    def setCommittedStateRoot(self, stateRoot):
+        """
+        Used when committed data is written directly, not through batches
+        """
+        self._keyValueStorage.put(self.STATE_ROOT_KEY, stateRoot)
+
+    @property
+    def uncommittedVersion(self):
+        return self._uncommittedVersion
+
+    @property
+    def cache_stats(self):
+        return {
+            'committed': self._committedCache.stats,
+            'uncommitted': self._uncommittedCache.stats,
+            'resolved-verkeys': self._resolvedVerkeys.stats,
+            'miss-latency': self.missLatency.stats,
+        }
 
     def close(self):
         self._keyValueStorage.close()
@@ -88,7 +214,7 @@ class IdrCache(OptimisticKVStore):
         super().create_batch_from_current(stateRoot)
 
     def batchRejected(self):
-        super().reject_batch()
+        self.reject_batch()
 
     def onBatchCommitted(self, stateRoot):
         # Commit an already created batch
@@ -107,7 +233,7 @@ class IdrCache(OptimisticKVStore):
             return
 
         try:
-            super().commit_batch()
+            self.commit_batch()
         except ValueError:
             logger.warning('{}{} found no uncommitted batch'.
                            format(THREE_PC_PREFIX, self))
@@ -116,6 +242,43 @@ class IdrCache(OptimisticKVStore):
         seqNo, txnTime, ta, role, verkey = self.get(idr, isCommitted=isCommitted)
         return verkey
 
+    def getResolvedVerkey(self, idr):
+        """
+        Verkey of the identifier in the uncommitted view as it is used to
+        verify signatures: an abbreviated verkey is expanded and a
+        cryptonym with an empty verkey is its own verkey
+
+        :return: the full verkey, None if the identifier has no verkey
+        :raises KeyError: if the identifier is not known
+        """
+        key = idr.encode()
+        verkey = self._resolvedVerkeys.get(key)
+        if verkey is None:
+            verkey = self.expandVerkey(
+                idr, self.getVerkey(idr, isCommitted=False))
+            if verkey is not None:
+                self._resolvedVerkeys.put(key, verkey)
+        return verkey
+
+    @staticmethod
+    def expandVerkey(idr, verkey):
+        """
+        Full verkey the same way `DidVerifier` makes it, a verkey which can
+        not be expanded is returned as is for the verifier to reject it
+        """
+        if verkey is None:
+            return None
+        try:
+            if not verkey:
+                if len(b58decode(idr)) == 32:
+                    return idr
+            elif verkey[0] == '~':
+                verkey = b58encode(b58decode(idr) + b58decode(verkey[1:]))
+        except ValueError:
+            pass
+        # Older versions of base58 encode to str
+        return verkey.decode() if isinstance(verkey, bytes) else verkey
+
     def getRole(self, idr, isCommitted=True):
         seqNo, txnTime, ta, role, verkey = self.get(idr, isCommitted=isCommitted)
         return role
@@ -129,9 +292,14 @@ class IdrCache(OptimisticKVStore):
         :return:
         """
         try:
-            seqNo, txnTime, ta, actual_role, verkey = self.get(nym, isCommitted)
+            value = self.get(nym, isCommitted)
         except KeyError:
             return None
+        return self.nymDataFromIdrValue(value, role=role)
+
+    @staticmethod
+    def nymDataFromIdrValue(value, role=None):
+        seqNo, txnTime, ta, actual_role, verkey = value
         if role and role != actual_role:
             return None
         return {
@@ -142,6 +310,12 @@ class IdrCache(OptimisticKVStore):
             TXN_TIME: txnTime or None,
         }
 
+    @staticmethod
+    def ownerFromNymData(nym, nymData):
+        if nymData.get(VERKEY) is None:
+            return nymData[f.IDENTIFIER.nm]
+        return nym
+
     def getTrustee(self, nym, isCommitted=True):
         return self.getNym(nym, TRUSTEE, isCommitted=isCommitted)
 
@@ -172,7 +346,75 @@ class IdrCache(OptimisticKVStore):
     def getOwnerFor(self, nym, isCommitted=True):
         nymData = self.getNym(nym, isCommitted=isCommitted)
         if nymData:
-            if nymData.get(VERKEY) is None:
-                return nymData[f.IDENTIFIER.nm]
-            return nym
+            return self.ownerFromNymData(nym, nymData)
+        logger.error('Nym {} not found'.format(nym))
+
+
+class IdrLookupContext:
+    """
+    Uncommitted view of IdrCache which loads the record of each identifier
+    at most once and shares it between everything looking at the same
+    identifier: client authentication, static and dynamic validation.
+    Everything memoized is dropped as soon as the uncommitted view of the
+    cache changes, so in practice the context lives for one request or for
+    a run of requests in a 3PC batch which do not write NYMs.
+    Returned nym data must not be modified by callers.
+    """
+
+    _missing = object()
+
+    def __init__(self, idrCache: IdrCache, maxSize=1000):
+        self._idrCache = idrCache
+        self._maxSize = maxSize
+        self._values = {}
+        self._nyms = {}
+        self._version = idrCache.uncommittedVersion
+
+    def _refresh(self):
+        version = self._idrCache.uncommittedVersion
+        if version != self._version or len(self._values) >= self._maxSize:
+            self._values.clear()
+            self._nyms.clear()
+            self._version = version
+
+    def _get(self, idr):
+        self._refresh()
+        value = self._values.get(idr)
+        if value is None:
+            try:
+                value = self._idrCache.get(idr, isCommitted=False)
+            except KeyError:
+                value = self._missing
+            self._values[idr] = value
+        return value
+
+    def getVerkey(self, idr):
+        value = self._get(idr)
+        if value is self._missing:
+            raise KeyError(idr)
+        return value[4]
+
+    def getNym(self, nym):
+        value = self._get(nym)
+        if value is self._missing:
+            return None
+        nymData = self._nyms.get(nym)
+        if nymData is None:
+            nymData = IdrCache.nymDataFromIdrValue(value)
+            self._nyms[nym] = nymData
+        return nymData
+
+    def getRole(self, idr):
+        nymData = self.getNym(idr)
+        if nymData is None:
+            raise KeyError(idr)
+        return nymData[ROLE]
+
+    def hasNym(self, nym):
+        return bool(self.getNym(nym))
+
+    def getOwnerFor(self, nym):
+        nymData = self.getNym(nym)
+        if nymData:
+            return IdrCache.ownerFromNymData(nym, nymData)
         logger.error('Nym {} not found'.format(nym))
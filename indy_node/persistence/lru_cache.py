@@ -0,0 +1,75 @@
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    A bounded in-memory map which evicts the least recently used entries
+    once its total size exceeds `maxSize`. By default every entry has size
+    1, `sizeOf` can be given to bound the cache by some other measure, like
+    the number of bytes of the values. Unlike `functools.lru_cache` single
+    entries can be invalidated, which is needed by stores whose content
+    changes on every batch. Keeps hit and miss counters so the owner can
+    report how useful the cache is.
+    """
+
+    def __init__(self, maxSize: int, sizeOf=None):
+        if maxSize < 0:
+            raise ValueError("maxSize should not be negative")
+        self.maxSize = maxSize
+        self._sizeOf = sizeOf or (lambda value: 1)
+        self._items = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    @property
+    def size(self):
+        return self._size
+
+    def get(self, key, default=None):
+        try:
+            value = self._items[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        size = self._sizeOf(value)
+        if size > self.maxSize:
+            self.remove(key)
+            return
+        self.remove(key)
+        self._items[key] = value
+        self._size += size
+        while self._size > self.maxSize:
+            _, evicted = self._items.popitem(last=False)
+            self._size -= self._sizeOf(evicted)
+
+    def remove(self, key):
+        if key in self._items:
+            self._size -= self._sizeOf(self._items.pop(key))
+
+    def clear(self):
+        self._items.clear()
+        self._size = 0
+
+    @property
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'count': len(self._items),
+            'size': self._size,
+            'max_size': self.maxSize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else None,
+        }
@@ -0,0 +1,72 @@
+import struct
+
+from storage.kv_store import KeyValueStorage
+
+from indy_node.persistence.storage_utils import iterate_from
+
+
+class StateRootIndex:
+    """
+    Maps the time of committed domain txns to the committed domain state
+    roots, so the state can be read as of a past time. Nodes of the state
+    trie are never removed, so a past root can be read and proven as the
+    current one.
+    Each committed batch (or txn applied during catchup) is an entry keyed
+    by its txn time and last seq no, the value is the state root before
+    and after it. The state as of time T is the one before the first
+    entry later than T, which is found with one forward seek.
+    """
+
+    ENTRY_PREFIX = b'T'
+    _entryKey = struct.Struct('>QQ')
+    ROOT_SIZE = 32
+    MAX_TIME = 2 ** 64 - 1
+
+    def __init__(self, keyValueStorage: KeyValueStorage):
+        self._keyValueStorage = keyValueStorage
+
+    def _key(self, txnTime, seqNo):
+        return self.ENTRY_PREFIX + self._entryKey.pack(txnTime, seqNo)
+
+    def add(self, txnTime, seqNo, prevRoot, root):
+        self._keyValueStorage.put(self._key(txnTime, seqNo),
+                                  bytes(prevRoot) + bytes(root))
+
+    def _firstEntryFrom(self, start):
+        for key, value in iterate_from(self._keyValueStorage, start):
+            key = bytes(key)
+            if not key.startswith(self.ENTRY_PREFIX):
+                return None, None
+            txnTime, _ = self._entryKey.unpack(key[len(self.ENTRY_PREFIX):])
+            return txnTime, bytes(value)
+        return None, None
+
+    @property
+    def since(self):
+        """
+        Txn time of the earliest entry, the state as of an earlier time is
+        not known
+        """
+        txnTime, _ = self._firstEntryFrom(self.ENTRY_PREFIX)
+        return txnTime
+
+    def rootAt(self, timestamp, latestRoot):
+        """
+        :param latestRoot: the current committed root, the state as of any
+            time after the last entry
+        :return: the committed state root as of the time, None if it is
+            earlier than the earliest entry
+        """
+        since = self.since
+        if since is None or timestamp < since:
+            return None
+        if timestamp >= self.MAX_TIME:
+            # No entry is later than it
+            return latestRoot
+        txnTime, value = self._firstEntryFrom(self._key(timestamp + 1, 0))
+        if txnTime is None:
+            return latestRoot
+        return value[:self.ROOT_SIZE]
+
+    def close(self):
+        self._keyValueStorage.close()
@@ -0,0 +1,14 @@
+from storage.kv_store import KeyValueStorage
+
+
+def iterate_from(keyValueStorage: KeyValueStorage, start: bytes):
+    """
+    Iterates over (key, value) pairs of the store in key order starting
+    from the `start` key
+    """
+    items = keyValueStorage.iterator(start=start)
+    # Key value stores iterate in key order, except the in-memory one
+    # which returns a dict
+    if isinstance(items, dict):
+        items = sorted(items.items())
+    return items
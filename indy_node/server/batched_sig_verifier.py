@@ -0,0 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from plenum.common.exceptions import InsufficientCorrectSignatures
+from plenum.common.verifier import DidVerifier
+
+
+class SignatureChecks:
+    """
+    Signatures of one request which are to be verified later. Used as the
+    verifier by `LedgerBasedAuthNr` while signatures are collected, so the
+    request is fully authenticated (verkeys resolved, message serialised)
+    except the signature check itself, which it takes as successful
+    """
+
+    def __init__(self):
+        self.checks = []
+
+    def verifier(self, verkey, identifier=None):
+        return _RecordingVerifier(self, verkey, identifier)
+
+    def verify(self):
+        """
+        :return: None if all the signatures are correct, the exception the
+            authenticator would have raised otherwise
+        """
+        correct = 0
+        for verkey, identifier, sig, ser in self.checks:
+            try:
+                if not DidVerifier(verkey, identifier=identifier).verify(sig,
+                                                                         ser):
+                    break
+            except Exception as ex:
+                return ex
+            correct += 1
+        else:
+            return None
+        return InsufficientCorrectSignatures(correct, len(self.checks))
+
+
+class _RecordingVerifier:
+    def __init__(self, checks, verkey, identifier):
+        self._checks = checks
+        self._verkey = verkey
+        self._identifier = identifier
+
+    def verify(self, sig, msg) -> bool:
+        self._checks.checks.append((self._verkey, self._identifier, sig, msg))
+        return True
+
+
+class BatchedSigVerifier:
+    """
+    Verifies signatures of the client requests received in one pass over
+    the client stack in a pool of threads, the signature check itself does
+    not hold the GIL. Everything else about authentication is done on the
+    main thread when a request is received.
+    Requests are kept in the order they were received, `verify` returns
+    them in the same order with the result of their verification.
+    """
+
+    def __init__(self, workers: int):
+        self._workers = workers
+        # Threads are started on first use, so the node can be restarted
+        self._executor = None
+        self._pending = []
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, msg, frm, checks: SignatureChecks):
+        self._pending.append((msg, frm, checks))
+
+    def verify(self):
+        """
+        :return: list of (request, sender, None or the exception raised
+            when verifying its signatures) in the order of `add`
+        """
+        pending, self._pending = self._pending, []
+        toVerify = [checks for _, _, checks in pending if checks.checks]
+        if len(toVerify) > 1:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._workers)
+            errors = iter(self._executor.map(SignatureChecks.verify,
+                                             toVerify))
+        else:
+            errors = (checks.verify() for checks in toVerify)
+        return [(msg, frm, next(errors) if checks.checks else None)
+                for msg, frm, checks in pending]
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,322 @@
+import struct
+
+import rlp
+from plenum.common.constants import TXN_TIME
+from plenum.common.types import f
+from stp_core.common.log import getlogger
+
+from indy_node.persistence.author_index import AuthorIndex
+
+logger = getlogger()
+
+
+class CatchupStateApplier:
+    """
+    Applies domain txns received in catchup to the state and the domain
+    stores a chunk of txns at a time, instead of committing the state and
+    writing the stores after every txn:
+    - the values the request handler sets in the state for the txns of one
+    3PC batch (txns with the same time) are collected and set in the trie
+    in sorted key order once the batch ends, a key set by several txns is
+    set once; the root is then taken for the StateRootIndex
+    - the trie nodes are kept in memory until the chunk ends, then only the
+    ones reachable from the roots of the chunk's batches are written in one
+    write batch, the nodes replaced within the chunk never reach the db.
+    Every value set in the chunk is first read back under the final root
+    from the nodes to be written, if that fails all the nodes are written
+    - IdrCache records, attribute values and AuthorIndex entries are written
+    with one write batch per store before the state root is committed
+    The state read by the handler while a chunk is applied is the one with
+    all the previous txns applied, as it is when each txn is committed.
+    The trie itself still hashes every node on update, so most of the gain
+    is in the writes.
+    The seq no of the last txn applied is written with the state root, when
+    a chunk starts and with the trie nodes when it is flushed. A node
+    stopped before the state of a chunk is committed applies its txns again
+    on start, writing to the stores the same records they may already have.
+    """
+
+    # Does not collide with trie nodes, whose keys are hashes
+    APPLIED_KEY = b'catchupAppliedSeqNo'
+    _seqNo = struct.Struct('>Q')
+
+    def __init__(self, reqHandler, chunkSize: int):
+        self._reqHandler = reqHandler
+        self._chunkSize = chunkSize
+        self._nodeDB = None
+        self._txnCount = 0
+        self._firstSeqNo = None
+        self._lastSeqNo = None
+        # Values set by the txns of the current batch and of the chunk
+        self._batchValues = {}
+        self._chunkValues = {}
+        self._batchLastTxn = None
+        self._batchRoots = []
+        self._rootIndexEntries = []
+        self._records = {}
+        self._attrs = {}
+        self._authorIndexEntries = {}
+
+    def __len__(self):
+        return self._txnCount
+
+    @property
+    def _state(self):
+        return self._reqHandler.state
+
+    def add(self, txn):
+        """
+        Applies a committed txn, the chunk is flushed when it is full
+        """
+        if self._nodeDB is None:
+            self._firstSeqNo = txn[f.SEQ_NO.nm]
+            self._markApplied(self._firstSeqNo - 1)
+            self._nodeDB = _BufferedNodeDB(self._state._trie._db)
+            self._state._trie._db = self._nodeDB
+        if self._batchLastTxn is not None and \
+                txn.get(TXN_TIME) != self._batchLastTxn.get(TXN_TIME):
+            self._applyBatch()
+        self._batchLastTxn = txn
+        self._lastSeqNo = txn[f.SEQ_NO.nm]
+        self._applyToHandler(txn)
+        self._txnCount += 1
+        if self._txnCount >= self._chunkSize:
+            self.flush()
+
+    def _applyToHandler(self, txn):
+        handler = self._reqHandler
+        stores = (handler.state, handler.idrCache, handler.attributeStore,
+                  handler.authorIndex)
+        handler.state = _StateView(handler.state, self._batchValues)
+        handler.idrCache = _IdrCacheRecorder(self._records)
+        handler.attributeStore = _AttributeStoreRecorder(self._attrs)
+        if handler.authorIndex:
+            handler.authorIndex = \
+                _AuthorIndexRecorder(self._authorIndexEntries)
+        try:
+            handler._updateStateWithSingleTxn(txn, isCommitted=True)
+        finally:
+            handler.state, handler.idrCache, handler.attributeStore, \
+                handler.authorIndex = stores
+
+    def _applyBatch(self):
+        prevRoot = bytes(self._state.headHash)
+        for key in sorted(self._batchValues):
+            self._state.set(key, self._batchValues[key])
+        root = bytes(self._state.headHash)
+        self._chunkValues.update(self._batchValues)
+        self._batchValues.clear()
+        self._batchRoots.append(root)
+        # Genesis txns have no time
+        txn = self._batchLastTxn
+        if txn.get(TXN_TIME) is not None:
+            self._rootIndexEntries.append((txn[TXN_TIME], txn[f.SEQ_NO.nm],
+                                           prevRoot, root))
+        self._batchLastTxn = None
+
+    def _markApplied(self, seqNo):
+        # Txns of the chunk are applied again if the node stops before the
+        # chunk's state is committed, also for the first chunk of a node
+        # which already had a state
+        if self.appliedSeqNo(self._state) != seqNo:
+            self._state._kv.put(
+                self.APPLIED_KEY,
+                self._seqNo.pack(seqNo) + bytes(self._state.committedHeadHash))
+
+    def flush(self, trustedRoot=None):
+        """
+        Commits the state and writes the stores for the txns applied since
+        the last flush
+
+        :param trustedRoot: state root the txns applied must give, like one
+            signed by the pool, nothing is written and ValueError is raised
+            if the state root is another one
+        """
+        if not self._txnCount:
+            return
+        self._applyBatch()
+        root = self._batchRoots[-1]
+        nodes = self._nodeDB.nodes
+        untrusted = trustedRoot is not None and root != bytes(trustedRoot)
+        if untrusted:
+            # Reverted with the nodes of the chunk still in memory
+            self._state.revertToHead(self._state.committedHeadHash)
+        self._state._trie._db = db = self._nodeDB.db
+        self._nodeDB = None
+        if untrusted:
+            self._clear()
+            raise ValueError('{} got state root {} applying txns till seq no '
+                             '{}, not the trusted root {}'
+                             .format(self, root, self._lastSeqNo,
+                                     bytes(trustedRoot)))
+
+        reachable = _reachableNodes(nodes, self._batchRoots)
+        if not self._readable(root, db, reachable):
+            logger.error('{} values set in catchup are not readable under '
+                         'state root {} from {} of {} new trie nodes, writing '
+                         'all of them'.format(self, root, len(reachable),
+                                              len(nodes)))
+            reachable = nodes
+        # The stores go first, writing them again when the chunk is applied
+        # again gives the same records
+        handler = self._reqHandler
+        if handler.stateRootIndex:
+            for entry in self._rootIndexEntries:
+                handler.stateRootIndex.add(*entry)
+        if self._attrs:
+            handler.attributeStore.setMany(self._attrs)
+        handler.idrCache.setCommittedBatch(self._records, root)
+        if handler.authorIndex:
+            handler.authorIndex.setCommittedBatch(self._authorIndexEntries,
+                                                  root)
+        # Committing the state is writing its root, it is written with the
+        # nodes and the seq no of the last txn applied
+        batch = list(reachable.items())
+        batch.append((self._state.rootHashKey, root))
+        batch.append((self.APPLIED_KEY,
+                      self._seqNo.pack(self._lastSeqNo) + root))
+        db._keyValueStorage.setBatch(batch)
+        logger.debug('{} applied {} txns from seq no {} writing {} of {} new '
+                     'trie nodes'.format(self, self._txnCount,
+                                         self._firstSeqNo,
+                                         len(reachable), len(nodes)))
+        self._clear()
+
+    def _clear(self):
+        self._txnCount = 0
+        self._chunkValues.clear()
+        self._batchRoots.clear()
+        self._rootIndexEntries.clear()
+        self._records.clear()
+        self._attrs.clear()
+        self._authorIndexEntries.clear()
+
+    @classmethod
+    def appliedSeqNo(cls, state):
+        """
+        :return: seq no of the last txn applied to the state by the last
+            flush, or before the chunk being applied, if the state has not
+            been committed since, None otherwise
+        """
+        try:
+            value = bytes(state._kv.get(cls.APPLIED_KEY))
+        except KeyError:
+            return None
+        if value[cls._seqNo.size:] != bytes(state.committedHeadHash):
+            return None
+        return cls._seqNo.unpack(value[:cls._seqNo.size])[0]
+
+    def _readable(self, root, db, nodes) -> bool:
+        trie = self._state._trie
+        trie._db = _BufferedNodeDB(db, nodes)
+        try:
+            return all(self._state.get_for_root_hash(root, key) == value
+                       for key, value in self._chunkValues.items())
+        except KeyError:
+            return False
+        finally:
+            trie._db = db
+
+    def __repr__(self):
+        return self.__class__.__name__
+
+
+def _toBytes(value):
+    return value.encode() if isinstance(value, str) else bytes(value)
+
+
+def _reachableNodes(nodes, roots):
+    """
+    Nodes reachable from the roots, not following the ones not in `nodes`.
+    Items of nodes are not told apart from references to other nodes, a
+    value equal to a node hash only makes that node kept.
+    """
+    reachable = {}
+    stack = list(roots)
+    while stack:
+        item = stack.pop()
+        if isinstance(item, list):
+            stack.extend(item)
+        elif item in nodes and item not in reachable:
+            reachable[item] = nodes[item]
+            stack.extend(rlp.decode(nodes[item]))
+    return reachable
+
+
+class _BufferedNodeDB:
+    """
+    Trie node db keeping the nodes written in memory
+    """
+
+    def __init__(self, db, nodes=None):
+        self.db = db
+        self.nodes = {} if nodes is None else nodes
+
+    def get(self, key):
+        node = self.nodes.get(key)
+        return self.db.get(key) if node is None else node
+
+    def inc_refcount(self, key, value):
+        self.nodes[key] = value
+
+    def dec_refcount(self, key):
+        pass
+
+    def __contains__(self, key):
+        return key in self.nodes or key in self.db
+
+
+class _StateView:
+    """
+    The state as seen by the request handler applying a txn of a batch, with
+    the values set by the previous txns of the batch. Txns applied before
+    are all committed as far as the handler is concerned.
+    """
+
+    def __init__(self, state, values):
+        self._state = state
+        self._values = values
+
+    def set(self, key, value):
+        self._values[_toBytes(key)] = _toBytes(value)
+
+    def get(self, key, isCommitted=True):
+        value = self._values.get(_toBytes(key))
+        if value is not None:
+            return value
+        return self._state.get(key, isCommitted=False)
+
+    def __getattr__(self, name):
+        return getattr(self._state, name)
+
+
+class _IdrCacheRecorder:
+    def __init__(self, records):
+        self._records = records
+
+    def set(self, idr, seqNo, txnTime, ta=None, role=None, verkey=None,
+            isCommitted=True):
+        self._records[idr] = (seqNo, txnTime, ta, role, verkey)
+
+
+class _AttributeStoreRecorder:
+    def __init__(self, values):
+        self._values = values
+
+    def set(self, key, value):
+        self._values[key] = value
+
+
+class _AuthorIndexRecorder:
+    def __init__(self, entries):
+        self._entries = entries
+
+    def addSchema(self, author, schemaName, schemaVersion, path,
+                  isCommitted=False):
+        self._entries[AuthorIndex.schemaKey(author, schemaName,
+                                            schemaVersion)] = path
+
+    def addClaimDef(self, author, schemaSeqNo, signatureType, path,
+                    isCommitted=False):
+        self._entries[AuthorIndex.claimDefKey(author, schemaSeqNo,
+                                              signatureType)] = path
@@ -1,12 +1,12 @@
-from copy import deepcopy
-from hashlib import sha256
-
 from plenum.common.types import OPERATION
-from plenum.common.constants import TXN_TYPE, RAW, ENC, HASH
+from plenum.common.constants import TXN_TYPE
+from plenum.common.verifier import DidVerifier
 from plenum.server.client_authn import NaclAuthNr, CoreAuthNr, CoreAuthMixin
 
 from indy_common.constants import ATTRIB, POOL_UPGRADE, SCHEMA, CLAIM_DEF, \
-    GET_NYM, GET_ATTR, GET_SCHEMA, GET_CLAIM_DEF, POOL_CONFIG
+    GET_NYM, GET_ATTR, GET_SCHEMA, GET_CLAIM_DEF, POOL_CONFIG, GET_NYMS, \
+    GET_ATTRS, GET_SCHEMAS, GET_CLAIM_DEFS
+from indy_common.types import attrib_signing_operation
 from indy_node.persistence.idr_cache import IdrCache
 
 
@@ -18,32 +18,37 @@ class LedgerBasedAuthNr(CoreAuthMixin, NaclAuthNr):
     write_types = CoreAuthMixin.write_types.union({ATTRIB, SCHEMA, CLAIM_DEF,
                                                    POOL_CONFIG, POOL_UPGRADE})
     query_types = CoreAuthMixin.query_types.union({GET_NYM, GET_ATTR, GET_SCHEMA,
-                                                   GET_CLAIM_DEF})
+                                                   GET_CLAIM_DEF, GET_NYMS,
+                                                   GET_ATTRS, GET_SCHEMAS,
+                                                   GET_CLAIM_DEFS})
 
     def __init__(self, cache: IdrCache):
         NaclAuthNr.__init__(self)
         CoreAuthMixin.__init__(self)
         self.cache = cache
+        # `SignatureChecks` collecting signatures of the request being
+        # authenticated to verify them later, see `BatchedSigVerifier`
+        self.deferredChecks = None
 
-    def serializeForSig(self, msg, identifier=None, topLevelKeysToIgnore=None):
+    def authenticate_multi(self, msg, signatures, threshold=None,
+                           verifier=DidVerifier):
         if msg[OPERATION].get(TXN_TYPE) == ATTRIB:
-            msgCopy = deepcopy(msg)
-            keyName = {RAW, ENC, HASH}.intersection(
-                set(msgCopy[OPERATION].keys())).pop()
-            msgCopy[OPERATION][keyName] = sha256(
-                msgCopy[OPERATION][keyName].encode()).hexdigest()
-            return super().serializeForSig(msgCopy, identifier=identifier,
-                                           topLevelKeysToIgnore=topLevelKeysToIgnore)
-        else:
-            return super().serializeForSig(msg, identifier=identifier,
-                                           topLevelKeysToIgnore=topLevelKeysToIgnore)
+            # The data of the attribute is hashed once for all the
+            # signatures
+            msg = {**msg,
+                   OPERATION: attrib_signing_operation(msg[OPERATION])}
+        if self.deferredChecks is not None and threshold is None \
+                and verifier is DidVerifier:
+            verifier = self.deferredChecks.verifier
+        return super().authenticate_multi(msg, signatures,
+                                          threshold=threshold,
+                                          verifier=verifier)
 
     def addIdr(self, identifier, verkey, role=None):
         raise RuntimeError('Add verification keys through the NYM txn')
 
     def getVerkey(self, identifier):
         try:
-            verkey = self.cache.getVerkey(identifier, isCommitted=False)
+            return self.cache.getResolvedVerkey(identifier)
         except KeyError:
             return None
-        return verkey
@@ -1,48 +1,107 @@
-from copy import deepcopy
+from collections import OrderedDict
 from typing import List
 
 import base58
 
+from common.serializers.serialization import proof_nodes_serializer, \
+    state_roots_serializer
 from indy_common.auth import Authoriser
 from indy_common.constants import NYM, ROLE, ATTRIB, SCHEMA, CLAIM_DEF, REF, \
-    GET_NYM, GET_ATTR, GET_SCHEMA, GET_CLAIM_DEF, SIGNATURE_TYPE
+    GET_NYM, GET_ATTR, GET_SCHEMA, GET_CLAIM_DEF, SIGNATURE_TYPE, GET_NYMS, \
+    GET_ATTRS, DESTS, ATTRS, GET_SCHEMAS, GET_CLAIM_DEFS, FROM, LIMIT, NEXT, \
+    BATCHED_READ_MAX_KEYS, PASS_STATE_VALUE, STATE_VALUE, TIMESTAMP, \
+    DOMAIN_STATE_BINARY_VALUES_SINCE_SEQ_NO
 from indy_common.roles import Roles
 from indy_common.state import domain
 from indy_common.types import Request
 from plenum.common.constants import TXN_TYPE, TARGET_NYM, RAW, ENC, HASH, \
     VERKEY, DATA, NAME, VERSION, ORIGIN, \
-    TXN_TIME
+    TXN_TIME, ROOT_HASH, MULTI_SIGNATURE, PROOF_NODES
 from plenum.common.exceptions import InvalidClientRequest, \
     UnauthorizedClientRequest, UnknownIdentifier, InvalidClientMessageException
 from plenum.common.types import f
 from plenum.common.constants import TRUSTEE
 from plenum.server.domain_req_handler import DomainRequestHandler as PHandler
+from state.trie.pruning_trie import Trie
+from state.util.fast_rlp import encode_optimized as rlp_encode
 from stp_core.common.log import getlogger
 
+from indy_node.persistence.author_index import AuthorIndex
+from indy_node.persistence.state_root_index import StateRootIndex
+from indy_node.server.state_proof_cache import StateProofCache
+from indy_node.server.state_value_cache import StateValueCache
+
 logger = getlogger()
 
 
 class DomainReqHandler(PHandler):
     write_types = {NYM, ATTRIB, SCHEMA, CLAIM_DEF}
-    query_types = {GET_NYM, GET_ATTR, GET_SCHEMA, GET_CLAIM_DEF}
+    query_types = {GET_NYM, GET_ATTR, GET_SCHEMA, GET_CLAIM_DEF,
+                   GET_NYMS, GET_ATTRS, GET_SCHEMAS, GET_CLAIM_DEFS}
+    DEFAULT_STATE_PROOF_CACHE_BYTES = 16 * 1024 * 1024
+    DEFAULT_STATE_VALUE_CACHE_BYTES = 16 * 1024 * 1024
 
     def __init__(self, ledger, state, config, requestProcessor,
-                 idrCache, attributeStore, bls_store):
+                 idrCache, attributeStore, bls_store,
+                 authorIndex: AuthorIndex=None,
+                 stateRootIndex: StateRootIndex=None):
         super().__init__(ledger, state, config, requestProcessor, bls_store)
         self.idrCache = idrCache
         self.attributeStore = attributeStore
+        self.authorIndex = authorIndex
+        self.stateRootIndex = stateRootIndex
+        self.proofCache = StateProofCache(
+            getattr(config, 'stateProofCacheMaxBytes',
+                    self.DEFAULT_STATE_PROOF_CACHE_BYTES))
+        # Values of SCHEMAs and CLAIM_DEFs are written once, but for
+        # duplicates ordered before the first write is committed
+        self.writeOnceValueCache = StateValueCache(
+            getattr(config, 'stateValueCacheMaxBytes',
+                    self.DEFAULT_STATE_VALUE_CACHE_BYTES))
+        # seq no -> path of the SCHEMAs and CLAIM_DEFs not committed yet
+        self._uncommittedWriteOncePaths = {}
+        self.binaryStateValuesSinceSeqNo = \
+            DOMAIN_STATE_BINARY_VALUES_SINCE_SEQ_NO
         self.query_handlers = {
             GET_NYM: self.handleGetNymReq,
             GET_ATTR: self.handleGetAttrsReq,
             GET_SCHEMA: self.handleGetSchemaReq,
             GET_CLAIM_DEF: self.handleGetClaimDefReq,
+            GET_NYMS: self.handleGetNymsReq,
+            GET_ATTRS: self.handleGetAttrsBatchReq,
+            GET_SCHEMAS: self.handleGetSchemasReq,
+            GET_CLAIM_DEFS: self.handleGetClaimDefsReq,
         }
 
     def onBatchCreated(self, stateRoot):
         self.idrCache.currentBatchCreated(stateRoot)
+        if self.authorIndex:
+            self.authorIndex.currentBatchCreated(stateRoot)
 
     def onBatchRejected(self):
         self.idrCache.batchRejected()
+        if self.authorIndex:
+            self.authorIndex.batchRejected()
+        # The txns of the batch are discarded from the ledger already
+        if self.ledger is not None:
+            size = self.ledger.uncommitted_size
+            for seqNo in [seqNo for seqNo in self._uncommittedWriteOncePaths
+                          if seqNo > size]:
+                del self._uncommittedWriteOncePaths[seqNo]
+
+    def updateState(self, txns, isCommitted=False):
+        prevRoot = bytes(self.state.committedHeadHash)
+        super().updateState(txns, isCommitted=isCommitted)
+        if isCommitted:
+            self._addToStateRootIndex(txns, prevRoot,
+                                      bytes(self.state.headHash))
+            # Committed txns (from catchup or when recreating state from
+            # ledger) go to the db directly and the state is committed
+            # with its current head right after
+            self.idrCache.setCommittedStateRoot(bytes(self.state.headHash))
+            if self.authorIndex:
+                self.authorIndex.setCommittedStateRoot(
+                    bytes(self.state.headHash))
 
     def _updateStateWithSingleTxn(self, txn, isCommitted=False):
         typ = txn.get(TXN_TYPE)
@@ -61,19 +120,55 @@ class DomainReqHandler(PHandler):
         elif typ == ATTRIB:
             self._addAttr(txn)
         elif typ == SCHEMA:
-            self._addSchema(txn)
+            self._addSchema(txn, isCommitted=isCommitted)
         elif typ == CLAIM_DEF:
-            self._addClaimDef(txn)
+            self._addClaimDef(txn, isCommitted=isCommitted)
         else:
             logger.debug(
                 'Cannot apply request of type {} to state'.format(typ))
 
     def commit(self, txnCount, stateRoot, txnRoot) -> List:
+        prevRoot = bytes(self.state.committedHeadHash)
         r = super().commit(txnCount, stateRoot, txnRoot)
         stateRoot = base58.b58decode(stateRoot.encode())
+        self._addToStateRootIndex(r, prevRoot, stateRoot)
+        self.proofCache.clear()
+        for txn in r:
+            path = self._uncommittedWriteOncePaths.pop(txn[f.SEQ_NO.nm], None)
+            if path is not None:
+                self.writeOnceValueCache.remove(path)
         self.idrCache.onBatchCommitted(stateRoot)
+        if self.authorIndex:
+            self.authorIndex.onBatchCommitted(stateRoot)
         return r
 
+    def _addToStateRootIndex(self, txns, prevRoot, root):
+        if not self.stateRootIndex or not txns:
+            return
+        # Genesis txns have no time
+        lastTxn = txns[-1]
+        if lastTxn.get(TXN_TIME) is not None:
+            self.stateRootIndex.add(lastTxn[TXN_TIME], lastTxn[f.SEQ_NO.nm],
+                                    prevRoot, root)
+
+    def _historicalRoot(self, request: Request):
+        """
+        The committed state root as of the time the request asks for, None
+        if it asks for the current state
+        """
+        timestamp = request.operation.get(TIMESTAMP)
+        if timestamp is None:
+            return None
+        root = None
+        if self.stateRootIndex:
+            root = self.stateRootIndex.rootAt(
+                timestamp, bytes(self.state.committedHeadHash))
+        if root is None:
+            raise InvalidClientRequest(request.identifier, request.reqId,
+                                       'state as of {} is not known'
+                                       .format(timestamp))
+        return root
+
     def doStaticValidation(self, request: Request):
         identifier, req_id, operation = request.identifier, request.reqId, request.operation
         if operation[TXN_TYPE] == NYM:
@@ -101,7 +196,7 @@ class DomainReqHandler(PHandler):
                                        .format(ATTRIB, RAW, ENC, HASH))
         # TODO: This is not static validation as it involves state
         if not (not operation.get(TARGET_NYM) or
-                self.hasNym(operation[TARGET_NYM], isCommitted=False)):
+                self.idrCache.lookupContext.hasNym(operation[TARGET_NYM])):
             raise InvalidClientRequest(identifier, reqId,
                                        '{} should be added before adding '
                                        'attribute for it'.
@@ -128,16 +223,16 @@ class DomainReqHandler(PHandler):
     def _validateNym(self, req: Request):
         origin = req.identifier
         op = req.operation
+        lookup = self.idrCache.lookupContext
 
         try:
-            originRole = self.idrCache.getRole(
-                origin, isCommitted=False) or None
+            originRole = lookup.getRole(origin) or None
         except BaseException:
             raise UnknownIdentifier(
                 req.identifier,
                 req.reqId)
 
-        nymData = self.idrCache.getNym(op[TARGET_NYM], isCommitted=False)
+        nymData = lookup.getNym(op[TARGET_NYM])
         if not nymData:
             # If nym does not exist
             self._validateNewNym(req, op, originRole)
@@ -161,7 +256,7 @@ class DomainReqHandler(PHandler):
         unauthorized = False
         reason = None
         origin = req.identifier
-        owner = self.idrCache.getOwnerFor(op[TARGET_NYM], isCommitted=False)
+        owner = self.idrCache.ownerFromNymData(op[TARGET_NYM], nymData)
         isOwner = origin == owner
 
         if not originRole == TRUSTEE and not isOwner:
@@ -191,17 +286,17 @@ class DomainReqHandler(PHandler):
     def _validateAttrib(self, req: Request):
         origin = req.identifier
         op = req.operation
+        lookup = self.idrCache.lookupContext
 
         if not (not op.get(TARGET_NYM) or
-                self.hasNym(op[TARGET_NYM], isCommitted=False)):
+                lookup.hasNym(op[TARGET_NYM])):
             raise InvalidClientRequest(origin, req.reqId,
                                        '{} should be added before adding '
                                        'attribute for it'.
                                        format(TARGET_NYM))
 
         if op.get(TARGET_NYM) and op[TARGET_NYM] != req.identifier and \
-                not self.idrCache.getOwnerFor(op[TARGET_NYM],
-                                              isCommitted=False) == origin:
+                not lookup.getOwnerFor(op[TARGET_NYM]) == origin:
             raise UnauthorizedClientRequest(
                 req.identifier,
                 req.reqId,
@@ -215,12 +310,9 @@ class DomainReqHandler(PHandler):
         operation = req.operation
         schema_name = operation[DATA][NAME]
         schema_version = operation[DATA][VERSION]
-        schema, _, _, _ = self.getSchema(
-            author=identifier,
-            schemaName=schema_name,
-            schemaVersion=schema_version
-        )
-        if schema:
+        path = domain.make_state_path_for_schema(identifier, schema_name,
+                                                 schema_version)
+        if self._stateValueExists(path):
             raise InvalidClientRequest(identifier, req.reqId,
                                        '{} can have one and only one SCHEMA with '
                                        'name {} and version {}'
@@ -233,17 +325,18 @@ class DomainReqHandler(PHandler):
         operation = req.operation
         schema_ref = operation[REF]
         signature_type = operation[SIGNATURE_TYPE]
-        claim_def, _, _, _ = self.getClaimDef(
-            author=identifier,
-            schemaSeqNo=schema_ref,
-            signatureType=signature_type
-        )
-        if claim_def:
+        path = domain.make_state_path_for_claim_def(identifier, schema_ref,
+                                                    signature_type)
+        if self._stateValueExists(path):
             raise InvalidClientRequest(identifier, req.reqId,
                                        '{} can have one and only one CLAIM_DEF for '
                                        'and schema ref {} and signature type {}'
                                        .format(identifier, schema_ref, signature_type))
 
+    def _stateValueExists(self, path, isCommitted=True):
+        # Neither decodes the value nor makes a state proof for it
+        return self.state.get(path, isCommitted) is not None
+
     def updateNym(self, nym, data, isCommitted=True):
         updatedData = super().updateNym(nym, data, isCommitted=isCommitted)
         txn_time = data.get(TXN_TIME)
@@ -260,8 +353,11 @@ class DomainReqHandler(PHandler):
 
     def handleGetNymReq(self, request: Request):
         nym = request.operation[TARGET_NYM]
-        nymData = self.idrCache.getNym(nym, isCommitted=True)
+        root = self._historicalRoot(request)
         path = domain.make_state_path_for_nym(nym)
+        if root is not None:
+            return self._handleHistoricalGetNymReq(request, path, root)
+        nymData = self.idrCache.getNym(nym, isCommitted=True)
         if nymData:
             nymData[TARGET_NYM] = nym
             data = self.stateSerializer.serialize(nymData)
@@ -284,10 +380,33 @@ class DomainReqHandler(PHandler):
         result.update(request.operation)
         return result
 
+    def _handleHistoricalGetNymReq(self, request: Request, path, root):
+        encoded = self.state.get_for_root_hash(root, path)
+        data = seq_no = update_time = None
+        if encoded is not None:
+            nymData = self.stateSerializer.deserialize(encoded)
+            nymData[TARGET_NYM] = request.operation[TARGET_NYM]
+            data = self.stateSerializer.serialize(nymData)
+            seq_no = nymData.get(f.SEQ_NO.nm)
+            update_time = nymData.get(TXN_TIME)
+        result = self.make_result(request=request,
+                                  data=data,
+                                  last_seq_no=seq_no,
+                                  update_time=update_time,
+                                  proof=self.make_proof(path, root))
+        result.update(request.operation)
+        return result
+
     def handleGetSchemaReq(self, request: Request):
         author_did = request.operation[TARGET_NYM]
         schema_name = request.operation[DATA][NAME]
         schema_version = request.operation[DATA][VERSION]
+        if request.operation.get(PASS_STATE_VALUE):
+            path = domain.make_state_path_for_schema(author_did, schema_name,
+                                                     schema_version)
+            return self.make_state_value_result(
+                request, path, data={NAME: schema_name,
+                                     VERSION: schema_version})
         schema, lastSeqNo, lastUpdateTime, proof = self.getSchema(
             author=author_did,
             schemaName=schema_name,
@@ -295,12 +414,8 @@ class DomainReqHandler(PHandler):
         )
         # TODO: we have to do this since SCHEMA has a bit different format than other txns
         # (it has NAME and VERSION inside DATA, and it's not part of the state value, but state key)
-        if schema is None:
-            schema = {}
-        schema.update({
-            NAME: schema_name,
-            VERSION: schema_version
-        })
+        # The value can be shared with other replies, so it is not updated
+        schema = {**(schema or {}), NAME: schema_name, VERSION: schema_version}
         return self.make_result(request=request,
                                 data=schema,
                                 last_seq_no=lastSeqNo,
@@ -309,6 +424,11 @@ class DomainReqHandler(PHandler):
 
     def handleGetClaimDefReq(self, request: Request):
         signatureType = request.operation[SIGNATURE_TYPE]
+        if request.operation.get(PASS_STATE_VALUE):
+            path = domain.make_state_path_for_claim_def(
+                request.operation[ORIGIN], request.operation[REF],
+                signatureType)
+            return self.make_state_value_result(request, path)
         keys, lastSeqNo, lastUpdateTime, proof = self.getClaimDef(
             author=request.operation[ORIGIN],
             schemaSeqNo=request.operation[REF],
@@ -322,6 +442,22 @@ class DomainReqHandler(PHandler):
         result[SIGNATURE_TYPE] = signatureType
         return result
 
+    def make_state_value_result(self, request: Request, path, data=None):
+        """
+        Result carrying the committed state value of the path as stored,
+        neither decoded nor encoded again. The data, seq no and update time
+        are all in the value, the client verifies the value against the
+        proof as is and decodes it with `domain.decode_state_value`
+        """
+        encoded = self.state.get(path, isCommitted=True)
+        result = self.make_result(request=request,
+                                  data=data,
+                                  last_seq_no=None,
+                                  update_time=None,
+                                  proof=self.make_proof(path))
+        result[STATE_VALUE] = domain.state_value_to_reply(encoded)
+        return result
+
     def handleGetAttrsReq(self, request: Request):
         if not self._validate_attrib_keys(request.operation):
             raise InvalidClientRequest(request.identifier, request.reqId,
@@ -337,7 +473,8 @@ class DomainReqHandler(PHandler):
         else:
             attr_key = request.operation[HASH]
         value, lastSeqNo, lastUpdateTime, proof = \
-            self.getAttr(did=nym, key=attr_key)
+            self.getAttr(did=nym, key=attr_key,
+                         root=self._historicalRoot(request))
         attr = None
         if value is not None:
             if HASH in request.operation:
@@ -350,21 +487,227 @@ class DomainReqHandler(PHandler):
                                 update_time=lastUpdateTime,
                                 proof=proof)
 
-    def lookup(self, path, isCommitted=True) -> (str, int):
+    def handleGetNymsReq(self, request: Request):
+        """
+        Answers a batch of GET_NYMs from the committed state with one
+        combined state proof for all the requested identifiers
+        """
+        nyms = []
+        paths = []
+        for nym in request.operation[DESTS]:
+            nymData = self.idrCache.getNym(nym, isCommitted=True)
+            data = None
+            seq_no = None
+            update_time = None
+            if nymData:
+                nymData[TARGET_NYM] = nym
+                data = self.stateSerializer.serialize(nymData)
+                seq_no = nymData[f.SEQ_NO.nm]
+                update_time = nymData[TXN_TIME]
+            nyms.append({
+                TARGET_NYM: nym,
+                DATA: data,
+                f.SEQ_NO.nm: seq_no,
+                TXN_TIME: update_time
+            })
+            paths.append(domain.make_state_path_for_nym(nym))
+        return self.make_result(request=request,
+                                data=nyms,
+                                last_seq_no=None,
+                                update_time=None,
+                                proof=self.make_multi_proof(paths))
+
+    def handleGetAttrsBatchReq(self, request: Request):
+        """
+        Answers a batch of GET_ATTRs from the committed state with one
+        combined state proof for all the requested attributes
+        """
+        attrs = []
+        paths = []
+        for item in request.operation[ATTRS]:
+            nym = item[TARGET_NYM]
+            attr_type = RAW if RAW in item else ENC if ENC in item else HASH
+            attr_key = item[attr_type]
+            value, lastSeqNo, lastUpdateTime, _ = \
+                self.getAttr(did=nym, key=attr_key, with_proof=False)
+            attr = None
+            if value is not None:
+                attr = attr_key if attr_type == HASH else value
+            attrs.append({
+                TARGET_NYM: nym,
+                attr_type: attr_key,
+                DATA: attr,
+                f.SEQ_NO.nm: lastSeqNo,
+                TXN_TIME: lastUpdateTime
+            })
+            paths.append(domain.make_state_path_for_attr(nym, attr_key))
+        return self.make_result(request=request,
+                                data=attrs,
+                                last_seq_no=None,
+                                update_time=None,
+                                proof=self.make_multi_proof(paths))
+
+    def handleGetSchemasReq(self, request: Request):
+        """
+        Answers one page of the committed SCHEMAs of an author, ordered by
+        name and version, with one state proof for all of them
+        """
+        author = request.operation[TARGET_NYM]
+        entries, nextStart = self._authorIndex(request).listSchemas(
+            author, request.operation.get(FROM),
+            request.operation.get(LIMIT, BATCHED_READ_MAX_KEYS))
+        schemas = []
+        for name, version, path in entries:
+            data, seq_no, update_time, _ = self.lookupWriteOnce(
+                path, with_proof=False)
+            data = {**(data or {}), NAME: name, VERSION: version}
+            schemas.append({
+                TARGET_NYM: author,
+                DATA: data,
+                f.SEQ_NO.nm: seq_no,
+                TXN_TIME: update_time
+            })
+        result = self.make_result(
+            request=request,
+            data=schemas,
+            last_seq_no=None,
+            update_time=None,
+            proof=self.make_multi_proof([path for *_, path in entries]))
+        result[NEXT] = nextStart
+        return result
+
+    def handleGetClaimDefsReq(self, request: Request):
+        """
+        Answers one page of the committed CLAIM_DEFs of a schema, ordered
+        by author and signature type, with one state proof for all of them
+        """
+        schemaSeqNo = request.operation[REF]
+        entries, nextStart = self._authorIndex(request).listClaimDefs(
+            schemaSeqNo, request.operation.get(FROM),
+            request.operation.get(LIMIT, BATCHED_READ_MAX_KEYS))
+        claimDefs = []
+        for author, signatureType, path in entries:
+            keys, seq_no, update_time, _ = self.lookupWriteOnce(
+                path, with_proof=False)
+            claimDefs.append({
+                ORIGIN: author,
+                REF: schemaSeqNo,
+                SIGNATURE_TYPE: signatureType,
+                DATA: keys,
+                f.SEQ_NO.nm: seq_no,
+                TXN_TIME: update_time
+            })
+        result = self.make_result(
+            request=request,
+            data=claimDefs,
+            last_seq_no=None,
+            update_time=None,
+            proof=self.make_multi_proof([path for *_, path in entries]))
+        result[NEXT] = nextStart
+        return result
+
+    def _authorIndex(self, request: Request):
+        if self.authorIndex is None:
+            raise InvalidClientRequest(request.identifier, request.reqId,
+                                       '{} is not supported by this node'
+                                       .format(request.operation[TXN_TYPE]))
+        return self.authorIndex
+
+    def make_proof(self, path, root=None):
+        """
+        Same as the parent's but serves proofs for already seen paths of
+        the current committed state from the proof cache. Proofs for a
+        past committed root are made for the root and not cached
+        """
+        if root is not None:
+            return self.make_multi_proof([path], root)
+        root = self.state.committedHeadHash
+        proof = self.proofCache.get(root, path)
+        if proof is None:
+            proof = super().make_proof(path)
+            # Proofs without multi-signature are not cached since the
+            # multi-signature for the root may arrive later
+            if proof is not None:
+                self.proofCache.put(root, path, proof)
+        return proof
+
+    def make_multi_proof(self, paths, root_hash=None):
+        """
+        Creates one state proof for several paths of the committed state.
+        Proof nodes shared by the paths are included only once.
+        Returns None if there is no BLS multi-signature for the state
+
+        :param paths: the paths to generate a state proof for
+        :param root_hash: a past committed root to make the proof for,
+            the current committed one by default
+        :return: a state proof or None
+        """
+        if root_hash is None:
+            root_hash = self.state.committedHeadHash
+        root = self.state._hash_to_node(bytes(root_hash))
+        proof_nodes = OrderedDict()
+        for path in paths:
+            for node in self.state.generate_state_proof(key=path,
+                                                        root=root,
+                                                        serialize=False):
+                proof_nodes.setdefault(rlp_encode(node), node)
+        proof = Trie.serialize_proof(list(proof_nodes.values()))
+        encoded_proof = proof_nodes_serializer.serialize(proof)
+        encoded_root_hash = state_roots_serializer.serialize(bytes(root_hash))
+
+        multi_sig = self.bls_store.get(encoded_root_hash)
+        if not multi_sig:
+            return None
+
+        return {
+            ROOT_HASH: encoded_root_hash,
+            MULTI_SIGNATURE: multi_sig.as_dict(),
+            PROOF_NODES: encoded_proof
+        }
+
+    def lookup(self, path, isCommitted=True, with_proof=True,
+               root=None) -> (str, int):
         """
         Queries state for data on specified path
 
         :param path: path to data
+        :param with_proof: whether to generate a state proof for the path
+        :param root: a past committed root to query the state as of
         :return: data
         """
         assert path is not None
-        encoded = self.state.get(path, isCommitted)
-        proof = self.make_proof(path)
+        if root is not None:
+            encoded = self.state.get_for_root_hash(root, path)
+        else:
+            encoded = self.state.get(path, isCommitted)
+        proof = self.make_proof(path, root) if with_proof else None
         if encoded is not None:
             value, last_seq_no, last_update_time = domain.decode_state_value(encoded)
             return value, last_seq_no, last_update_time, proof
         return None, None, None, proof
 
+    def lookupWriteOnce(self, path, isCommitted=True, with_proof=True):
+        """
+        Same as `lookup` but for paths whose values are never changed once
+        written, decoded committed values are served from the cache and
+        only the proof is made for the current committed root
+        """
+        if not isCommitted:
+            return self.lookup(path, isCommitted, with_proof=with_proof)
+        cached = self.writeOnceValueCache.get(path)
+        if cached is None:
+            encoded = self.state.get(path, isCommitted=True)
+            if encoded is None:
+                # Can be written later, so absence is not cached
+                proof = self.make_proof(path) if with_proof else None
+                return None, None, None, proof
+            cached = domain.decode_state_value(encoded)
+            self.writeOnceValueCache.put(path, *cached,
+                                         encodedSize=len(encoded))
+        value, last_seq_no, last_update_time = cached
+        proof = self.make_proof(path) if with_proof else None
+        return value, last_seq_no, last_update_time, proof
+
     def _addAttr(self, txn) -> None:
         """
         The state trie stores the hash of the whole attribute data at:
@@ -374,30 +717,59 @@ class DomainReqHandler(PHandler):
         the trie stores a blank value for the key did+hash
         """
         assert txn[TXN_TYPE] == ATTRIB
-        path, value, hashed_value, value_bytes = domain.prepare_attr_for_state(txn)
+        path, value, hashed_value, value_bytes = domain.prepare_attr_for_state(
+            txn, self.binaryStateValuesSinceSeqNo)
         self.state.set(path, value_bytes)
         self.attributeStore.set(hashed_value, value)
 
-    def _addSchema(self, txn) -> None:
+    def _writeOncePathSet(self, path, seqNo, isCommitted):
+        """
+        Duplicates are validated against the committed state only, so a
+        SCHEMA or CLAIM_DEF ordered before an identical one is committed
+        writes its path again. The cached value of the path is dropped when
+        the txn is committed
+        """
+        if isCommitted:
+            self.writeOnceValueCache.remove(path)
+        else:
+            self._uncommittedWriteOncePaths[seqNo] = path
+
+    def _addSchema(self, txn, isCommitted=False) -> None:
         assert txn[TXN_TYPE] == SCHEMA
-        path, value_bytes = domain.prepare_schema_for_state(txn)
+        # Preparing the state value takes the name and version out of data
+        name, version = txn[DATA][NAME], txn[DATA][VERSION]
+        path, value_bytes = domain.prepare_schema_for_state(
+            txn, self.binaryStateValuesSinceSeqNo)
         self.state.set(path, value_bytes)
+        self._writeOncePathSet(path, txn[f.SEQ_NO.nm], isCommitted)
+        if self.authorIndex:
+            self.authorIndex.addSchema(txn[f.IDENTIFIER.nm], name, version,
+                                       path, isCommitted=isCommitted)
 
-    def _addClaimDef(self, txn) -> None:
+    def _addClaimDef(self, txn, isCommitted=False) -> None:
         assert txn[TXN_TYPE] == CLAIM_DEF
-        path, value_bytes = domain.prepare_claim_def_for_state(txn)
+        path, value_bytes = domain.prepare_claim_def_for_state(
+            txn, self.binaryStateValuesSinceSeqNo)
         self.state.set(path, value_bytes)
+        self._writeOncePathSet(path, txn[f.SEQ_NO.nm], isCommitted)
+        if self.authorIndex:
+            self.authorIndex.addClaimDef(txn[f.IDENTIFIER.nm], txn[REF],
+                                         txn.get(SIGNATURE_TYPE, 'CL'), path,
+                                         isCommitted=isCommitted)
 
     def getAttr(self,
                 did: str,
                 key: str,
-                isCommitted=True) -> (str, int, int, list):
+                isCommitted=True,
+                with_proof=True,
+                root=None) -> (str, int, int, list):
         assert did is not None
         assert key is not None
         path = domain.make_state_path_for_attr(did, key)
         try:
             hashed_val, lastSeqNo, lastUpdateTime, proof = \
-                self.lookup(path, isCommitted)
+                self.lookup(path, isCommitted, with_proof=with_proof,
+                            root=root)
         except KeyError:
             return None, None, None, None
         if not hashed_val:
@@ -422,7 +794,8 @@ class DomainReqHandler(PHandler):
         assert schemaVersion is not None
         path = domain.make_state_path_for_schema(author, schemaName, schemaVersion)
         try:
-            keys, seqno, lastUpdateTime, proof = self.lookup(path, isCommitted)
+            keys, seqno, lastUpdateTime, proof = \
+                self.lookupWriteOnce(path, isCommitted)
             return keys, seqno, lastUpdateTime, proof
         except KeyError:
             return None, None, None, None
@@ -436,7 +809,8 @@ class DomainReqHandler(PHandler):
         assert schemaSeqNo is not None
         path = domain.make_state_path_for_claim_def(author, schemaSeqNo, signatureType)
         try:
-            keys, seqno, lastUpdateTime, proof = self.lookup(path, isCommitted)
+            keys, seqno, lastUpdateTime, proof = \
+                self.lookupWriteOnce(path, isCommitted)
             return keys, seqno, lastUpdateTime, proof
         except KeyError:
             return None, None, None, None
@@ -458,18 +832,13 @@ class DomainReqHandler(PHandler):
     @staticmethod
     def transform_attrib_for_ledger(txn):
         """
-        Creating copy of result so that `RAW`, `ENC` or `HASH` can be
-        replaced by their hashes. We do not insert actual attribute data
-        in the ledger but only the hash of it.
+        Creating copy of result so that `RAW` or `ENC` can be replaced by
+        their hashes. We do not insert actual attribute data in the ledger
+        but only the hash of it. Only the txn dict is copied, its values are
+        shared with the original one.
         """
-        txn = deepcopy(txn)
-        attr_key, value = domain.parse_attr_txn(txn)
-        hashed_val = domain.hash_of(value) if value else ''
-
-        if RAW in txn:
-            txn[RAW] = hashed_val
-        elif ENC in txn:
-            txn[ENC] = hashed_val
-        elif HASH in txn:
-            txn[HASH] = txn[HASH]
+        txn = dict(txn)
+        if HASH not in txn:
+            _, _, hashed_val = domain.parse_attr_txn_with_hash(txn)
+            txn[RAW if RAW in txn else ENC] = hashed_val
         return txn
@@ -0,0 +1,211 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from common.serializers.serialization import ledger_txn_serializer, \
+    ledger_hash_serializer, state_roots_serializer
+from ledger.tree_hasher import TreeHasher
+from plenum.common.constants import TXN_TYPE, RAW, ENC, DOMAIN_LEDGER_ID
+from plenum.common.types import f
+from stp_core.common.log import getlogger
+
+from indy_common.constants import ATTRIB
+from indy_node.server.catchup_state_applier import CatchupStateApplier
+
+logger = getlogger()
+
+
+def parseTxns(entries):
+    """
+    Deserializes txns as stored in the ledger and hashes them as leaves of
+    its merkle tree, runs in the worker processes
+
+    :param entries: list of (seq no, serialized txn)
+    :return: list of (seq no, txn, leaf hash)
+    """
+    hasher = TreeHasher()
+    parsed = []
+    for seqNo, entry in entries:
+        txn = ledger_txn_serializer.deserialize(entry)
+        leaf = ledger_hash_serializer.serialize(txn, toBytes=True)
+        parsed.append((int(seqNo), txn, hasher.hash_leaf(leaf)))
+    return parsed
+
+
+class DomainStateRegenerator:
+    """
+    Regenerates the domain state of a stopped node from its domain ledger,
+    together with the stores committed with the state: IdrCache,
+    AttributeStore, AuthorIndex and StateRootIndex.
+
+    Txns are deserialized and hashed in a pool of processes, `txnsPerTask`
+    at a time. The hashes are checked against the leaves of the ledger's
+    merkle tree and the txns are applied in order by the request handler
+    through a CatchupStateApplier, so the state and the stores get exactly
+    what the node gives them. Each chunk the applier flushes is a
+    checkpoint an interrupted regeneration resumes from.
+
+    The ledger has only hashes of RAW and ENC attributes, their values are
+    taken from `attrValues`.
+    """
+
+    def __init__(self, reqHandler, attrValues, chunkSize=10000, workers=None,
+                 txnsPerTask=1000):
+        """
+        :param reqHandler: DomainReqHandler with the state and the stores
+            to regenerate
+        :param attrValues: AttributeStore with the values of attributes
+        :param workers: number of processes, the number of CPUs by default
+        """
+        self._reqHandler = reqHandler
+        self._attrValues = attrValues
+        self._chunkSize = chunkSize
+        self._workers = workers or os.cpu_count() or 1
+        self._txnsPerTask = txnsPerTask
+        self.stats = {
+            'txns': 0,
+            'resumed_after': 0,
+            'seconds': 0.0,
+            'txns_per_second': None,
+            'state_root': None,
+        }
+
+    @property
+    def checkpoint(self):
+        """
+        Seq no of the last txn applied to the state and all the stores, 0 if
+        nothing was applied, None if the state was not regenerated by this,
+        then it is to be regenerated anew. The stores are written before the
+        state, the txns they may have after the checkpoint are applied again
+        """
+        state = self._reqHandler.state
+        if state.isEmpty:
+            return 0
+        return CatchupStateApplier.appliedSeqNo(state)
+
+    def regenerate(self, ledger, trustedRoot=None):
+        """
+        :param ledger: the domain ledger
+        :param trustedRoot: state root the ledger must give, the last chunk
+            is not written if it gives another one
+        :return: stats of the regeneration
+        """
+        start = time.perf_counter()
+        checkpoint = self.checkpoint
+        if checkpoint is None:
+            raise ValueError('{} can not resume, the state or the stores '
+                             'were not left by a regeneration'.format(self))
+        if checkpoint:
+            logger.info('{} resuming after seq no {}'
+                        .format(self, checkpoint))
+        self.stats['resumed_after'] = checkpoint
+        applier = CatchupStateApplier(self._reqHandler, self._chunkSize)
+        nextReport = self._chunkSize
+        with ProcessPoolExecutor(max_workers=self._workers) as executor:
+            for parsed in self._parsed(executor, ledger, checkpoint):
+                self._checkLeafHashes(ledger, parsed)
+                for txn in self._withAttrValues(parsed):
+                    applier.add(txn)
+                self.stats['txns'] += len(parsed)
+                if self.stats['txns'] >= nextReport:
+                    self._reportProgress(start, parsed[-1][0])
+                    nextReport += self._chunkSize
+        applier.flush(trustedRoot=trustedRoot)
+        self.stats['state_root'] = state_roots_serializer.serialize(
+            bytes(self._reqHandler.state.committedHeadHash))
+        self._updateThroughput(start)
+        logger.info('{} done: {}'.format(self, self.stats))
+        return self.stats
+
+    def _parsed(self, executor, ledger, checkpoint):
+        # Results are taken in order, only a few tasks are ahead of the
+        # writer so txns are not piling up in memory
+        pending = deque()
+        for entries in self._tasks(ledger, checkpoint):
+            pending.append(executor.submit(parseTxns, entries))
+            if len(pending) >= 2 * self._workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def _tasks(self, ledger, checkpoint):
+        # Txns are read as stored, deserializing them is the workers' job
+        entries = []
+        for seqNo, entry in ledger._transactionLog.iterator(
+                start=checkpoint + 1):
+            entries.append((seqNo, bytes(entry)))
+            if len(entries) >= self._txnsPerTask:
+                yield entries
+                entries = []
+        if entries:
+            yield entries
+
+    @staticmethod
+    def _checkLeafHashes(ledger, parsed):
+        hashStore = ledger.tree.hashStore
+        for seqNo, _, leafHash in parsed:
+            if hashStore.readLeaf(seqNo) != leafHash:
+                raise ValueError('txn {} of the domain ledger does not match '
+                                 'the merkle tree of the ledger'
+                                 .format(seqNo))
+
+    def _withAttrValues(self, parsed):
+        fields = {}
+        for seqNo, txn, _ in parsed:
+            if txn[TXN_TYPE] == ATTRIB:
+                field = RAW if txn.get(RAW) is not None else \
+                    ENC if txn.get(ENC) is not None else None
+                if field:
+                    fields[seqNo] = field
+        values = self._attrValues.getMany(
+            txn[fields[seqNo]] for seqNo, txn, _ in parsed
+            if seqNo in fields)
+        for seqNo, txn, _ in parsed:
+            txn[f.SEQ_NO.nm] = seqNo
+            if seqNo in fields:
+                field = fields[seqNo]
+                if txn[field] not in values:
+                    raise ValueError('value of attribute of txn {} with hash '
+                                     '{} is not known'
+                                     .format(seqNo, txn[field]))
+                txn[field] = values[txn[field]]
+            yield txn
+
+    @staticmethod
+    def verifiedBy(blsStore, stateRoot, ledger, multiSigVerifier):
+        """
+        Checks the state root with the BLS multi-signature of the pool for
+        it, it is signed with the root of the ledger the state was made of
+
+        :param stateRoot: state root as base58
+        :param multiSigVerifier: PoolMultiSigVerifier with the keys of the
+            pool
+        :return: True if the pool signed the state root with the current
+            root of the ledger, False if with another one or the signature
+            is not valid with the keys of the pool, None if the state root
+            has no multi-signature
+        """
+        multiSig = blsStore.get(stateRoot)
+        if multiSig is None:
+            return None
+        value = multiSig.value
+        return value.ledger_id == DOMAIN_LEDGER_ID and \
+            value.state_root_hash == stateRoot and \
+            value.txn_root_hash == ledger.root_hash and \
+            multiSigVerifier.verify(multiSig)
+
+    def _updateThroughput(self, start):
+        self.stats['seconds'] = time.perf_counter() - start
+        if self.stats['seconds'] > 0:
+            self.stats['txns_per_second'] = \
+                self.stats['txns'] / self.stats['seconds']
+
+    def _reportProgress(self, start, lastSeqNo):
+        self._updateThroughput(start)
+        logger.info('{} applied txns till seq no {}, {:.0f} txns/sec'
+                    .format(self, lastSeqNo,
+                            self.stats['txns_per_second'] or 0))
+
+    def __repr__(self):
+        return self.__class__.__name__
@@ -0,0 +1,60 @@
+from plenum.common.constants import DOMAIN_LEDGER_ID
+from plenum.common.ledger_manager import LedgerManager as PlenumLedgerManager
+from plenum.common.messages.node_messages import CatchupReq
+from plenum.common.types import f
+
+
+class LedgerManager(PlenumLedgerManager):
+    # Txns of the catchup request being served, already read from the ledger
+    _readTxns = None
+
+    def processCatchupReq(self, req: CatchupReq, frm: str):
+        """
+        The parent's implementation fills each txn with its attribute value
+        separately, which for a large range means as many random reads of
+        the attribute store. So the txns of the range are read once, the
+        values for all of them are read beforehand in one pass in sorted
+        order and the parent is given the txns already read.
+        """
+        if not self.ownedByNode or \
+                getattr(req, f.LEDGER_ID.nm) != DOMAIN_LEDGER_ID:
+            return super().processCatchupReq(req, frm)
+        ledger = self.getLedgerForMsg(req)
+        start = getattr(req, f.SEQ_NO_START.nm)
+        end = min(getattr(req, f.SEQ_NO_END.nm), ledger.size)
+        if start > end:
+            return super().processCatchupReq(req, frm)
+        txns = list(ledger.getAllTxn(start, end))
+        self._readTxns = _LedgerWithReadTxns(ledger, start, end, txns)
+        try:
+            with self.owner.attributeStore.prefetched(
+                    self.owner.attribute_hashes(txn for _, txn in txns)):
+                return super().processCatchupReq(req, frm)
+        finally:
+            self._readTxns = None
+
+    def getLedgerForMsg(self, msg):
+        ledger = super().getLedgerForMsg(msg)
+        if self._readTxns is not None and ledger is self._readTxns.ledger:
+            return self._readTxns
+        return ledger
+
+
+class _LedgerWithReadTxns:
+    """
+    The ledger as seen by the parent's `processCatchupReq`, the txns of the
+    requested range are the ones already read
+    """
+
+    def __init__(self, ledger, start, end, txns):
+        self.ledger = ledger
+        self._range = (start, end)
+        self._txns = txns
+
+    def getAllTxn(self, frm=None, to=None):
+        if (frm, to) == self._range:
+            return iter(self._txns)
+        return self.ledger.getAllTxn(frm, to)
+
+    def __getattr__(self, name):
+        return getattr(self.ledger, name)
@@ -1,37 +1,68 @@
+import os
+import time
 from typing import Iterable, Any, List
 
+from common.serializers.serialization import state_roots_serializer
 from ledger.compact_merkle_tree import CompactMerkleTree
 from ledger.genesis_txn.genesis_txn_initiator_from_file import GenesisTxnInitiatorFromFile
 from indy_node.server.validator_info_tool import ValidatorNodeInfoTool
 
 from plenum.common.constants import VERSION, NODE_PRIMARY_STORAGE_SUFFIX, \
-    ENC, RAW, DOMAIN_LEDGER_ID
-from plenum.common.exceptions import InvalidClientRequest
+    ENC, RAW, DOMAIN_LEDGER_ID, POOL_LEDGER_ID, NodeHooks
+from plenum.common.exceptions import InvalidClientRequest, \
+    InvalidClientMessageException
 from plenum.common.ledger import Ledger
+from plenum.common.messages.node_messages import Batch
 from plenum.common.types import f, \
     OPERATION
 from plenum.persistence.storage import initStorage, initKeyValueStorage
 from plenum.server.node import Node as PlenumNode
+from plenum.server.req_authenticator import ReqAuthenticator
 from indy_common.config_util import getConfig
 from indy_common.constants import TXN_TYPE, ATTRIB, DATA, ACTION, \
     NODE_UPGRADE, COMPLETE, FAIL, CONFIG_LEDGER_ID, POOL_UPGRADE, POOL_CONFIG,\
     IN_PROGRESS
 from indy_common.types import Request, SafeRequest
 from indy_common.config_helper import NodeConfigHelper
+from indy_common.latency_histogram import LatencyHistograms
+from indy_common.transactions import IndyTransactions
 from indy_node.persistence.attribute_store import AttributeStore
+from indy_node.persistence.author_index import AuthorIndex
 from indy_node.persistence.idr_cache import IdrCache
+from indy_node.persistence.state_root_index import StateRootIndex
+from indy_node.server.batched_sig_verifier import BatchedSigVerifier, \
+    SignatureChecks
+from indy_node.server.catchup_state_applier import CatchupStateApplier
 from indy_node.server.client_authn import LedgerBasedAuthNr
 from indy_node.server.config_req_handler import ConfigReqHandler
 from indy_node.server.domain_req_handler import DomainReqHandler
+from indy_node.server.ledger_manager import LedgerManager
 from indy_node.server.node_authn import NodeAuthNr
+from indy_node.server.node_startup import StartupProfile, StoreOpener
 from indy_node.server.pool_manager import HasPoolManager
 from indy_node.server.upgrader import Upgrader
 from indy_node.server.pool_config import PoolConfig
+from indy_node.server.read_admission import ReadAdmission, REJECTED, \
+    QUEUED
+from indy_node.server.read_replica import ReadReplicaFeed, readFeedOffset
 from stp_core.common.log import getlogger
 
 
 logger = getlogger()
 
+LEDGER_NAMES = {
+    POOL_LEDGER_ID: 'POOL',
+    DOMAIN_LEDGER_ID: 'DOMAIN',
+    CONFIG_LEDGER_ID: 'CONFIG',
+}
+
+
+def txnTypeName(txnType):
+    try:
+        return IndyTransactions(txnType).name
+    except ValueError:
+        return str(txnType)
+
 
 class Node(PlenumNode, HasPoolManager):
     keygenScript = "init_indy_keys"
@@ -65,34 +96,57 @@ class Node(PlenumNode, HasPoolManager):
         plugins_dir = plugins_dir or config_helper.plugins_dir
         node_info_dir = node_info_dir or config_helper.node_info_dir
 
+        self.startupProfile = StartupProfile()
+        # Durations of handling requests by the txn type, of committing
+        # batches by the ledger
+        self.latencies = LatencyHistograms(kindName=txnTypeName)
+        self._storeOpener = None
         # TODO: 4 ugly lines ahead, don't know how to avoid
         self.idrCache = None
         self.attributeStore = None
+        self.authorIndex = None
+        self.stateRootIndex = None
         self.upgrader = None
         self.poolCfg = None
-
-        super().__init__(name=name,
-                         nodeRegistry=nodeRegistry,
-                         clientAuthNr=clientAuthNr,
-                         ha=ha,
-                         cliname=cliname,
-                         cliha=cliha,
-                         config_helper=config_helper,
-                         ledger_dir=ledger_dir,
-                         keys_dir=keys_dir,
-                         genesis_dir=genesis_dir,
-                         plugins_dir=plugins_dir,
-                         node_info_dir=node_info_dir,
-                         primaryDecider=primaryDecider,
-                         pluginPaths=pluginPaths,
-                         storage=storage,
-                         config=config)
-
-        # TODO: ugly line ahead, don't know how to avoid
-        self.clientAuthNr = clientAuthNr or self.defaultAuthNr()
-
-        self.nodeMsgRouter.routes[Request] = self.processNodeRequest
-        self.nodeAuthNr = self.defaultNodeAuthNr()
+        self.clientSigVerifier = None
+
+        try:
+            super().__init__(name=name,
+                             nodeRegistry=nodeRegistry,
+                             clientAuthNr=clientAuthNr,
+                             ha=ha,
+                             cliname=cliname,
+                             cliha=cliha,
+                             config_helper=config_helper,
+                             ledger_dir=ledger_dir,
+                             keys_dir=keys_dir,
+                             genesis_dir=genesis_dir,
+                             plugins_dir=plugins_dir,
+                             node_info_dir=node_info_dir,
+                             primaryDecider=primaryDecider,
+                             pluginPaths=pluginPaths,
+                             storage=storage,
+                             config=config)
+
+            # TODO: ugly line ahead, don't know how to avoid
+            self.clientAuthNr = clientAuthNr or self.defaultAuthNr()
+            self.clientSigVerifier = self.initClientSigVerifier()
+            self.readAdmission = self.initReadAdmission()
+            self.catchupStateApplier = self.initCatchupStateApplier()
+
+            self.nodeMsgRouter.routes[Request] = self.processNodeRequest
+            self.nodeAuthNr = self.defaultNodeAuthNr()
+
+            self.readReplicaFeed = self.initReadReplicaFeed()
+            self.checkIdrCacheMatchesState()
+            self.checkAuthorIndexMatchesState()
+        finally:
+            # Stores opened in the background and not taken are closed also
+            # when the node fails to start, releasing the threads and dbs
+            if self._storeOpener:
+                self._storeOpener.close()
+                self._storeOpener = None
+        self.startupProfile.initDone()
 
     def getPoolConfig(self):
         return PoolConfig(self.configLedger)
@@ -100,10 +154,37 @@ class Node(PlenumNode, HasPoolManager):
     def initPoolManager(self, nodeRegistry, ha, cliname, cliha):
         HasPoolManager.__init__(self, nodeRegistry, ha, cliname, cliha)
 
+    def initStoreOpener(self):
+        workers = self.config.storeOpeningWorkers
+        if not workers:
+            return None
+        return StoreOpener(workers, {
+            'loadDomainState': super().loadDomainState,
+            'loadConfigState': super().loadConfigState,
+            'getIdrCache': self._openIdrCache,
+            'loadAttributeStore': self._openAttributeStore,
+            'loadAuthorIndex': self._openAuthorIndex,
+            'loadStateRootIndex': self._openStateRootIndex,
+        })
+
+    def _takeStore(self, name, load):
+        # A store opened in the background is timed for the wait for it
+        with self.startupProfile.phase(name):
+            if self._storeOpener:
+                return self._storeOpener.take(name, load)
+            return load()
+
     def getPrimaryStorage(self):
         """
         This is usually an implementation of Ledger
         """
+        # The first store opened on start, the stores independent of the
+        # ledger are opened in the background meanwhile
+        self._storeOpener = self.initStoreOpener()
+        with self.startupProfile.phase('getPrimaryStorage'):
+            return self._getPrimaryStorage()
+
+    def _getPrimaryStorage(self):
         if self.config.primaryStorage is None:
             genesis_txn_initiator = GenesisTxnInitiatorFromFile(
                 self.genesis_dir, self.config.domainTransactionsFile)
@@ -132,35 +213,105 @@ class Node(PlenumNode, HasPoolManager):
     def getDomainReqHandler(self):
         if self.attributeStore is None:
             self.attributeStore = self.loadAttributeStore()
+        if self.authorIndex is None:
+            self.authorIndex = self.loadAuthorIndex()
+        if self.stateRootIndex is None:
+            self.stateRootIndex = self.loadStateRootIndex()
         return DomainReqHandler(self.domainLedger,
                                 self.states[DOMAIN_LEDGER_ID],
                                 self.config,
                                 self.reqProcessors,
                                 self.getIdrCache(),
                                 self.attributeStore,
-                                self.bls_bft.bls_store)
+                                self.bls_bft.bls_store,
+                                authorIndex=self.authorIndex,
+                                stateRootIndex=self.stateRootIndex)
+
+    def loadDomainState(self):
+        return self._takeStore('loadDomainState', super().loadDomainState)
+
+    def loadConfigState(self):
+        return self._takeStore('loadConfigState', super().loadConfigState)
 
     def getIdrCache(self):
         if self.idrCache is None:
-            self.idrCache = IdrCache(self.name,
-                                     initKeyValueStorage(self.config.idrCacheStorage,
-                                                         self.dataLocation,
-                                                         self.config.idrCacheDbName)
-                                     )
+            self.idrCache = self._takeStore('getIdrCache', self._openIdrCache)
         return self.idrCache
 
+    def _openIdrCache(self):
+        return IdrCache(self.name,
+                        initKeyValueStorage(self.config.idrCacheStorage,
+                                            self.dataLocation,
+                                            self.config.idrCacheDbName),
+                        cacheSize=self.config.idrCacheLruSize
+                        )
+
     def loadAttributeStore(self):
+        return self._takeStore('loadAttributeStore',
+                               self._openAttributeStore)
+
+    def _openAttributeStore(self):
         return AttributeStore(
             initKeyValueStorage(
                 self.config.attrStorage,
                 self.dataLocation,
-                self.config.attrDbName)
+                self.config.attrDbName),
+            compressionThreshold=self.config.attrCompressionThreshold,
+            cacheSize=self.config.attrCacheSize
         )
 
+    def loadAuthorIndex(self):
+        return self._takeStore('loadAuthorIndex', self._openAuthorIndex)
+
+    def _openAuthorIndex(self):
+        return AuthorIndex(self.name,
+                           initKeyValueStorage(self.config.authorIndexStorage,
+                                               self.dataLocation,
+                                               self.config.authorIndexDbName))
+
+    def loadStateRootIndex(self):
+        return self._takeStore('loadStateRootIndex',
+                               self._openStateRootIndex)
+
+    def _openStateRootIndex(self):
+        return StateRootIndex(
+            initKeyValueStorage(self.config.stateRootIndexStorage,
+                                self.dataLocation,
+                                self.config.stateRootIndexDbName))
+
+    def initDomainState(self):
+        with self.startupProfile.phase('initDomainState'):
+            super().initDomainState()
+            self.applyTxnsMissingFromDomainState()
+
+    def applyTxnsMissingFromDomainState(self):
+        """
+        Applies the txns caught up after the last chunk applied to the
+        state, if the node stopped before the chunk they are in was flushed
+        """
+        state = self.states[DOMAIN_LEDGER_ID]
+        seqNo = CatchupStateApplier.appliedSeqNo(state)
+        if seqNo is None or seqNo >= self.domainLedger.size:
+            return
+        logger.info('{} found domain state applied up to txn {} of {} in '
+                    'catchup, applying the rest'
+                    .format(self, seqNo, self.domainLedger.size))
+        reqHandler = self.get_req_handler(DOMAIN_LEDGER_ID)
+        for seq_no, txn in self.domainLedger.getAllTxn(frm=seqNo + 1):
+            txn[f.SEQ_NO.nm] = seq_no
+            txn = self.update_txn_with_extra_data(txn)
+            reqHandler.updateState([txn], isCommitted=True)
+            state.commit(rootHash=state.headHash)
+
     def setup_config_req_handler(self):
-        self.upgrader = self.getUpgrader()
-        self.poolCfg = self.getPoolConfig()
-        super().setup_config_req_handler()
+        with self.startupProfile.phase('setup_config_req_handler'):
+            self.upgrader = self.getUpgrader()
+            self.poolCfg = self.getPoolConfig()
+            super().setup_config_req_handler()
+
+    def initConfigState(self):
+        with self.startupProfile.phase('initConfigState'):
+            super().initConfigState()
 
     def getConfigReqHandler(self):
         return ConfigReqHandler(self.configLedger,
@@ -170,8 +321,121 @@ class Node(PlenumNode, HasPoolManager):
                                 self.poolManager,
                                 self.poolCfg)
 
+    def checkIdrCacheMatchesState(self):
+        """
+        Checks that IdrCache has been committed till the same state root
+        as the domain state, they can differ after a crash or if the db
+        was restored separately
+        """
+        cacheRoot = self.idrCache.committedStateRoot
+        if cacheRoot is None:
+            logger.info('{} can not check IdrCache, it has no state root'
+                        .format(self))
+            return True
+        stateRoot = bytes(self.getState(DOMAIN_LEDGER_ID).committedHeadHash)
+        if cacheRoot != stateRoot:
+            logger.warning('{} IdrCache is committed till state root {} but '
+                           'domain state till {}, IdrCache can be rebuilt '
+                           'with `rebuild_domain_stores --idr_cache`'
+                           .format(self,
+                                   state_roots_serializer.serialize(cacheRoot),
+                                   state_roots_serializer.serialize(stateRoot)))
+            return False
+        return True
+
+    def checkAuthorIndexMatchesState(self):
+        """
+        Checks that the index of SCHEMAs and CLAIM_DEFs has been committed
+        till the same state root as the domain state, the index is empty
+        for a node upgraded from a version without it
+        """
+        indexRoot = self.authorIndex.committedStateRoot
+        stateRoot = bytes(self.getState(DOMAIN_LEDGER_ID).committedHeadHash)
+        if indexRoot != stateRoot and self.domainLedger.size > 0:
+            logger.warning('{} index of SCHEMAs and CLAIM_DEFs does not match '
+                           'the domain state, GET_SCHEMAS and GET_CLAIM_DEFS '
+                           'can miss entries until it is rebuilt with '
+                           '`rebuild_domain_stores --author_index`'
+                           .format(self))
+            return False
+        return True
+
+    def initReadReplicaFeed(self):
+        if not self.config.readReplicaFeedEnabled:
+            return None
+        feed = ReadReplicaFeed(self.dataLocation,
+                               self.config.readReplicaFeedFile,
+                               self.config.readReplicaFeedSegmentSize)
+        # Records buffered when the node stopped are not in the feed, the
+        # committed txns after the last one in it are appended
+        lastSeqNo = feed.lastSeqNo() if feed.exists else 0
+        if not feed.exists or lastSeqNo < self.domainLedger.size:
+            stateRoot = self.getState(DOMAIN_LEDGER_ID).committedHeadHash
+            stateRoot = state_roots_serializer.serialize(bytes(stateRoot))
+            feed.bootstrap(self._hydratedDomainTxns(lastSeqNo + 1),
+                           self.config.readReplicaBootstrapChunkSize,
+                           stateRoot, self._multiSigDict(stateRoot))
+        return feed
+
+    def serviceReadReplicaFeed(self) -> int:
+        if not self.readReplicaFeed:
+            return 0
+        count = self.readReplicaFeed.flush()
+        if count:
+            self.readReplicaFeed.removeRead(readFeedOffset(
+                os.path.join(self.dataLocation,
+                             self.config.readReplicaDirName)))
+        return count
+
+    def _hydratedDomainTxns(self, frm=None):
+        chunk = []
+        for seq_no, txn in self.domainLedger.getAllTxn(frm=frm):
+            txn[f.SEQ_NO.nm] = seq_no
+            chunk.append(txn)
+            if len(chunk) == self.config.readReplicaBootstrapChunkSize:
+                yield from self.update_txns_with_extra_data(chunk)
+                chunk = []
+        yield from self.update_txns_with_extra_data(chunk)
+
+    def _multiSigDict(self, stateRoot):
+        if not self.bls_bft.bls_store:
+            return None
+        multiSig = self.bls_bft.bls_store.get(stateRoot)
+        return multiSig.as_dict() if multiSig else None
+
+    def get_new_ledger_manager(self) -> LedgerManager:
+        ledger_sync_order = self.ledger_ids
+        return LedgerManager(self, ownedByNode=True,
+                             postAllLedgersCaughtUp=self.allLedgersCaughtUp,
+                             preCatchupClbk=self.preLedgerCatchUp,
+                             ledger_sync_order=ledger_sync_order)
+
+    def initCatchupStateApplier(self):
+        if not self.config.catchupStateApplyChunkSize:
+            return None
+        return CatchupStateApplier(self.get_req_handler(DOMAIN_LEDGER_ID),
+                                   self.config.catchupStateApplyChunkSize)
+
+    def postTxnFromCatchupAddedToLedger(self, ledger_id: int, txn: Any):
+        if ledger_id != DOMAIN_LEDGER_ID or not self.catchupStateApplier:
+            return super().postTxnFromCatchupAddedToLedger(ledger_id, txn)
+        # Same as the parent's except that the txn is applied to the state
+        # with the rest of its chunk
+        self.postRecvTxnFromCatchup(ledger_id, txn)
+        self.catchupStateApplier.add(txn)
+        self.updateSeqNoMap([txn])
+        self._clear_req_key_for_txn(ledger_id, txn)
+
+    def postDomainLedgerCaughtUp(self, **kwargs):
+        if self.catchupStateApplier:
+            self.catchupStateApplier.flush()
+        super().postDomainLedgerCaughtUp(**kwargs)
+
     def post_txn_from_catchup_added_to_domain_ledger(self, txn):
-        pass
+        if self.readReplicaFeed:
+            # The state root is not known yet, it is checked with the next
+            # ordered batch
+            self.readReplicaFeed.append([txn])
 
     def postPoolLedgerCaughtUp(self, **kwargs):
         # The only reason to override this is to set the correct node id in
@@ -181,9 +445,11 @@ class Node(PlenumNode, HasPoolManager):
         super().postPoolLedgerCaughtUp(**kwargs)
 
     def postConfigLedgerCaughtUp(self, **kwargs):
-        self.poolCfg.processLedger()
-        self.upgrader.processLedger()
-        super().postConfigLedgerCaughtUp(**kwargs)
+        # Timed when the config ledger is processed on start
+        with self.startupProfile.phase('postConfigLedgerCaughtUp'):
+            self.poolCfg.processLedger()
+            self.upgrader.processLedger()
+            super().postConfigLedgerCaughtUp(**kwargs)
         self.acknowledge_upgrade()
 
     def acknowledge_upgrade(self):
@@ -265,21 +531,107 @@ class Node(PlenumNode, HasPoolManager):
         else:
             return super().authNr(req)
 
+    def initClientSigVerifier(self):
+        workers = self.config.clientSigVerificationWorkers
+        if not workers or \
+                not isinstance(self.clientAuthNr, ReqAuthenticator) or \
+                not isinstance(self.clientAuthNr.core_authenticator,
+                               LedgerBasedAuthNr):
+            return None
+        return BatchedSigVerifier(workers)
+
+    def _sigDeferringAuthNr(self):
+        # Signatures are verified as requests are received if a plugin
+        # expects them verified when its hook is called
+        if self.clientSigVerifier is None or \
+                self.hooks[NodeHooks.POST_SIG_VERIFICATION]:
+            return None
+        return self.clientAuthNr.core_authenticator
+
+    async def serviceClientMsgs(self, limit: int) -> int:
+        c = await self.clientstack.service(limit)
+        self.verifyClientSignatures()
+        await self.processClientInBox()
+        return c
+
+    def handleOneClientMsg(self, wrappedMsg):
+        authNr = self._sigDeferringAuthNr()
+        if authNr is None:
+            return super().handleOneClientMsg(wrappedMsg)
+        # Messages of a client batch are handled within the handling of the
+        # batch, each collects its own signatures
+        outerChecks = authNr.deferredChecks
+        authNr.deferredChecks = SignatureChecks()
+        try:
+            super().handleOneClientMsg(wrappedMsg)
+        finally:
+            authNr.deferredChecks = outerChecks
+
+    def unpackClientMsg(self, msg, frm):
+        authNr = self._sigDeferringAuthNr()
+        if authNr is None or authNr.deferredChecks is None or \
+                isinstance(msg, Batch):
+            return super().unpackClientMsg(msg, frm)
+        # Authenticated except the signature check itself
+        self.clientSigVerifier.add(msg, frm, authNr.deferredChecks)
+
+    def verifyClientSignatures(self):
+        """
+        Verifies signatures of the client requests received in the last
+        pass over the client stack and passes on the authentic ones in the
+        order they were received
+        """
+        if not self.clientSigVerifier:
+            return
+        for msg, frm, ex in self.clientSigVerifier.verify():
+            if ex is None:
+                self.unpackClientMsg(msg, frm)
+            else:
+                self.handleInvalidClientMsg(ex, (msg, frm))
+
+    def onStopping(self):
+        if self.clientSigVerifier:
+            self.clientSigVerifier.stop()
+        if self.catchupStateApplier:
+            self.catchupStateApplier.flush()
+        if self.readReplicaFeed:
+            self.readReplicaFeed.flush()
+        super().onStopping()
+
     def init_core_authenticator(self):
         return LedgerBasedAuthNr(self.idrCache)
 
     def defaultNodeAuthNr(self):
         return NodeAuthNr(self.poolLedger)
 
+    def initReadAdmission(self):
+        if not self.config.readAdmissionEnabled:
+            return None
+        return ReadAdmission(self.config.clientReadRate,
+                             self.config.clientReadBurst,
+                             self.config.connectionReadRate,
+                             self.config.connectionReadBurst,
+                             self.config.maxQueuedReadsPerConnection)
+
     async def prod(self, limit: int = None) -> int:
         c = await super().prod(limit)
+        c += self.serviceQueuedReads()
+        c += self.serviceReadReplicaFeed()
         c += self.upgrader.service()
         return c
 
     def processRequest(self, request: Request, frm: str):
         if self.is_query(request.operation[TXN_TYPE]):
-            self.process_query(request, frm)
-            self.total_read_request_number += 1
+            admission = self.readAdmission.admit(request, frm) \
+                if self.readAdmission else None
+            if admission == REJECTED:
+                logger.debug('{} rejected read request {} from {}, too many '
+                             'reads are queued'.format(self, request, frm))
+                self.send_nack_to_client(request.key,
+                                         'Too many read requests, try again '
+                                         'later', frm)
+            elif admission != QUEUED:
+                self.serveRead(request, frm)
         else:
             # forced request should be processed before consensus
             if (request.operation[TXN_TYPE] in [
@@ -297,6 +649,67 @@ class Node(PlenumNode, HasPoolManager):
                     request.reqId,
                     'Pool is in readonly mode, try again in 60 seconds')
 
+    def doStaticValidation(self, request: Request):
+        start = time.perf_counter()
+        try:
+            super().doStaticValidation(request)
+        finally:
+            self.latencies.add('static-validation',
+                               request.operation.get(TXN_TYPE),
+                               time.perf_counter() - start)
+
+    def doDynamicValidation(self, request: Request):
+        start = time.perf_counter()
+        try:
+            super().doDynamicValidation(request)
+        finally:
+            self.latencies.add('dynamic-validation',
+                               request.operation[TXN_TYPE],
+                               time.perf_counter() - start)
+
+    def applyReq(self, request: Request, cons_time: int):
+        start = time.perf_counter()
+        super().applyReq(request, cons_time)
+        self.latencies.add('apply', request.operation[TXN_TYPE],
+                           time.perf_counter() - start)
+
+    def commitAndSendReplies(self, reqHandler, ppTime, reqs: List[Request],
+                             stateRoot, txnRoot) -> List:
+        start = time.perf_counter()
+        committedTxns = super().commitAndSendReplies(reqHandler, ppTime, reqs,
+                                                     stateRoot, txnRoot)
+        if reqs:
+            self.latencies.add('commit',
+                               LEDGER_NAMES.get(
+                                   self.ledger_id_for_request(reqs[0])),
+                               time.perf_counter() - start)
+        return committedTxns
+
+    def process_query(self, request: Request, frm: str):
+        start = time.perf_counter()
+        super().process_query(request, frm)
+        self.latencies.add('query', request.operation[TXN_TYPE],
+                           time.perf_counter() - start)
+
+    def serveRead(self, request: Request, frm: str):
+        self.process_query(request, frm)
+        self.total_read_request_number += 1
+
+    def serviceQueuedReads(self) -> int:
+        """
+        Serves the queued read requests for which the clients have got
+        tokens since
+        """
+        if not self.readAdmission:
+            return 0
+        reads = self.readAdmission.nextReads()
+        for request, frm in reads:
+            try:
+                self.serveRead(request, frm)
+            except InvalidClientMessageException as ex:
+                self.handleInvalidClientMsg(ex, (request, frm))
+        return len(reads)
+
     def executeDomainTxns(self, ppTime, reqs: List[Request], stateRoot,
                           txnRoot) -> List:
         """
@@ -305,8 +718,14 @@ class Node(PlenumNode, HasPoolManager):
         :param ppTime: the time at which PRE-PREPARE was sent
         :param req: the client REQUEST
         """
-        return self.default_executer(DOMAIN_LEDGER_ID, ppTime, reqs,
-                                     stateRoot, txnRoot)
+        committed_txns = self.default_executer(DOMAIN_LEDGER_ID, ppTime, reqs,
+                                               stateRoot, txnRoot)
+        if self.readReplicaFeed:
+            # Committed txns are already updated with extra data when
+            # replies were sent
+            self.readReplicaFeed.append(committed_txns, stateRoot,
+                                        self._multiSigDict(stateRoot))
+        return committed_txns
 
     def update_txn_with_extra_data(self, txn):
         """
@@ -317,18 +736,45 @@ class Node(PlenumNode, HasPoolManager):
         :return:
         """
         # For RAW and ENC attributes, only hash is stored in the ledger.
-        if txn[TXN_TYPE] == ATTRIB:
-            # The key needs to be present and not None
-            key = RAW if (RAW in txn and txn[RAW] is not None) else \
-                ENC if (ENC in txn and txn[ENC] is not None) else \
-                None
-            if key:
-                txn[key] = self.attributeStore.get(txn[key])
+        key = self._attribute_value_field(txn)
+        if key:
+            txn[key] = self.attributeStore.get(txn[key])
         return txn
 
+    def update_txns_with_extra_data(self, txns) -> List:
+        """
+        Same as `update_txn_with_extra_data` for several txns, values of all
+        the attributes are read from the attribute store in one pass
+        """
+        txns = list(txns)
+        with self.attributeStore.prefetched(self.attribute_hashes(txns)):
+            return [self.update_txn_with_extra_data(txn) for txn in txns]
+
+    def attribute_hashes(self, txns):
+        """
+        Hashes of attribute values referenced by ledger txns
+        """
+        for txn in txns:
+            key = self._attribute_value_field(txn)
+            if key:
+                yield txn[key]
+
+    @staticmethod
+    def _attribute_value_field(txn):
+        if txn[TXN_TYPE] != ATTRIB:
+            return None
+        # The key needs to be present and not None
+        return RAW if (RAW in txn and txn[RAW] is not None) else \
+            ENC if (ENC in txn and txn[ENC] is not None) else \
+            None
+
     def closeAllKVStores(self):
         super().closeAllKVStores()
         if self.idrCache:
             self.idrCache.close()
         if self.attributeStore:
             self.attributeStore.close()
+        if self.authorIndex:
+            self.authorIndex.close()
+        if self.stateRootIndex:
+            self.stateRootIndex.close()
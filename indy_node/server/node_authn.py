@@ -1,4 +1,3 @@
-
 from plenum.common.ledger import Ledger
 from plenum.common.exceptions import UnknownIdentifier
 from plenum.common.constants import TARGET_NYM, VERKEY
@@ -6,20 +5,33 @@ from plenum.server.client_authn import NaclAuthNr
 
 
 class NodeAuthNr(NaclAuthNr):
+    """
+    Authenticates messages signed by nodes with the verkeys of their DIDs
+    from the pool ledger. The current verkey of every DID is kept in memory,
+    the index is built when created and txns added to the ledger since the
+    last lookup (ordered or caught up) are indexed before the next one
+    """
+
     def __init__(self, ledger: Ledger):
         self.ledger = ledger
+        # DID -> the last verkey set for it or None if it was never set
+        self._verkeys = {}
+        self._indexedSeqNo = 0
+        self._indexNewTxns()
 
-    def getVerkey(self, identifier):
-        # TODO: This is very inefficient
-        verkey = None
-        found = False
-        for _, txn in self.ledger.getAllTxn():
-            if txn[TARGET_NYM] == identifier:
-                found = True
-                if txn.get(VERKEY):
-                    verkey = txn[VERKEY]
+    def _indexNewTxns(self):
+        if self.ledger.size <= self._indexedSeqNo:
+            return
+        for seqNo, txn in self.ledger.getAllTxn(frm=self._indexedSeqNo + 1):
+            nym = txn[TARGET_NYM]
+            if txn.get(VERKEY):
+                self._verkeys[nym] = txn[VERKEY]
+            else:
+                self._verkeys.setdefault(nym, None)
+            self._indexedSeqNo = seqNo
 
-        if not found:
+    def getVerkey(self, identifier):
+        self._indexNewTxns()
+        if identifier not in self._verkeys:
             raise UnknownIdentifier(identifier)
-        verkey = verkey or identifier
-        return verkey
+        return self._verkeys[identifier] or identifier
@@ -0,0 +1,81 @@
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from stp_core.common.log import getlogger
+
+logger = getlogger()
+
+
+class StartupProfile:
+    """
+    Durations of the phases of node startup in seconds, a phase is timed
+    the first time it runs
+    """
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self.phases = OrderedDict()
+        self.initSeconds = None
+
+    @contextmanager
+    def phase(self, name):
+        if name in self.phases:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.setdefault(name, time.perf_counter() - start)
+
+    def initDone(self):
+        self.initSeconds = time.perf_counter() - self._started
+
+    @property
+    def stats(self):
+        return {
+            'init_seconds': self.initSeconds,
+            'phases': dict(self.phases),
+        }
+
+
+class StoreOpener:
+    """
+    Opens stores which do not depend on each other in a pool of threads
+    while the node opens its ledgers, opening a key-value db does not hold
+    the GIL. A store is taken when the node needs it, an error of opening
+    it is raised then.
+    """
+
+    def __init__(self, workers: int, loaders):
+        """
+        :param loaders: dict of store name -> function opening the store
+        """
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._opening = {name: self._executor.submit(load)
+                         for name, load in loaders.items()}
+
+    def take(self, name, load):
+        """
+        :return: the store opened in the background, the one returned by
+            `load` if it was not opened in the background
+        """
+        future = self._opening.pop(name, None)
+        if future is None:
+            return load()
+        return future.result()
+
+    def close(self):
+        """
+        Closes the stores which were opened but not taken
+        """
+        for name, future in self._opening.items():
+            try:
+                future.result().close()
+            except Exception as ex:
+                logger.warning('Store {} opened on start was not used and '
+                               'failed to close: {}'.format(name, ex))
+        self._opening.clear()
+        self._executor.shutdown(wait=True)
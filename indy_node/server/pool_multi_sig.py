@@ -0,0 +1,74 @@
+from plenum.bls.bls_crypto_factory import create_default_bls_crypto_factory
+from plenum.common.constants import TXN_TYPE, NODE, DATA, ALIAS, BLS_KEY, \
+    SERVICES, VALIDATOR
+from plenum.server.quorums import Quorums
+from stp_core.common.log import getlogger
+
+logger = getlogger()
+
+
+class PoolMultiSigVerifier:
+    """
+    Verifies BLS multi-signatures of the pool on a stopped node, with the BLS
+    keys of the validator nodes in the pool ledger, as a client verifies the
+    multi-signature of a state proof. The current keys are used, a multi-
+    signature made before a participant changed its key does not verify.
+    """
+
+    def __init__(self, poolLedger, blsVerifier=None):
+        """
+        :param poolLedger: the pool ledger
+        :param blsVerifier: BlsCryptoVerifier, the default one if None
+        """
+        self._keys = self.validatorKeys(poolLedger)
+        self._quorums = Quorums(len(self._keys))
+        self._verifier = blsVerifier or \
+            create_default_bls_crypto_factory().create_bls_crypto_verifier()
+
+    @staticmethod
+    def validatorKeys(poolLedger):
+        """
+        :return: dict of validator node name -> its BLS key, None for the
+            validators without a key
+        """
+        keys = {}
+        services = {}
+        for _, txn in poolLedger.getAllTxn():
+            if txn[TXN_TYPE] != NODE:
+                continue
+            data = txn[DATA]
+            alias = data[ALIAS]
+            # A NODE txn has only the fields it changes
+            if data.get(BLS_KEY):
+                keys[alias] = data[BLS_KEY]
+            if data.get(SERVICES) is not None:
+                services[alias] = data[SERVICES]
+        return {alias: keys.get(alias)
+                for alias, nodeServices in services.items()
+                if VALIDATOR in nodeServices}
+
+    def verify(self, multiSig) -> bool:
+        """
+        :param multiSig: MultiSignature
+        :return: True if enough validators took part in the multi-signature
+            and it is valid with their keys
+        """
+        participants = multiSig.participants
+        if not self._quorums.bls_signatures.is_reached(
+                len(set(participants))):
+            logger.warning('{} multi-signature has {} participants, {} are '
+                           'needed'.format(self, len(set(participants)),
+                                           self._quorums.bls_signatures.value))
+            return False
+        publicKeys = []
+        for name in participants:
+            if self._keys.get(name) is None:
+                logger.warning('{} participant {} of multi-signature is not a '
+                               'validator with a BLS key'.format(self, name))
+                return False
+            publicKeys.append(self._keys[name])
+        return self._verifier.verify_multi_sig(
+            multiSig.signature, multiSig.value.as_single_value(), publicKeys)
+
+    def __repr__(self):
+        return self.__class__.__name__
@@ -0,0 +1,158 @@
+import time
+from collections import OrderedDict, deque
+
+ADMITTED = 'admitted'
+QUEUED = 'queued'
+REJECTED = 'rejected'
+
+
+class TokenBucket:
+    """
+    Allows `rate` actions per second on average and up to `burst` of them
+    at once
+    """
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = now
+
+    def tokens(self, now):
+        return min(self.burst,
+                   self._tokens + (now - self._updated) * self.rate)
+
+    def hasToken(self, now) -> bool:
+        self._tokens = self.tokens(now)
+        self._updated = now
+        return self._tokens >= 1
+
+    def take(self):
+        self._tokens -= 1
+
+
+class ReadAdmission:
+    """
+    Admission of read requests, so that a client flooding the node with
+    reads gets its reads served later rather than slowing down the node.
+    Each client DID and each client connection has a token bucket, a read
+    takes a token from both. Reads which find no tokens are queued per
+    connection and DID, so a throttled DID does not hold up the other DIDs
+    of its connection. The queues take turns in serving their reads as
+    tokens are refilled. Reads beyond `maxQueued` reads of a connection are
+    rejected. Buckets which are full are dropped, as they are the same as
+    new ones.
+    """
+
+    def __init__(self, clientRate, clientBurst, connectionRate,
+                 connectionBurst, maxQueued, getTime=time.perf_counter):
+        self._clientRate = clientRate
+        self._clientBurst = clientBurst
+        self._connectionRate = connectionRate
+        self._connectionBurst = connectionBurst
+        self._maxQueued = maxQueued
+        self._getTime = getTime
+        self._clientBuckets = {}
+        self._connectionBuckets = {}
+        # (connection, DID) -> reads waiting for tokens, in turn order
+        self._queues = OrderedDict()
+        # Connection -> number of its reads waiting
+        self._queuedPerConnection = {}
+        self._droppedIdleAt = getTime()
+        self.admittedCount = 0
+        self.queuedCount = 0
+        self.rejectedCount = 0
+
+    @staticmethod
+    def _bucket(buckets, key, rate, burst, now):
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = TokenBucket(rate, burst, now)
+        return bucket
+
+    def _takeToken(self, identifier, frm, now) -> bool:
+        clientBucket = self._bucket(self._clientBuckets, identifier,
+                                    self._clientRate, self._clientBurst, now)
+        connectionBucket = self._bucket(self._connectionBuckets, frm,
+                                        self._connectionRate,
+                                        self._connectionBurst, now)
+        if not clientBucket.hasToken(now) or \
+                not connectionBucket.hasToken(now):
+            return False
+        clientBucket.take()
+        connectionBucket.take()
+        return True
+
+    def admit(self, request, frm) -> str:
+        """
+        :return: ADMITTED if the read can be served now, QUEUED if it is to
+            be served later, it is then returned by `nextReads`, REJECTED if
+            it is not to be served
+        """
+        key = (frm, request.identifier)
+        queue = self._queues.get(key)
+        # Reads of a DID on a connection are served in the order they are
+        # received
+        if queue is None and \
+                self._takeToken(request.identifier, frm, self._getTime()):
+            self.admittedCount += 1
+            return ADMITTED
+        if self._queuedPerConnection.get(frm, 0) >= self._maxQueued:
+            self.rejectedCount += 1
+            return REJECTED
+        if queue is None:
+            queue = self._queues[key] = deque()
+        queue.append(request)
+        self._queuedPerConnection[frm] = \
+            self._queuedPerConnection.get(frm, 0) + 1
+        self.queuedCount += 1
+        return QUEUED
+
+    def nextReads(self):
+        """
+        :return: list of (request, connection) of the queued reads which can
+            be served now, queues take turns, one read at a time
+        """
+        now = self._getTime()
+        reads = []
+        served = True
+        while served:
+            served = False
+            for key in list(self._queues):
+                frm, identifier = key
+                queue = self._queues[key]
+                if not self._takeToken(identifier, frm, now):
+                    continue
+                reads.append((queue.popleft(), frm))
+                served = True
+                self._queuedPerConnection[frm] -= 1
+                if not self._queuedPerConnection[frm]:
+                    del self._queuedPerConnection[frm]
+                if queue:
+                    self._queues.move_to_end(key)
+                else:
+                    del self._queues[key]
+        if now - self._droppedIdleAt >= 1:
+            self._dropIdleBuckets(now)
+        return reads
+
+    def _dropIdleBuckets(self, now):
+        for buckets in (self._clientBuckets, self._connectionBuckets):
+            for key in [key for key, bucket in buckets.items()
+                        if bucket.tokens(now) >= bucket.burst]:
+                del buckets[key]
+        self._droppedIdleAt = now
+
+    @property
+    def waitingCount(self):
+        return sum(self._queuedPerConnection.values())
+
+    @property
+    def stats(self):
+        return {
+            'admitted': self.admittedCount,
+            'queued': self.queuedCount,
+            'rejected': self.rejectedCount,
+            'waiting': self.waitingCount,
+            'limited_connections': len(self._queuedPerConnection),
+        }
@@ -0,0 +1,386 @@
+import json
+import os
+
+from common.serializers.serialization import state_roots_serializer
+from crypto.bls.bls_multi_signature import MultiSignature
+from plenum.bls.bls_store import BlsStore
+from plenum.common.constants import TXN_TYPE, CLIENT_STACK_SUFFIX
+from plenum.common.exceptions import InvalidClientRequest
+from plenum.common.messages.node_messages import Reply, RequestAck, \
+    RequestNack
+from plenum.common.stacks import ClientZStack
+from plenum.common.types import f
+from plenum.persistence.storage import initKeyValueStorage
+from state.pruning_state import PruningState
+from stp_core.common.log import getlogger
+from stp_core.loop.motor import Motor
+from stp_core.network.auth_mode import AuthMode
+from stp_core.loop.startable import Status
+from stp_core.types import HA
+
+from indy_common.types import SafeRequest
+from indy_node.persistence.attribute_store import AttributeStore
+from indy_node.persistence.author_index import AuthorIndex
+from indy_node.persistence.idr_cache import IdrCache
+from indy_node.persistence.state_root_index import StateRootIndex
+from indy_node.server.domain_req_handler import DomainReqHandler
+
+logger = getlogger()
+
+FEED_TXNS = 'txns'
+FEED_STATE_ROOT = 'stateRoot'
+FEED_MULTI_SIG = 'multiSig'
+FEED_OFFSET_FILE = 'feed_offset'
+
+
+class ReadReplicaFeed:
+    """
+    Append-only feed in the node's data directory describing every change
+    of the committed domain state: the committed txns (with attribute
+    values, which are not stored in the ledger) followed by the state root
+    after them and its BLS multi-signature. Read replicas follow this feed
+    since the node's key value stores can not be opened by another process
+    while the node is running.
+
+    Records are buffered by `append` and written by `flush`, which the node
+    calls once per looper iteration, so ordering does no file I/O. The feed
+    is written in segments `<fileName>.<offset>` named by the offset of
+    their first record in the whole feed, a new segment is started when the
+    last one reaches `segmentSize` bytes. Offsets stay valid when segments
+    the replica has read are removed by `removeRead`.
+    """
+
+    def __init__(self, dataLocation, fileName, segmentSize=None):
+        self.dataLocation = dataLocation
+        self.fileName = fileName
+        self.segmentSize = segmentSize
+        self._pending = []
+        self._tailChecked = False
+
+    @property
+    def path(self):
+        return os.path.join(self.dataLocation, self.fileName)
+
+    @property
+    def segments(self):
+        """
+        Sorted list of (offset of the first record, path) of the segments
+        """
+        prefix = self.fileName + '.'
+        if not os.path.isdir(self.dataLocation):
+            return []
+        segments = []
+        for name in os.listdir(self.dataLocation):
+            if name.startswith(prefix) and name[len(prefix):].isdigit():
+                segments.append((int(name[len(prefix):]),
+                                 os.path.join(self.dataLocation, name)))
+        return sorted(segments)
+
+    @property
+    def exists(self):
+        return bool(self.segments)
+
+    @property
+    def isComplete(self):
+        """
+        Whether the feed still starts with its first record, segments read
+        by the replica are removed
+        """
+        segments = self.segments
+        return bool(segments) and segments[0][0] == 0
+
+    @property
+    def endOffset(self):
+        segments = self.segments
+        if not segments:
+            return 0
+        start, path = segments[-1]
+        return start + os.path.getsize(path)
+
+    def append(self, txns, stateRoot=None, multiSig=None):
+        record = {
+            FEED_TXNS: txns,
+            FEED_STATE_ROOT: stateRoot,
+            FEED_MULTI_SIG: multiSig,
+        }
+        self._pending.append(json.dumps(record) + '\n')
+
+    def flush(self) -> int:
+        """
+        Writes the buffered records
+
+        :return: number of written records
+        """
+        if not self._pending:
+            return 0
+        if not self._tailChecked:
+            self._removePartialRecord()
+            self._tailChecked = True
+        data = ''.join(self._pending).encode()
+        count = len(self._pending)
+        self._pending = []
+        segments = self.segments
+        if not segments or (self.segmentSize and
+                            os.path.getsize(segments[-1][1]) >=
+                            self.segmentSize):
+            path = '{}.{:020d}'.format(self.path, self.endOffset)
+        else:
+            path = segments[-1][1]
+        with open(path, 'ab') as file:
+            file.write(data)
+            file.flush()
+        return count
+
+    def _removePartialRecord(self):
+        # A record the node was writing when it stopped is dropped, the
+        # node appends the txns the feed is missing on start
+        segments = self.segments
+        if not segments:
+            return
+        path = segments[-1][1]
+        with open(path, 'rb+') as file:
+            data = file.read()
+            if data and not data.endswith(b'\n'):
+                file.truncate(data.rfind(b'\n') + 1)
+
+    def bootstrap(self, txns, chunkSize, stateRoot, multiSig):
+        """
+        Writes already committed domain txns to the feed, the last record
+        carries the current committed state root
+        """
+        chunk = []
+        for txn in txns:
+            chunk.append(txn)
+            if len(chunk) == chunkSize:
+                self.append(chunk)
+                self.flush()
+                chunk = []
+        self.append(chunk, stateRoot=stateRoot, multiSig=multiSig)
+        self.flush()
+
+    def read(self, offset, limit=None):
+        """
+        Returns complete records written after `offset` together with the
+        offset right after each of them
+
+        :raises ValueError: if the records right after `offset` were
+            removed
+        """
+        segments = self.segments
+        if not segments:
+            return
+        if offset < segments[0][0]:
+            raise ValueError('records of {} before offset {} were removed'
+                             .format(self.path, segments[0][0]))
+        count = 0
+        for start, path in segments:
+            size = os.path.getsize(path)
+            if start + size <= offset:
+                continue
+            with open(path, 'rb') as file:
+                file.seek(offset - start)
+                for line in file:
+                    if not line.endswith(b'\n'):
+                        # The node is in the middle of writing this record
+                        return
+                    offset += len(line)
+                    yield json.loads(line.decode()), offset
+                    count += 1
+                    if limit is not None and count >= limit:
+                        return
+
+    def lastSeqNo(self) -> int:
+        """
+        Seq no of the last txn in the feed, 0 if it has none
+        """
+        for _, path in reversed(self.segments):
+            with open(path, 'rb') as file:
+                lines = file.read().split(b'\n')
+            # The part after the last newline is not a complete record
+            for line in reversed(lines[:-1]):
+                txns = json.loads(line.decode())[FEED_TXNS]
+                if txns:
+                    return txns[-1][f.SEQ_NO.nm]
+        return 0
+
+    def removeRead(self, offset) -> int:
+        """
+        Removes the segments which end before `offset`, the last segment is
+        never removed
+
+        :return: number of removed segments
+        """
+        segments = self.segments
+        removed = 0
+        for (_, path), (nextStart, _) in zip(segments, segments[1:]):
+            if nextStart > offset:
+                break
+            os.remove(path)
+            removed += 1
+        return removed
+
+
+def readFeedOffset(replicaDir) -> int:
+    """
+    Offset in the feed up to which the replica with the given data
+    directory has applied records
+    """
+    path = os.path.join(replicaDir, FEED_OFFSET_FILE)
+    if not os.path.isfile(path):
+        return 0
+    with open(path) as file:
+        return int(file.read().strip() or 0)
+
+
+class ReadReplica(Motor):
+    """
+    Answers GET_* requests outside of the node process. Keeps its own copy
+    of the committed domain state, IdrCache, AttributeStore, AuthorIndex
+    and BLS multi-signatures which is updated by following the node's
+    `ReadReplicaFeed`, and uses `DomainReqHandler` to build replies so
+    they carry the same state proofs and multi-signatures as the ones
+    produced by the node itself.
+    """
+
+    def __init__(self, name, nodeDataDir, keysDir, ha: HA, config):
+        super().__init__()
+        self.name = name
+        self.config = config
+        self.dataLocation = os.path.join(nodeDataDir,
+                                         config.readReplicaDirName)
+        os.makedirs(self.dataLocation, exist_ok=True)
+        self.feed = ReadReplicaFeed(nodeDataDir, config.readReplicaFeedFile)
+        self._offsetFile = os.path.join(self.dataLocation, FEED_OFFSET_FILE)
+        self.feedOffset = readFeedOffset(self.dataLocation)
+
+        self.state = PruningState(initKeyValueStorage(
+            config.domainStateStorage, self.dataLocation,
+            config.domainStateDbName))
+        self.idrCache = IdrCache(name, initKeyValueStorage(
+            config.idrCacheStorage, self.dataLocation,
+            config.idrCacheDbName), cacheSize=config.idrCacheLruSize)
+        self.attributeStore = AttributeStore(
+            initKeyValueStorage(config.attrStorage, self.dataLocation,
+                                config.attrDbName),
+            compressionThreshold=config.attrCompressionThreshold,
+            cacheSize=config.attrCacheSize)
+        self.authorIndex = AuthorIndex(name, initKeyValueStorage(
+            config.authorIndexStorage, self.dataLocation,
+            config.authorIndexDbName))
+        self.stateRootIndex = StateRootIndex(initKeyValueStorage(
+            config.stateRootIndexStorage, self.dataLocation,
+            config.stateRootIndexDbName))
+        self.blsStore = BlsStore(key_value_type=config.stateSignatureStorage,
+                                 data_location=self.dataLocation,
+                                 key_value_storage_name=config.stateSignatureDbName)
+        self.reqHandler = DomainReqHandler(ledger=None,
+                                           state=self.state,
+                                           config=config,
+                                           requestProcessor=None,
+                                           idrCache=self.idrCache,
+                                           attributeStore=self.attributeStore,
+                                           bls_store=self.blsStore,
+                                           authorIndex=self.authorIndex,
+                                           stateRootIndex=self.stateRootIndex)
+
+        self.clientstack = self.createClientStack(ha, keysDir)
+
+    def __repr__(self):
+        return self.name
+
+    def createClientStack(self, ha, keysDir):
+        # Uses the keys of the node's client stack, so clients can talk to
+        # the replica as to the node itself
+        cstack = dict(name=self.name + CLIENT_STACK_SUFFIX,
+                      ha=ha,
+                      main=True,
+                      auth_mode=AuthMode.ALLOW_ANY.value,
+                      basedirpath=keysDir)
+        return ClientZStack(cstack, self.handleOneClientMsg,
+                            config=self.config)
+
+    def _saveOffset(self):
+        tmp = self._offsetFile + '.tmp'
+        with open(tmp, 'w') as file:
+            file.write(str(self.feedOffset))
+        os.replace(tmp, self._offsetFile)
+
+    def follow(self, limit=None) -> int:
+        """
+        Applies feed records written by the node since the last call
+
+        :return: number of applied records
+        """
+        count = 0
+        for record, offset in self.feed.read(self.feedOffset, limit):
+            self.applyFeedRecord(record)
+            self.feedOffset = offset
+            self._saveOffset()
+            count += 1
+        return count
+
+    def applyFeedRecord(self, record):
+        # Same as the node does when recreating state from ledger, txns
+        # are applied one by one as each of them reads committed state
+        for txn in record[FEED_TXNS]:
+            self.reqHandler.updateState([txn], isCommitted=True)
+            self.state.commit(rootHash=self.state.headHash)
+        stateRoot = record[FEED_STATE_ROOT]
+        ownRoot = state_roots_serializer.serialize(
+            bytes(self.state.committedHeadHash))
+        if stateRoot is not None and ownRoot != stateRoot:
+            raise RuntimeError('{} state root {} differs from the node\'s {}'
+                               .format(self, ownRoot, stateRoot))
+        multiSig = record[FEED_MULTI_SIG]
+        if multiSig:
+            self.blsStore.put(MultiSignature.from_dict(**multiSig))
+        self.reqHandler.proofCache.clear()
+
+    def start(self, loop):
+        super().start(loop)
+        self.follow()
+        self.clientstack.start()
+        self.status = Status.started
+
+    async def prod(self, limit: int = None) -> int:
+        c = 0
+        if self.isGoing():
+            c += self.follow(self.config.readReplicaFollowBatch)
+            c += await self.clientstack.service(limit)
+        return c
+
+    def handleOneClientMsg(self, wrappedMsg):
+        msg, frm = wrappedMsg
+        try:
+            request = SafeRequest(**msg)
+        except Exception as ex:
+            logger.info('{} discarding invalid message {} from {}: {}'
+                        .format(self, msg, frm, ex))
+            return
+        if not self.reqHandler.is_query(request.operation[TXN_TYPE]):
+            self.clientstack.transmitToClient(
+                RequestNack(*request.key,
+                            'only read requests are served by a replica'),
+                frm)
+            return
+        try:
+            self.reqHandler.doStaticValidation(request)
+            result = self.reqHandler.get_query_response(request)
+        except InvalidClientRequest as ex:
+            self.clientstack.transmitToClient(
+                RequestNack(*request.key, str(ex)), frm)
+            return
+        self.clientstack.transmitToClient(RequestAck(*request.key), frm)
+        self.clientstack.transmitToClient(Reply(result), frm)
+
+    def _statusChanged(self, old, new):
+        pass
+
+    def onStopping(self, *args, **kwargs):
+        self.clientstack.stop()
+        self.state.close()
+        self.idrCache.close()
+        self.attributeStore.close()
+        self.authorIndex.close()
+        self.stateRootIndex.close()
+        self.blsStore.close()
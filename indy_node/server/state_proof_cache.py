@@ -0,0 +1,40 @@
+from plenum.common.constants import PROOF_NODES
+
+from indy_node.persistence.lru_cache import LRUCache
+
+
+class StateProofCache:
+    """
+    Caches state proofs generated for the committed state, keyed by the
+    committed state root and the path. Proofs are only valid for one root,
+    so the whole cache is dropped once the committed root changes.
+    The cache is bounded by the total size of the serialized proof nodes.
+    """
+
+    def __init__(self, maxBytes: int):
+        self._root = None
+        self._proofs = LRUCache(maxBytes, sizeOf=self._proof_size)
+
+    @staticmethod
+    def _proof_size(proof):
+        return len(proof[PROOF_NODES])
+
+    def get(self, root, path):
+        if root != self._root:
+            self._proofs.misses += 1
+            return None
+        return self._proofs.get(path)
+
+    def put(self, root, path, proof):
+        if root != self._root:
+            self.clear()
+            self._root = root
+        self._proofs.put(path, proof)
+
+    def clear(self):
+        self._proofs.clear()
+        self._root = None
+
+    @property
+    def stats(self):
+        return self._proofs.stats
@@ -0,0 +1,45 @@
+from indy_node.persistence.lru_cache import LRUCache
+
+
+class StateValueCache:
+    """
+    Caches decoded values of the committed domain state for paths which are
+    written once, like the ones of SCHEMAs and CLAIM_DEFs, keyed by the
+    path. Unlike proofs the values stay valid when the committed root
+    changes, so the cache is not dropped, a path is removed only when it
+    is written again.
+    The cache is bounded by the total size of the encoded values.
+    Cached values are shared by all the replies built from them and must
+    not be modified.
+    """
+
+    def __init__(self, maxBytes: int):
+        self._values = LRUCache(maxBytes, sizeOf=self._entry_size)
+
+    @staticmethod
+    def _entry_size(entry):
+        return entry[3]
+
+    def get(self, path):
+        """
+        :return: value, last seq no, last update time or None if the path
+            is not cached
+        """
+        entry = self._values.get(path)
+        if entry is None:
+            return None
+        return entry[:3]
+
+    def put(self, path, value, lastSeqNo, lastUpdateTime, encodedSize):
+        self._values.put(path, (value, lastSeqNo, lastUpdateTime,
+                                encodedSize))
+
+    def remove(self, path):
+        self._values.remove(path)
+
+    def clear(self):
+        self._values.clear()
+
+    @property
+    def stats(self):
+        return self._values.stats
@@ -1,6 +1,7 @@
 import importlib
 
 from indy_node.__metadata__ import __version__ as node_pgk_version
+from plenum.common.constants import DOMAIN_LEDGER_ID
 from plenum.server.validator_info_tool import none_on_fail, \
     ValidatorNodeInfoTool as PlenumValidatorNodeInfoTool
 
@@ -13,6 +14,19 @@ class ValidatorNodeInfoTool(PlenumValidatorNodeInfoTool):
         info['metrics']['transaction-count'].update(
             config=self.__config_ledger_size
         )
+        info['metrics'].update(
+            caches={
+                'state-proof': self.__state_proof_cache_stats,
+                'state-value': self.__state_value_cache_stats,
+                'idr-cache': self.__idr_cache_stats,
+            },
+            storage={
+                'attributes': self.__attribute_store_stats,
+            }
+        )
+        info['metrics']['read-admission'] = self.__read_admission_stats
+        info['metrics']['startup'] = self.__startup_stats
+        info['metrics']['latency'] = self.__latency_stats
         info.update(
             software={
                 'indy-node': self.__node_pkg_version,
@@ -26,6 +40,42 @@ class ValidatorNodeInfoTool(PlenumValidatorNodeInfoTool):
     def __config_ledger_size(self):
         return self._node.configLedger.size
 
+    @property
+    @none_on_fail
+    def __state_proof_cache_stats(self):
+        return self._node.get_req_handler(DOMAIN_LEDGER_ID).proofCache.stats
+
+    @property
+    @none_on_fail
+    def __state_value_cache_stats(self):
+        return self._node.get_req_handler(
+            DOMAIN_LEDGER_ID).writeOnceValueCache.stats
+
+    @property
+    @none_on_fail
+    def __idr_cache_stats(self):
+        return self._node.idrCache.cache_stats
+
+    @property
+    @none_on_fail
+    def __latency_stats(self):
+        return self._node.latencies.stats
+
+    @property
+    @none_on_fail
+    def __attribute_store_stats(self):
+        return self._node.attributeStore.stats
+
+    @property
+    @none_on_fail
+    def __read_admission_stats(self):
+        return self._node.readAdmission.stats
+
+    @property
+    @none_on_fail
+    def __startup_stats(self):
+        return self._node.startupProfile.stats
+
     @property
     @none_on_fail
     def __node_pkg_version(self):
@@ -0,0 +1,237 @@
+import copy
+
+import pytest
+from plenum.common.constants import TXN_TYPE, TARGET_NYM, TXN_TIME, \
+    IDENTIFIER, DATA, NAME, VERSION, VERKEY, ROLE, RAW
+from plenum.common.types import f
+from state.pruning_state import PruningState
+from storage.kv_in_memory import KeyValueStorageInMemory
+
+from indy_common.constants import NYM, ATTRIB, SCHEMA, TRUST_ANCHOR
+from indy_common.state import domain
+from indy_node.persistence.attribute_store import AttributeStore
+from indy_node.persistence.author_index import AuthorIndex
+from indy_node.persistence.idr_cache import IdrCache
+from indy_node.persistence.state_root_index import StateRootIndex
+from indy_node.server.catchup_state_applier import CatchupStateApplier
+from indy_node.server.domain_req_handler import DomainReqHandler
+
+
+class CountingStorage(KeyValueStorageInMemory):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def put(self, key, value):
+        self.writes += 1
+        super().put(key, value)
+
+    def setBatch(self, batch):
+        self.writes += len(batch)
+        super().setBatch(batch)
+
+
+def make_handler():
+    return DomainReqHandler(ledger=None,
+                            state=PruningState(CountingStorage()),
+                            config=None,
+                            requestProcessor=None,
+                            idrCache=IdrCache('Cache',
+                                              KeyValueStorageInMemory()),
+                            attributeStore=AttributeStore(
+                                KeyValueStorageInMemory()),
+                            bls_store=None,
+                            authorIndex=AuthorIndex(
+                                'Index', KeyValueStorageInMemory()),
+                            stateRootIndex=StateRootIndex(
+                                KeyValueStorageInMemory()))
+
+
+def make_txns(count):
+    # 3 txns per 3PC batch, NYMs of a few DIDs updated over and over. The
+    # handler takes fields out of the txns it applies, every consumer of the
+    # txns gets its own copy
+    txns = []
+    for seqNo in range(1, count + 1):
+        txn = {IDENTIFIER: 'trustee', f.SEQ_NO.nm: seqNo,
+               TXN_TIME: 1000 + seqNo // 3}
+        did = 'did{}'.format(seqNo % 7)
+        if seqNo % 5 == 0:
+            txn.update({TXN_TYPE: ATTRIB, TARGET_NYM: did,
+                        RAW: '{{"name":"{}"}}'.format(seqNo)})
+        elif seqNo % 11 == 0:
+            txn.update({TXN_TYPE: SCHEMA, IDENTIFIER: did,
+                        DATA: {NAME: 'schema', VERSION: str(seqNo),
+                               'attr_names': ['a', 'b']}})
+        else:
+            txn.update({TXN_TYPE: NYM, TARGET_NYM: did,
+                        VERKEY: '~vk{}'.format(seqNo)})
+            if seqNo % 3 == 0:
+                txn[ROLE] = TRUST_ANCHOR
+        txns.append(txn)
+    return txns
+
+
+def apply_one_by_one(handler, txns):
+    for txn in copy.deepcopy(txns):
+        handler.updateState([txn], isCommitted=True)
+        handler.state.commit(rootHash=handler.state.headHash)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 4, 10, 1000])
+def test_chunked_catchup_gives_same_state_and_stores(chunk_size):
+    txns = make_txns(100)
+    expected = make_handler()
+    apply_one_by_one(expected, txns)
+
+    handler = make_handler()
+    applier = CatchupStateApplier(handler, chunk_size)
+    for txn in copy.deepcopy(txns):
+        applier.add(txn)
+    applier.flush()
+    assert len(applier) == 0
+
+    root = bytes(handler.state.committedHeadHash)
+    assert root == bytes(expected.state.committedHeadHash)
+    assert handler.idrCache.committedStateRoot == root
+    assert handler.authorIndex.committedStateRoot == root
+    for seqNo in range(7):
+        did = 'did{}'.format(seqNo)
+        assert handler.idrCache.get(did, isCommitted=True) == \
+            expected.idrCache.get(did, isCommitted=True)
+        assert handler.authorIndex.listSchemas(did) == \
+            expected.authorIndex.listSchemas(did)
+    for txn in txns:
+        if txn[TXN_TYPE] == ATTRIB:
+            hashed = domain.hash_of(txn[RAW])
+            assert handler.attributeStore.get(hashed) == txn[RAW]
+    # The state as of any time is the same and can be read
+    for timestamp in range(1000, 1036):
+        stateRoot = handler.stateRootIndex.rootAt(timestamp, root)
+        assert stateRoot == expected.stateRootIndex.rootAt(timestamp, root)
+        handler.state.get_for_root_hash(
+            stateRoot, domain.make_state_path_for_nym('did1'))
+
+
+def test_chunked_catchup_writes_less_trie_nodes():
+    txns = make_txns(300)
+    expected = make_handler()
+    apply_one_by_one(expected, txns)
+
+    handler = make_handler()
+    applier = CatchupStateApplier(handler, 100)
+    for txn in copy.deepcopy(txns):
+        applier.add(txn)
+    applier.flush()
+    assert handler.state._kv.writes < expected.state._kv.writes
+
+
+def test_chunk_is_flushed_when_full():
+    handler = make_handler()
+    applier = CatchupStateApplier(handler, 10)
+    initialRoot = bytes(handler.state.committedHeadHash)
+    txns = make_txns(15)
+    for txn in copy.deepcopy(txns[:9]):
+        applier.add(txn)
+    assert len(applier) == 9
+    assert bytes(handler.state.committedHeadHash) == initialRoot
+
+    for txn in copy.deepcopy(txns[9:]):
+        applier.add(txn)
+    assert len(applier) == 5
+    flushedRoot = bytes(handler.state.committedHeadHash)
+    assert flushedRoot != initialRoot
+    assert handler.idrCache.committedStateRoot == flushedRoot
+
+
+def test_applied_seq_no_known_until_state_committed():
+    handler = make_handler()
+    applier = CatchupStateApplier(handler, 10)
+    assert CatchupStateApplier.appliedSeqNo(handler.state) is None
+    txns = make_txns(15)
+    for txn in copy.deepcopy(txns[:12]):
+        applier.add(txn)
+    # Stopped before the second chunk is flushed
+    assert CatchupStateApplier.appliedSeqNo(handler.state) == 10
+
+    restarted = PruningState(handler.state._kv)
+    assert CatchupStateApplier.appliedSeqNo(restarted) == 10
+
+    applier.flush()
+    assert CatchupStateApplier.appliedSeqNo(handler.state) == 12
+    apply_one_by_one(handler, txns[12:])
+    assert CatchupStateApplier.appliedSeqNo(handler.state) is None
+
+
+def test_first_chunk_on_existing_state_is_known_to_apply_again():
+    handler = make_handler()
+    txns = make_txns(15)
+    apply_one_by_one(handler, txns[:5])
+    applier = CatchupStateApplier(handler, 10)
+    applier.add(copy.deepcopy(txns[5]))
+    assert CatchupStateApplier.appliedSeqNo(handler.state) == 5
+
+
+def test_chunk_stopped_before_state_committed_is_applied_again():
+    txns = make_txns(25)
+    expected = make_handler()
+    apply_one_by_one(expected, txns)
+
+    handler = make_handler()
+    applier = CatchupStateApplier(handler, 10)
+    for txn in copy.deepcopy(txns[:10]):
+        applier.add(txn)
+    storage = handler.state._kv
+
+    def stop(batch):
+        raise IOError('stopped')
+
+    # Stopped after the stores of the second chunk are written
+    storage.setBatch = stop
+    with pytest.raises(IOError):
+        for txn in copy.deepcopy(txns[10:20]):
+            applier.add(txn)
+    del storage.setBatch
+    assert handler.idrCache.committedStateRoot != \
+        bytes(storage.get(PruningState.rootHashKey))
+
+    # The txns are applied on start as the node does it
+    handler.state = PruningState(storage)
+    seqNo = CatchupStateApplier.appliedSeqNo(handler.state)
+    assert seqNo == 10
+    apply_one_by_one(handler, txns[seqNo:])
+    root = bytes(handler.state.committedHeadHash)
+    assert root == bytes(expected.state.committedHeadHash)
+    assert handler.idrCache.committedStateRoot == root
+    for i in range(7):
+        did = 'did{}'.format(i)
+        assert handler.idrCache.get(did, isCommitted=True) == \
+            expected.idrCache.get(did, isCommitted=True)
+    for txn in txns:
+        if txn[TXN_TYPE] == ATTRIB:
+            hashed = domain.hash_of(txn[RAW])
+            assert handler.attributeStore.get(hashed) == txn[RAW]
+
+
+def test_state_not_giving_trusted_root_is_not_committed():
+    txns = make_txns(20)
+    expected = make_handler()
+    apply_one_by_one(expected, txns)
+    trustedRoot = bytes(expected.state.committedHeadHash)
+
+    handler = make_handler()
+    initialRoot = bytes(handler.state.committedHeadHash)
+    applier = CatchupStateApplier(handler, 100)
+    for txn in copy.deepcopy(txns[:10]):
+        applier.add(txn)
+    with pytest.raises(ValueError, match='trusted root'):
+        applier.flush(trustedRoot=trustedRoot)
+    assert len(applier) == 0
+    assert bytes(handler.state.committedHeadHash) == initialRoot
+    assert bytes(handler.state.headHash) == initialRoot
+    assert handler.idrCache.committedStateRoot is None
+
+    for txn in copy.deepcopy(txns):
+        applier.add(txn)
+    applier.flush(trustedRoot=trustedRoot)
+    assert bytes(handler.state.committedHeadHash) == trustedRoot
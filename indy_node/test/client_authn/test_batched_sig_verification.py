@@ -0,0 +1,74 @@
+import pytest
+from plenum.common.constants import TXN_TYPE, TARGET_NYM, VERKEY
+from plenum.common.exceptions import InsufficientCorrectSignatures, \
+    CouldNotAuthenticate
+from plenum.common.signer_simple import SimpleSigner
+from plenum.common.types import f, OPERATION
+from storage.kv_in_memory import KeyValueStorageInMemory
+
+from indy_common.constants import NYM
+from indy_node.persistence.idr_cache import IdrCache
+from indy_node.server.batched_sig_verifier import BatchedSigVerifier, \
+    SignatureChecks
+from indy_node.server.client_authn import LedgerBasedAuthNr
+
+
+@pytest.fixture()
+def signer():
+    return SimpleSigner()
+
+
+@pytest.fixture()
+def authnr(signer):
+    cache = IdrCache('Cache', KeyValueStorageInMemory())
+    cache.set(signer.identifier, 1, 1, verkey=signer.verkey)
+    return LedgerBasedAuthNr(cache)
+
+
+def signed_request(signer, reqId):
+    req = {
+        f.IDENTIFIER.nm: signer.identifier,
+        f.REQ_ID.nm: reqId,
+        OPERATION: {
+            TXN_TYPE: NYM,
+            TARGET_NYM: SimpleSigner().identifier,
+            VERKEY: SimpleSigner().verkey,
+        },
+    }
+    req[f.SIG.nm] = signer.sign(req)
+    return req
+
+
+def collect_checks(authnr, req):
+    authnr.deferredChecks = SignatureChecks()
+    try:
+        authnr.authenticate(req)
+        return authnr.deferredChecks
+    finally:
+        authnr.deferredChecks = None
+
+
+def test_signatures_verified_in_order_of_requests(authnr, signer):
+    verifier = BatchedSigVerifier(workers=2)
+    requests = [signed_request(signer, reqId) for reqId in range(1, 6)]
+    # A signature of another request
+    requests[1][f.SIG.nm] = requests[0][f.SIG.nm]
+    for req in requests:
+        verifier.add(req, 'client', collect_checks(authnr, req))
+    # A query, not signed
+    verifier.add({f.REQ_ID.nm: 6}, 'client', SignatureChecks())
+
+    results = verifier.verify()
+    verifier.stop()
+
+    assert [msg[f.REQ_ID.nm] for msg, _, _ in results] == list(range(1, 7))
+    errors = [ex for _, _, ex in results]
+    assert isinstance(errors[1], InsufficientCorrectSignatures)
+    assert errors[:1] + errors[2:] == [None] * 5
+    assert len(verifier) == 0
+
+
+def test_unknown_identifier_fails_when_collecting(authnr):
+    req = signed_request(SimpleSigner(), 1)
+    with pytest.raises(CouldNotAuthenticate):
+        collect_checks(authnr, req)
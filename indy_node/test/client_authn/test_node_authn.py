@@ -0,0 +1,47 @@
+import pytest
+from plenum.common.constants import TARGET_NYM, VERKEY, DATA, ALIAS
+from plenum.common.exceptions import UnknownIdentifier
+
+from indy_node.server.node_authn import NodeAuthNr
+
+NODE_DID = 'Gw6pDLhcBcoQesN72qfotTgFa7cbuqZpkX3Xo6pLhPhv'
+OTHER_NODE_DID = '8QhFxKxyaFsJy4CyxeYX34dFH8oWqyBv1P4HLQCsoeLy'
+
+
+class PoolLedger:
+    def __init__(self, txns):
+        self.txns = list(txns)
+        self.read_from = []
+
+    @property
+    def size(self):
+        return len(self.txns)
+
+    def getAllTxn(self, frm=None, to=None):
+        self.read_from.append(frm)
+        for seqNo, txn in enumerate(self.txns[frm - 1:], frm):
+            yield seqNo, txn
+
+
+def node_txn(did, verkey=None):
+    txn = {TARGET_NYM: did, DATA: {ALIAS: 'Node'}}
+    if verkey:
+        txn[VERKEY] = verkey
+    return txn
+
+
+def test_verkeys_indexed_once_and_updated_with_new_txns():
+    ledger = PoolLedger([node_txn(NODE_DID, '~verkey1'),
+                         node_txn(OTHER_NODE_DID),
+                         node_txn(NODE_DID)])
+    authnr = NodeAuthNr(ledger)
+    assert authnr.getVerkey(NODE_DID) == '~verkey1'
+    assert authnr.getVerkey(OTHER_NODE_DID) == OTHER_NODE_DID
+    with pytest.raises(UnknownIdentifier):
+        authnr.getVerkey('UnknownDid')
+    assert ledger.read_from == [1]
+
+    ledger.txns.append(node_txn(NODE_DID, '~verkey2'))
+    assert authnr.getVerkey(NODE_DID) == '~verkey2'
+    assert authnr.getVerkey(OTHER_NODE_DID) == OTHER_NODE_DID
+    assert ledger.read_from == [1, 4]
@@ -0,0 +1,74 @@
+import zlib
+
+import pytest
+from storage.kv_in_memory import KeyValueStorageInMemory
+
+from indy_node.persistence.attribute_store import AttributeStore
+
+
+@pytest.fixture()
+def kvs():
+    return KeyValueStorageInMemory()
+
+
+def test_small_values_stored_verbatim(kvs):
+    store = AttributeStore(kvs, compressionThreshold=100)
+    store.set('key', '{"name":"Alice"}')
+    assert kvs.get('key') == b'{"name":"Alice"}'
+    assert store.get('key') == '{"name":"Alice"}'
+
+
+def test_large_values_compressed(kvs):
+    store = AttributeStore(kvs, compressionThreshold=100)
+    value = '{"endpoint":{"ha":"' + '127.0.0.1:9700,' * 100 + '"}}'
+    store.set('key', value)
+    assert len(kvs.get('key')) < len(value)
+    assert store.get('key') == value
+    stats = store.stats
+    assert stats['compressed'] == 1
+    assert stats['db_size'] == 0
+    assert stats['compression_ratio'] > 1
+
+
+def test_incompressible_values_stored_verbatim(kvs):
+    store = AttributeStore(kvs, compressionThreshold=10)
+    value = zlib.compress(b'0123456789abcdef' * 4).hex()[:40]
+    store.set('key', value)
+    assert store.get('key') == value
+    assert store.stats['compressed'] == 0
+
+
+def test_values_written_before_compression_readable(kvs):
+    value = 'x' * 5000
+    kvs.put('key', value)
+    assert AttributeStore(kvs).get('key') == value
+
+
+def test_get_many_and_prefetched(kvs):
+    store = AttributeStore(kvs)
+    for i in range(5):
+        store.set('key{}'.format(i), 'value{}'.format(i))
+    assert store.getMany(['key3', 'key1', 'key1', 'missing']) == \
+        {'key1': 'value1', 'key3': 'value3'}
+
+    read = []
+    origGet = kvs.get
+    kvs.get = lambda key: read.append(key) or origGet(key)
+    with store.prefetched(['key4', 'key2', 'key0']):
+        assert read == ['key0', 'key2', 'key4']
+        assert store.get('key2') == 'value2'
+        assert store.get('key4') == 'value4'
+        assert len(read) == 3
+    with pytest.raises(KeyError):
+        store.get('missing')
+
+
+def test_read_values_cached_until_removed(kvs):
+    store = AttributeStore(kvs, cacheSize=10)
+    store.set('key', 'value')
+    assert store.get('key') == 'value'
+    assert store.get('key') == 'value'
+    assert store.stats['cache']['hits'] == 1
+    store.remove('key')
+    with pytest.raises(KeyError):
+        store.get('key')
@@ -0,0 +1,65 @@
+import pytest
+from storage.kv_in_memory import KeyValueStorageInMemory
+
+from indy_node.persistence.author_index import AuthorIndex
+
+AUTHOR = 'Gw6pDLhcBcoQesN72qfotTgFa7cbuqZpkX3Xo6pLhPhv'
+OTHER_AUTHOR = 'CzkavE58zgX7rUMrzSinLr'
+
+
+@pytest.fixture()
+def index():
+    return AuthorIndex('Index', KeyValueStorageInMemory())
+
+
+def add_schema(index, author, version, isCommitted=True):
+    index.addSchema(author, 'schema', version,
+                    '{}:schema:{}'.format(author, version).encode(),
+                    isCommitted=isCommitted)
+
+
+def test_schemas_listed_by_pages(index):
+    for version in ['1.2', '1.0', '1.1']:
+        add_schema(index, AUTHOR, version)
+    add_schema(index, OTHER_AUTHOR, '1.0')
+
+    page, start = index.listSchemas(AUTHOR, limit=2)
+    assert [version for _, version, _ in page] == ['1.0', '1.1']
+    page, start = index.listSchemas(AUTHOR, start, limit=2)
+    assert page == [('schema', '1.2',
+                     '{}:schema:1.2'.format(AUTHOR).encode())]
+    assert start is None
+    assert index.listSchemas('NoSuchAuthor1111111111') == ([], None)
+
+
+def test_claim_defs_listed_per_schema(index):
+    index.addClaimDef(AUTHOR, 1, 'CL', b'path1', isCommitted=True)
+    index.addClaimDef(AUTHOR, 12, 'CL', b'path12', isCommitted=True)
+    index.addClaimDef(OTHER_AUTHOR, 12, 'CL', b'other12', isCommitted=True)
+
+    page, start = index.listClaimDefs(12)
+    assert page == [(OTHER_AUTHOR, 'CL', b'other12'),
+                    (AUTHOR, 'CL', b'path12')]
+    assert start is None
+
+
+def test_uncommitted_entries_listed_after_commit(index):
+    add_schema(index, AUTHOR, '1.0', isCommitted=False)
+    index.currentBatchCreated(b'root1')
+    assert index.listSchemas(AUTHOR) == ([], None)
+
+    index.onBatchCommitted(b'root1')
+    assert len(index.listSchemas(AUTHOR)[0]) == 1
+    assert index.committedStateRoot == b'root1'
+
+
+def test_rejected_entries_never_listed(index):
+    add_schema(index, AUTHOR, '1.0', isCommitted=False)
+    index.currentBatchCreated(b'root1')
+    add_schema(index, AUTHOR, '2.0', isCommitted=False)
+    index.currentBatchCreated(b'root2')
+    index.batchRejected()
+
+    index.onBatchCommitted(b'root1')
+    assert [v for _, v, _ in index.listSchemas(AUTHOR)[0]] == ['1.0']
+    assert not index.un_committed
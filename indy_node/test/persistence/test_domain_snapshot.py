@@ -0,0 +1,281 @@
+from hashlib import sha256
+
+import pytest
+import rlp
+from common.serializers.serialization import state_roots_serializer, \
+    ledger_txn_serializer
+from crypto.bls.bls_multi_signature import MultiSignature, \
+    MultiSignatureValue
+from ledger.compact_merkle_tree import CompactMerkleTree
+from plenum.common.constants import TXN_TYPE, TARGET_NYM, TXN_TIME, \
+    IDENTIFIER, VERKEY, RAW, DOMAIN_LEDGER_ID
+from plenum.common.ledger import Ledger
+from plenum.common.types import f
+from state.pruning_state import PruningState
+from state.util.utils import sha3
+from storage.kv_in_memory import KeyValueStorageInMemory
+
+from indy_common.constants import NYM, ATTRIB
+from indy_common.state import domain
+from indy_node.persistence.attribute_store import AttributeStore
+from indy_node.persistence.author_index import AuthorIndex
+from indy_node.persistence.domain_snapshot import DomainSnapshotWriter, \
+    DomainSnapshotReader, snapshot_serializer, MANIFEST_CHUNKS, \
+    CHUNK_STORE, CHUNK_ITEMS, CHUNK_HASH
+from indy_node.persistence.idr_cache import IdrCache
+from indy_node.persistence.state_root_index import StateRootIndex
+from indy_node.server.domain_req_handler import DomainReqHandler
+
+
+def make_handler():
+    return DomainReqHandler(ledger=None,
+                            state=PruningState(KeyValueStorageInMemory()),
+                            config=None,
+                            requestProcessor=None,
+                            idrCache=IdrCache('Cache',
+                                              KeyValueStorageInMemory()),
+                            attributeStore=AttributeStore(
+                                KeyValueStorageInMemory()),
+                            bls_store=None,
+                            authorIndex=AuthorIndex(
+                                'Index', KeyValueStorageInMemory()),
+                            stateRootIndex=StateRootIndex(
+                                KeyValueStorageInMemory()))
+
+
+def make_txn(seqNo):
+    did = 'did{}'.format(seqNo % 5)
+    if seqNo % 4 == 0:
+        return {TXN_TYPE: ATTRIB, TARGET_NYM: did, IDENTIFIER: did,
+                RAW: '{{"name":"{}"}}'.format(seqNo),
+                TXN_TIME: 1000 + seqNo}
+    return {TXN_TYPE: NYM, TARGET_NYM: did, IDENTIFIER: 'trustee',
+            VERKEY: '~vk{}'.format(seqNo), TXN_TIME: 1000 + seqNo}
+
+
+def make_ledger(tmpdir, name):
+    return Ledger(CompactMerkleTree(), dataDir=str(tmpdir), fileName=name)
+
+
+@pytest.fixture()
+def source(tmpdir):
+    ledger = make_ledger(tmpdir, 'source_transactions')
+    handler = make_handler()
+    for seqNo in range(1, 31):
+        txn = make_txn(seqNo)
+        ledger.add(DomainReqHandler.transform_txn_for_ledger(dict(txn)))
+        txn[f.SEQ_NO.nm] = seqNo
+        handler.updateState([txn], isCommitted=True)
+        handler.state.commit(rootHash=handler.state.headHash)
+    yield ledger, handler
+    ledger.stop()
+
+
+@pytest.fixture()
+def target_ledger(tmpdir):
+    ledger = make_ledger(tmpdir, 'target_transactions')
+    yield ledger
+    ledger.stop()
+
+
+def export(tmpdir, source, multiSig=None):
+    ledger, handler = source
+    path = str(tmpdir.join('domain.snapshot'))
+    DomainSnapshotWriter(chunkSize=7).write(
+        path, ledger, handler.state._kv,
+        handler.attributeStore._keyValueStorage, multiSig=multiSig)
+    return path
+
+
+def import_into(path, ledger, handler, multiSigVerifier=None):
+    reader = DomainSnapshotReader(path)
+    try:
+        return reader.importInto(ledger, handler.state._kv,
+                                 handler.attributeStore._keyValueStorage,
+                                 handler.idrCache._keyValueStorage,
+                                 handler.authorIndex._keyValueStorage,
+                                 multiSigVerifier=multiSigVerifier)
+    finally:
+        reader.close()
+
+
+def read_chunks(path):
+    reader = DomainSnapshotReader(path)
+    try:
+        return reader.manifest, [
+            snapshot_serializer.deserialize(reader._readRecord())
+            for _ in reader.manifest[MANIFEST_CHUNKS]]
+    finally:
+        reader.close()
+
+
+def forge(path, change):
+    """
+    Changes the chunks of a snapshot and the hashes of the chunks in its
+    manifest, as anyone can
+    """
+    manifest, chunks = read_chunks(path)
+    payloads = []
+    for index, chunk in enumerate(chunks):
+        change(chunk)
+        payload = snapshot_serializer.serialize(chunk)
+        manifest[MANIFEST_CHUNKS][index][CHUNK_HASH] = \
+            sha256(payload).hexdigest()
+        payloads.append(payload)
+    with open(path, 'wb') as file:
+        file.write(DomainSnapshotWriter.MAGIC)
+        DomainSnapshotWriter._writeRecord(
+            file, snapshot_serializer.serialize(manifest))
+        for payload in payloads:
+            DomainSnapshotWriter._writeRecord(file, payload)
+
+
+def multi_sig(ledger, handler, signature='valid', txn_root=None):
+    return MultiSignature(
+        signature, ['Alpha', 'Beta', 'Gamma'],
+        MultiSignatureValue(ledger_id=DOMAIN_LEDGER_ID,
+                            state_root_hash=state_roots_serializer.serialize(
+                                bytes(handler.state.committedHeadHash)),
+                            pool_state_root_hash='1' * 32,
+                            txn_root_hash=txn_root or ledger.root_hash,
+                            timestamp=1030))
+
+
+class Pool:
+    def verify(self, multiSig):
+        return multiSig.signature == 'valid'
+
+
+def is_empty(handler):
+    return all(bytes(key) == PruningState.rootHashKey
+               for key, _ in handler.state._kv.iterator())
+
+
+def test_imported_snapshot_has_same_ledger_state_and_stores(
+        tmpdir, source, target_ledger):
+    ledger, expected = source
+    path = export(tmpdir, source,
+                  multiSig=multi_sig(ledger, expected).as_dict())
+    assert {chunk[CHUNK_STORE] for chunk in read_chunks(path)[1]} == \
+        {'ledger', 'state', 'attrs'}
+    handler = make_handler()
+    stats = import_into(path, target_ledger, handler, Pool())
+    assert stats['seq_no'] == 30
+    assert stats['txns_added'] == 30
+
+    assert target_ledger.root_hash == ledger.root_hash
+    # The state is read as a node reads it after a restart
+    state = PruningState(handler.state._kv)
+    root = bytes(expected.state.committedHeadHash)
+    assert bytes(state.committedHeadHash) == root
+    for i in range(5):
+        did = 'did{}'.format(i)
+        path = domain.make_state_path_for_nym(did)
+        assert state.get(path, isCommitted=True) == \
+            expected.state.get(path, isCommitted=True)
+        # Rebuilt from the ledger
+        assert handler.idrCache.get(did, isCommitted=True) == \
+            expected.idrCache.get(did, isCommitted=True)
+    assert handler.idrCache.committedStateRoot == root
+    assert handler.authorIndex.committedStateRoot == root
+    for seqNo in range(4, 31, 4):
+        raw = make_txn(seqNo)[RAW]
+        assert handler.attributeStore.get(domain.hash_of(raw)) == raw
+
+
+def test_snapshot_not_signed_by_pool_is_not_imported(tmpdir, source,
+                                                     target_ledger):
+    ledger, expected = source
+    handler = make_handler()
+    with pytest.raises(ValueError, match='no multi-signature'):
+        import_into(export(tmpdir, source), target_ledger, handler, Pool())
+    path = export(tmpdir, source, multiSig=multi_sig(
+        ledger, expected, signature='forged').as_dict())
+    with pytest.raises(ValueError, match='not valid'):
+        import_into(path, target_ledger, handler, Pool())
+    assert target_ledger.size == 0
+    assert is_empty(handler)
+
+
+def test_non_empty_ledger_is_refused(tmpdir, source, target_ledger):
+    path = export(tmpdir, source)
+    target_ledger.add(DomainReqHandler.transform_txn_for_ledger(make_txn(1)))
+    with pytest.raises(ValueError, match='to be empty'):
+        import_into(path, target_ledger, make_handler())
+
+
+def test_corrupted_chunk_is_detected(tmpdir, source, target_ledger):
+    path = export(tmpdir, source)
+    with open(path, 'rb') as file:
+        data = bytearray(file.read())
+    data[-10] ^= 1
+    with open(path, 'wb') as file:
+        file.write(data)
+    with pytest.raises(ValueError, match='corrupted'):
+        import_into(path, target_ledger, make_handler())
+
+
+def change_txn(chunk):
+    if chunk[CHUNK_STORE] == 'ledger' and chunk[CHUNK_ITEMS][0][0] == 1:
+        chunk[CHUNK_ITEMS][2][1] = ledger_txn_serializer.serialize(
+            DomainReqHandler.transform_txn_for_ledger(make_txn(7)))
+
+
+def change_trie_node(chunk):
+    if chunk[CHUNK_STORE] == 'state':
+        node = chunk[CHUNK_ITEMS][0][1]
+        chunk[CHUNK_ITEMS][0][1] = node[:-1] + bytes([node[-1] ^ 1])
+
+
+def add_trie_node(chunk):
+    if chunk[CHUNK_STORE] == 'state':
+        node = rlp.encode([b'\x20extra', b'value' * 10])
+        chunk[CHUNK_ITEMS].append([sha3(node), node])
+
+
+def change_attr(chunk):
+    if chunk[CHUNK_STORE] == 'attrs':
+        chunk[CHUNK_ITEMS][0][1] = \
+            AttributeStore.packValue('{"name":"forged"}')
+
+
+def add_idr_cache(chunk):
+    # Snapshots do not have the IdrCache, it is rebuilt from the ledger
+    if chunk[CHUNK_STORE] == 'attrs':
+        chunk[CHUNK_STORE] = 'idr_cache'
+        chunk[CHUNK_ITEMS] = [[b'did1', b'forged']]
+
+
+@pytest.mark.parametrize('change, match', [
+    (change_txn, 'ledger of 30 txns'),
+    (change_trie_node, 'does not match its hash'),
+    (add_trie_node, 'of them are in the state'),
+    (change_attr, 'attribute'),
+    (add_idr_cache, 'not known'),
+])
+def test_forged_snapshot_is_detected(tmpdir, source, target_ledger, change,
+                                     match):
+    path = export(tmpdir, source)
+    forge(path, change)
+    with pytest.raises(ValueError, match=match):
+        import_into(path, target_ledger, make_handler())
+
+
+def test_multi_signature_is_checked_with_snapshot_roots(tmpdir, source):
+    ledger, handler = source
+    reader = DomainSnapshotReader(export(tmpdir, source))
+    assert reader.multiSig is None
+    reader.close()
+
+    signed = multi_sig(ledger, handler)
+    reader = DomainSnapshotReader(
+        export(tmpdir, source, multiSig=signed.as_dict()))
+    assert reader.multiSig == signed
+    reader.close()
+
+    reader = DomainSnapshotReader(export(
+        tmpdir, source,
+        multiSig=multi_sig(ledger, handler, txn_root='2' * 32).as_dict()))
+    with pytest.raises(ValueError):
+        reader.multiSig
+    reader.close()
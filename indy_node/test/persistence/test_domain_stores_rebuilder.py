@@ -0,0 +1,105 @@
+import pytest
+from plenum.common.constants import TXN_TYPE, TARGET_NYM, TXN_TIME, \
+    IDENTIFIER, DATA, NAME, VERSION
+from plenum.common.types import f
+from storage.kv_in_memory import KeyValueStorageInMemory
+
+from indy_common.constants import NYM, ATTRIB, TRUST_ANCHOR, SCHEMA, \
+    CLAIM_DEF, REF, SIGNATURE_TYPE
+from indy_common.state import domain
+from indy_node.persistence.attribute_store import AttributeStore
+from indy_node.persistence.author_index import AuthorIndex
+from indy_node.persistence.domain_stores_rebuilder import \
+    DomainStoresRebuilder
+from indy_node.persistence.idr_cache import IdrCache
+
+
+def nym_txn(seq_no, dest, identifier, **fields):
+    return {TXN_TYPE: NYM, TARGET_NYM: dest, IDENTIFIER: identifier,
+            f.SEQ_NO.nm: seq_no, TXN_TIME: 1000 + seq_no, **fields}
+
+
+def attrib_txn(seq_no, dest, **fields):
+    return {TXN_TYPE: ATTRIB, TARGET_NYM: dest, IDENTIFIER: dest,
+            f.SEQ_NO.nm: seq_no, TXN_TIME: 1000 + seq_no, **fields}
+
+
+@pytest.fixture()
+def txns():
+    return [
+        nym_txn(1, 'did1', 'trustee', verkey='~vk1', role=TRUST_ANCHOR),
+        nym_txn(2, 'did2', 'did1', verkey='~vk2'),
+        attrib_txn(3, 'did2', raw='{"name":"Alice"}'),
+        # Key rotation keeps the role, removing the role keeps the verkey
+        nym_txn(4, 'did1', 'did1', verkey='~vk1new'),
+        nym_txn(5, 'did1', 'trustee', role=None),
+        attrib_txn(6, 'did2', enc='encrypted'),
+        attrib_txn(7, 'did2', hash='ab' * 32),
+    ]
+
+
+def check_rebuilt(idrStorage, attrStorage):
+    assert DomainStoresRebuilder.CHECKPOINT_KEY not in idrStorage
+    idrCache = IdrCache('Cache', idrStorage)
+    assert idrCache.get('did1') == (5, 1005, 'trustee', '', '~vk1new')
+    assert idrCache.get('did2') == (2, 1002, 'did1', '', '~vk2')
+    attrStore = AttributeStore(attrStorage)
+    raw = '{"name":"Alice"}'
+    assert attrStore.get(domain.hash_of(raw)) == raw
+    assert attrStore.get(domain.hash_of('encrypted')) == 'encrypted'
+
+
+def test_rebuild_idr_cache_and_attributes(txns):
+    idrStorage = KeyValueStorageInMemory()
+    attrStorage = KeyValueStorageInMemory()
+    rebuilder = DomainStoresRebuilder(idrStorage, attrStorage, batchSize=2)
+    stats = rebuilder.rebuild(txns)
+    assert stats['txns'] == len(txns)
+    assert stats['nyms'] == 4
+    assert stats['attrs'] == 2
+    assert stats['txns_per_second'] is not None
+    check_rebuilt(idrStorage, attrStorage)
+
+
+def test_interrupted_rebuild_resumes(txns):
+    idrStorage = KeyValueStorageInMemory()
+    attrStorage = KeyValueStorageInMemory()
+
+    def interrupted():
+        yield from txns[:5]
+        raise InterruptedError()
+
+    with pytest.raises(InterruptedError):
+        DomainStoresRebuilder(idrStorage, attrStorage,
+                              batchSize=2).rebuild(interrupted())
+    rebuilder = DomainStoresRebuilder(idrStorage, attrStorage, batchSize=2)
+    assert rebuilder.checkpoint == 4
+    stats = rebuilder.rebuild(txns)
+    assert stats['skipped'] == 4
+    assert stats['txns'] == 3
+    check_rebuilt(idrStorage, attrStorage)
+
+
+def test_rebuild_author_index(txns):
+    txns = txns + [
+        {TXN_TYPE: SCHEMA, IDENTIFIER: 'did1', f.SEQ_NO.nm: 8,
+         TXN_TIME: 1008, DATA: {NAME: 'degree', VERSION: '1.0',
+                                'attr_names': ['name']}},
+        {TXN_TYPE: CLAIM_DEF, IDENTIFIER: 'did1', f.SEQ_NO.nm: 9,
+         TXN_TIME: 1009, REF: 8, SIGNATURE_TYPE: 'CL',
+         DATA: {'primary': {}}},
+    ]
+    indexStorage = KeyValueStorageInMemory()
+    stats = DomainStoresRebuilder(authorIndexStorage=indexStorage,
+                                  batchSize=2).rebuild(txns)
+    assert stats['schemas'] == 1
+    assert stats['claim_defs'] == 1
+    index = AuthorIndex('Index', indexStorage)
+    assert index.listSchemas('did1') == (
+        [('degree', '1.0',
+          domain.make_state_path_for_schema('did1', 'degree', '1.0'))],
+        None)
+    assert index.listClaimDefs(8) == (
+        [('did1', 'CL',
+          domain.make_state_path_for_claim_def('did1', 8, 'CL'))],
+        None)
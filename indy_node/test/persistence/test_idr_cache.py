@@ -53,3 +53,119 @@ def test_committed_and_uncommitted():
     cache.set(identifier, *uncommitted_items, isCommitted=False)
     assert uncommitted_items == cache.get(identifier, isCommitted=False)
     assert committed_items == cache.get(identifier, isCommitted=True)
+
+
+def test_cached_value_returned_for_hot_identifier():
+    """
+    Check that repeated reads are served from the decoded records cache
+    """
+    cache = make_idr_cache()
+    cache.set(identifier, *committed_items)
+    assert committed_items == cache.get(identifier)
+    assert committed_items == cache.get(identifier)
+    stats = cache.cache_stats['committed']
+    assert stats['misses'] == 1
+    assert stats['hits'] == 1
+    # Only the lookup of the record not in the cache is timed
+    assert cache.cache_stats['miss-latency']['count'] == 1
+
+
+def test_cache_invalidated_on_batch_reject():
+    cache = make_idr_cache()
+    cache.set(identifier, *committed_items)
+    cache.set(identifier, *uncommitted_items, isCommitted=False)
+    cache.currentBatchCreated(b'root')
+    assert uncommitted_items == cache.get(identifier, isCommitted=False)
+    cache.batchRejected()
+    assert committed_items == cache.get(identifier, isCommitted=False)
+
+
+def test_cache_invalidated_on_batch_commit():
+    cache = make_idr_cache()
+    cache.set(identifier, *committed_items)
+    assert committed_items == cache.get(identifier)
+    cache.set(identifier, *uncommitted_items, isCommitted=False)
+    cache.currentBatchCreated(b'root')
+    assert committed_items == cache.get(identifier)
+    cache.onBatchCommitted(b'root')
+    assert uncommitted_items == cache.get(identifier)
+    assert uncommitted_items == cache.get(identifier, isCommitted=False)
+
+
+def test_cache_size_is_bounded():
+    cache = IdrCache("TestCache", KeyValueStorageInMemory(), cacheSize=2)
+    for i in range(5):
+        cache.set(identifier + str(i), *committed_items)
+        cache.get(identifier + str(i))
+    assert cache.cache_stats['committed']['size'] == 2
+
+
+def test_lookup_context_loads_record_once():
+    cache = make_idr_cache()
+    cache.set(identifier, *committed_items)
+    lookup = cache.lookupContext
+    assert lookup.getVerkey(identifier) == committed_items[4]
+    assert lookup.getRole(identifier) == committed_items[3]
+    assert lookup.getOwnerFor(identifier) == identifier
+    assert lookup.hasNym(identifier)
+    stats = cache.cache_stats['uncommitted']
+    assert stats['hits'] + stats['misses'] == 1
+
+
+def test_lookup_context_sees_uncommitted_changes():
+    cache = make_idr_cache()
+    lookup = cache.lookupContext
+    assert not lookup.hasNym(identifier)
+    with pytest.raises(KeyError):
+        lookup.getVerkey(identifier)
+    cache.set(identifier, *uncommitted_items, isCommitted=False)
+    assert lookup.getVerkey(identifier) == uncommitted_items[4]
+    cache.currentBatchCreated(b'root')
+    cache.batchRejected()
+    assert not lookup.hasNym(identifier)
+
+
+def test_state_root_committed_with_batch():
+    kvs = KeyValueStorageInMemory()
+    cache = IdrCache("TestCache", kvs)
+    assert cache.committedStateRoot is None
+    cache.set(identifier, *uncommitted_items, isCommitted=False)
+    cache.currentBatchCreated(b'root1')
+    cache.currentBatchCreated(b'root2')
+    written = []
+    origSetBatch = kvs.setBatch
+    kvs.setBatch = lambda batch: written.append(batch) or origSetBatch(batch)
+    cache.onBatchCommitted(b'root1')
+    assert len(written) == 1
+    assert cache.committedStateRoot == b'root1'
+    assert uncommitted_items == cache.get(identifier)
+    cache.onBatchCommitted(b'root2')
+    assert cache.committedStateRoot == b'root2'
+    cache.setCommittedStateRoot(b'root3')
+    assert cache.committedStateRoot == b'root3'
+
+
+def test_resolved_verkey_expanded_and_invalidated_per_identifier():
+    did = 'CzkavE58zgX7rUMrzSinLr'
+    full_verkey = 'GJ1SzoWzavQYfNL9XkaJdrQejfztN4XqdsiV4ct3LXKL'
+    cache = make_idr_cache()
+    cache.set(did, 1, None, verkey='~' + full_verkey[:22])
+    cache.set(identifier, *committed_items)
+    resolved = cache.getResolvedVerkey(did)
+    assert resolved == IdrCache.expandVerkey(did, '~' + full_verkey[:22])
+    assert resolved != '~' + full_verkey[:22]
+    assert cache.getResolvedVerkey(did) == resolved
+    assert cache.cache_stats['resolved-verkeys']['hits'] == 1
+
+    # A NYM for another identifier keeps the resolved verkey
+    cache.set(identifier, *uncommitted_items, isCommitted=False)
+    assert cache.getResolvedVerkey(did) == resolved
+    assert cache.cache_stats['resolved-verkeys']['hits'] == 2
+
+    cache.set(did, 2, None, verkey=full_verkey, isCommitted=False)
+    assert cache.getResolvedVerkey(did) == full_verkey
+    cache.currentBatchCreated(b'root')
+    cache.batchRejected()
+    assert cache.getResolvedVerkey(did) == resolved
+    with pytest.raises(KeyError):
+        cache.getResolvedVerkey('unknown_identifier')
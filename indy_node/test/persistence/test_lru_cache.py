@@ -0,0 +1,31 @@
+from indy_node.persistence.lru_cache import LRUCache
+
+
+def test_least_recently_used_evicted():
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert 'b' not in cache
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+
+def test_remove_and_counters():
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.remove('a')
+    cache.remove('not_there')
+    assert cache.get('a') is None
+    cache.put('a', 1)
+    assert cache.get('a') == 1
+    assert cache.stats['hits'] == 1
+    assert cache.stats['misses'] == 1
+    assert cache.stats['hit_ratio'] == 0.5
+
+
+def test_zero_size_cache_stores_nothing():
+    cache = LRUCache(0)
+    cache.put('a', 1)
+    assert len(cache) == 0
@@ -0,0 +1,35 @@
+import pytest
+from storage.kv_in_memory import KeyValueStorageInMemory
+
+from indy_node.persistence.state_root_index import StateRootIndex
+
+ROOT0, ROOT1, ROOT2, ROOT3 = (bytes([i]) * 32 for i in range(4))
+
+
+@pytest.fixture()
+def index():
+    index = StateRootIndex(KeyValueStorageInMemory())
+    index.add(1000, 5, ROOT0, ROOT1)
+    index.add(2000, 9, ROOT1, ROOT2)
+    index.add(2000, 11, ROOT2, ROOT3)
+    return index
+
+
+def test_unknown_before_earliest_entry(index):
+    assert index.since == 1000
+    assert index.rootAt(999, ROOT3) is None
+    assert StateRootIndex(KeyValueStorageInMemory()).rootAt(1, ROOT0) is None
+
+
+def test_root_as_of_time(index):
+    assert index.rootAt(1000, ROOT3) == ROOT1
+    assert index.rootAt(1999, ROOT3) == ROOT1
+    # Entries with the same time are all applied as of that time
+    assert index.rootAt(2000, ROOT3) == ROOT3
+    assert index.rootAt(10 ** 10, ROOT3) == ROOT3
+
+
+def test_time_beyond_index_key_is_latest_root(index):
+    assert index.rootAt(2 ** 64 - 2, ROOT3) == ROOT3
+    assert index.rootAt(2 ** 64 - 1, ROOT3) == ROOT3
+    assert index.rootAt(2 ** 70, ROOT3) == ROOT3
@@ -0,0 +1,69 @@
+from plenum.common.constants import TXN_TYPE, TARGET_NYM, \
+    CURRENT_PROTOCOL_VERSION
+from plenum.common.messages.node_messages import Reply, RequestAck, \
+    RequestNack
+from plenum.common.types import f
+
+from indy_common.constants import GET_NYM
+from indy_common.types import Request
+from indy_node.server.read_admission import ReadAdmission
+
+ANOTHER_DID = 'CzkavE58zgX7rUMrzSinLr'
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def get_nym(identifier, req_id):
+    return Request(identifier=identifier,
+                   reqId=req_id,
+                   operation={TXN_TYPE: GET_NYM, TARGET_NYM: identifier},
+                   protocolVersion=CURRENT_PROTOCOL_VERSION)
+
+
+def replies_to(sent, frm):
+    return [msg.result[f.REQ_ID.nm] for msg, to in sent
+            if isinstance(msg, Reply) and to == frm]
+
+
+def test_read_admission_off_by_default(nodeSet):
+    assert all(node.readAdmission is None for node in nodeSet)
+
+
+def test_reads_queued_served_and_rejected_by_node(nodeSet, trustee,
+                                                  trusteeWallet,
+                                                  monkeypatch):
+    node = nodeSet[0]
+    clock = Clock()
+    # 1 read per second per DID, 1 read queued per connection
+    monkeypatch.setattr(node, 'readAdmission',
+                        ReadAdmission(1, 1, 100, 100, 1, getTime=clock))
+    sent = []
+    monkeypatch.setattr(node, 'transmitToClient',
+                        lambda msg, frm: sent.append((msg, frm)))
+    did = trusteeWallet.defaultId
+
+    for req_id in range(1, 4):
+        node.processRequest(get_nym(did, req_id), 'client1')
+    assert replies_to(sent, 'client1') == [1]
+    nacks = [msg for msg, _ in sent if isinstance(msg, RequestNack)]
+    assert [msg.reqId for msg in nacks] == [3]
+    assert 'Too many read requests' in nacks[0].reason
+
+    # Another DID on the same connection is not behind the queued read
+    node.processRequest(get_nym(ANOTHER_DID, 1), 'client1')
+    assert len([msg for msg, _ in sent
+                if isinstance(msg, Reply) and
+                msg.result[f.IDENTIFIER.nm] == ANOTHER_DID]) == 1
+
+    assert node.serviceQueuedReads() == 0
+    clock.now = 1
+    assert node.serviceQueuedReads() == 1
+    assert replies_to(sent, 'client1')[-1] == 2
+    assert len([msg for msg, _ in sent if isinstance(msg, RequestAck)]) == 3
+    assert node.readAdmission.stats['waiting'] == 0
@@ -0,0 +1,83 @@
+import pytest
+
+from indy_node.server.read_admission import ReadAdmission, ADMITTED, \
+    QUEUED, REJECTED
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class Read:
+    def __init__(self, identifier, reqId):
+        self.identifier = identifier
+        self.reqId = reqId
+
+
+@pytest.fixture()
+def clock():
+    return Clock()
+
+
+@pytest.fixture()
+def admission(clock):
+    # 1 read per second per DID with bursts of 2, 2 per second per
+    # connection with bursts of 3, 2 reads queued per connection
+    return ReadAdmission(1, 2, 2, 3, 2, getTime=clock)
+
+
+def test_reads_beyond_burst_queued_then_rejected(admission, clock):
+    assert [admission.admit(Read('did1', i), 'c1') for i in range(5)] == \
+        [ADMITTED, ADMITTED, QUEUED, QUEUED, REJECTED]
+    # Tokens are per DID and per connection, the queue limit is per
+    # connection
+    assert admission.admit(Read('did2', 1), 'c1') == ADMITTED
+    assert admission.admit(Read('did2', 2), 'c1') == REJECTED
+    assert admission.admit(Read('did2', 1), 'c2') == ADMITTED
+    assert admission.stats == {'admitted': 4, 'queued': 2, 'rejected': 2,
+                               'waiting': 2, 'limited_connections': 1}
+
+    assert admission.nextReads() == []
+    clock.now = 1
+    reads = admission.nextReads()
+    assert [(r.identifier, r.reqId, frm) for r, frm in reads] == \
+        [('did1', 2, 'c1')]
+    # Reads of a DID on a connection are served in order
+    assert admission.admit(Read('did1', 5), 'c1') == QUEUED
+
+
+def test_throttled_did_does_not_hold_up_others_on_connection(admission,
+                                                             clock):
+    assert [admission.admit(Read('did1', i), 'c1') for i in range(3)] == \
+        [ADMITTED, ADMITTED, QUEUED]
+    # The connection still has tokens, did2 is not behind did1
+    assert admission.admit(Read('did2', 1), 'c1') == ADMITTED
+    assert admission.admit(Read('did2', 2), 'c1') == QUEUED
+    clock.now = 1
+    reads = admission.nextReads()
+    assert [(r.identifier, r.reqId) for r, _ in reads] == \
+        [('did1', 2), ('did2', 2)]
+    assert admission.stats['limited_connections'] == 0
+
+
+def test_connections_take_turns(admission, clock):
+    for frm in ('c1', 'c2'):
+        for i in range(4):
+            admission.admit(Read('did' + frm, i), frm)
+    clock.now = 2
+    reads = admission.nextReads()
+    assert [frm for _, frm in reads] == ['c1', 'c2', 'c1', 'c2']
+    assert admission.stats['waiting'] == 0
+    assert admission.admit(Read('didc1', 4), 'c1') == QUEUED
+
+
+def test_idle_buckets_dropped(admission, clock):
+    admission.admit(Read('did1', 1), 'c1')
+    clock.now = 10
+    admission.nextReads()
+    assert not admission._clientBuckets
+    assert not admission._connectionBuckets
@@ -0,0 +1,19 @@
+from indy_node.server.read_replica import ReadReplica
+
+
+class ReadReplicaWithoutStack(ReadReplica):
+    """
+    Replica which only follows the feed, no clients are served
+    """
+
+    def createClientStack(self, ha, keysDir):
+        return None
+
+
+def close_replica(replica):
+    replica.state.close()
+    replica.idrCache.close()
+    replica.attributeStore.close()
+    replica.authorIndex.close()
+    replica.stateRootIndex.close()
+    replica.blsStore.close()
@@ -0,0 +1,78 @@
+import pytest
+from common.serializers.serialization import state_roots_serializer
+from plenum.common.constants import DOMAIN_LEDGER_ID
+from plenum.test.node_catchup.helper import ensure_all_nodes_have_same_data
+from stp_core.loop.eventually import eventually
+
+from indy_client.test.helper import getClientAddedWithRole
+from indy_node.server.read_replica import FEED_STATE_ROOT, readFeedOffset
+from indy_node.test.read_replica.helper import ReadReplicaWithoutStack, \
+    close_replica
+
+
+@pytest.fixture(scope="module")
+def tconf(tconf, request):
+    old_enabled = tconf.readReplicaFeedEnabled
+    old_segment_size = tconf.readReplicaFeedSegmentSize
+    tconf.readReplicaFeedEnabled = True
+    # Every flush starts a new segment
+    tconf.readReplicaFeedSegmentSize = 1
+
+    def reset():
+        tconf.readReplicaFeedEnabled = old_enabled
+        tconf.readReplicaFeedSegmentSize = old_segment_size
+
+    request.addfinalizer(reset)
+    return tconf
+
+
+def committed_root(node):
+    return state_roots_serializer.serialize(
+        bytes(node.getState(DOMAIN_LEDGER_ID).committedHeadHash))
+
+
+def add_nyms(looper, nodeSet, tdirWithClientPoolTxns, trustee,
+             trusteeWallet, prefix, count):
+    for i in range(count):
+        getClientAddedWithRole(nodeSet, tdirWithClientPoolTxns, looper,
+                               trustee, trusteeWallet, prefix + str(i))
+    ensure_all_nodes_have_same_data(looper, nodeSet)
+
+
+def check_feed_has_committed_txns(node):
+    feed = node.readReplicaFeed
+    assert feed.lastSeqNo() == node.domainLedger.size
+    roots = [record[FEED_STATE_ROOT] for record, _ in
+             feed.read(feed.segments[0][0])
+             if record[FEED_STATE_ROOT] is not None]
+    assert roots[-1] == committed_root(node)
+
+
+def test_node_writes_committed_batches_to_feed(looper, nodeSet, tconf,
+                                               tdirWithClientPoolTxns,
+                                               trustee, trusteeWallet):
+    add_nyms(looper, nodeSet, tdirWithClientPoolTxns, trustee,
+             trusteeWallet, 'NP', 3)
+    for node in nodeSet:
+        looper.run(eventually(check_feed_has_committed_txns, node))
+
+    node = nodeSet[0]
+    replica = ReadReplicaWithoutStack(node.name, node.dataLocation, None,
+                                      None, tconf)
+    try:
+        replica.follow()
+        assert state_roots_serializer.serialize(
+            bytes(replica.state.committedHeadHash)) == committed_root(node)
+        assert len(node.readReplicaFeed.segments) > 1
+    finally:
+        close_replica(replica)
+    applied = readFeedOffset(replica.dataLocation)
+
+    # Segments the replica has applied are removed with the next batch
+    add_nyms(looper, nodeSet, tdirWithClientPoolTxns, trustee,
+             trusteeWallet, 'NQ', 1)
+
+    def check_segments_removed():
+        assert node.readReplicaFeed.segments[0][0] == applied
+
+    looper.run(eventually(check_segments_removed))
@@ -0,0 +1,121 @@
+import pytest
+from common.serializers.serialization import state_roots_serializer
+from crypto.bls.bls_multi_signature import MultiSignature, \
+    MultiSignatureValue
+from plenum.common.constants import TXN_TYPE, TARGET_NYM, TXN_TIME, \
+    IDENTIFIER, VERKEY, DOMAIN_LEDGER_ID
+from plenum.common.types import f
+from state.pruning_state import PruningState
+from storage.kv_in_memory import KeyValueStorageInMemory
+
+from indy_common.constants import NYM
+from indy_node.persistence.attribute_store import AttributeStore
+from indy_node.persistence.author_index import AuthorIndex
+from indy_node.persistence.idr_cache import IdrCache
+from indy_node.persistence.state_root_index import StateRootIndex
+from indy_node.server.domain_req_handler import DomainReqHandler
+from indy_node.server.read_replica import ReadReplicaFeed, FEED_TXNS, \
+    FEED_STATE_ROOT, FEED_MULTI_SIG, readFeedOffset
+from indy_node.test.read_replica.helper import ReadReplicaWithoutStack, \
+    close_replica
+
+
+def make_txns(start, count):
+    return [{TXN_TYPE: NYM, TARGET_NYM: 'did{}'.format(seqNo % 3),
+             IDENTIFIER: 'trustee', VERKEY: '~vk{}'.format(seqNo),
+             f.SEQ_NO.nm: seqNo, TXN_TIME: 1000 + seqNo}
+            for seqNo in range(start, start + count)]
+
+
+@pytest.fixture()
+def node_state():
+    # The state of the node the replica follows
+    handler = DomainReqHandler(ledger=None,
+                               state=PruningState(KeyValueStorageInMemory()),
+                               config=None,
+                               requestProcessor=None,
+                               idrCache=IdrCache('Cache',
+                                                 KeyValueStorageInMemory()),
+                               attributeStore=AttributeStore(
+                                   KeyValueStorageInMemory()),
+                               bls_store=None,
+                               authorIndex=AuthorIndex(
+                                   'Index', KeyValueStorageInMemory()),
+                               stateRootIndex=StateRootIndex(
+                                   KeyValueStorageInMemory()))
+
+    def apply(txns):
+        for txn in txns:
+            handler.updateState([dict(txn)], isCommitted=True)
+            handler.state.commit(rootHash=handler.state.headHash)
+        return state_roots_serializer.serialize(
+            bytes(handler.state.committedHeadHash))
+
+    return apply
+
+
+@pytest.fixture()
+def replica(tmpdir, tconf):
+    replica = ReadReplicaWithoutStack('Alpha', str(tmpdir), None, None,
+                                      tconf)
+    yield replica
+    close_replica(replica)
+
+
+def multi_sig_for(state_root):
+    return MultiSignature(
+        '0' * 32, ['Alpha', 'Beta', 'Gamma'],
+        MultiSignatureValue(ledger_id=DOMAIN_LEDGER_ID,
+                            state_root_hash=state_root,
+                            pool_state_root_hash='1' * 32,
+                            txn_root_hash='2' * 32,
+                            timestamp=1010))
+
+
+def test_feed_record_applied_to_replica_state(replica, node_state):
+    txns = make_txns(1, 5)
+    root = node_state(txns)
+    multi_sig = multi_sig_for(root)
+    replica.applyFeedRecord({FEED_TXNS: txns,
+                             FEED_STATE_ROOT: root,
+                             FEED_MULTI_SIG: multi_sig.as_dict()})
+    assert state_roots_serializer.serialize(
+        bytes(replica.state.committedHeadHash)) == root
+    assert replica.idrCache.getVerkey('did1', isCommitted=True) == '~vk4'
+    assert replica.blsStore.get(root) == multi_sig
+
+    # Catchup txns come without a root, it is checked with the next batch
+    txns = make_txns(6, 3)
+    node_state(txns)
+    replica.applyFeedRecord({FEED_TXNS: txns,
+                             FEED_STATE_ROOT: None,
+                             FEED_MULTI_SIG: None})
+    txns = make_txns(9, 2)
+    root = node_state(txns)
+    replica.applyFeedRecord({FEED_TXNS: txns,
+                             FEED_STATE_ROOT: root,
+                             FEED_MULTI_SIG: None})
+    assert state_roots_serializer.serialize(
+        bytes(replica.state.committedHeadHash)) == root
+
+
+def test_replica_state_differing_from_node_detected(replica):
+    with pytest.raises(RuntimeError):
+        replica.applyFeedRecord({FEED_TXNS: make_txns(1, 2),
+                                 FEED_STATE_ROOT: '1' * 32,
+                                 FEED_MULTI_SIG: None})
+
+
+def test_replica_follows_feed_and_acknowledges_offset(tmpdir, tconf,
+                                                      replica, node_state):
+    feed = ReadReplicaFeed(str(tmpdir), tconf.readReplicaFeedFile)
+    feed.bootstrap(iter(make_txns(1, 5)), 2, node_state(make_txns(1, 5)),
+                   None)
+    assert replica.follow(limit=2) == 2
+    assert replica.follow() == 1
+    assert readFeedOffset(replica.dataLocation) == feed.endOffset
+
+    feed.append(make_txns(6, 1), node_state(make_txns(6, 1)))
+    feed.flush()
+    assert replica.follow() == 1
+    assert readFeedOffset(replica.dataLocation) == feed.endOffset
@@ -0,0 +1,110 @@
+import os
+
+import pytest
+
+from indy_node.server.read_replica import ReadReplicaFeed, FEED_TXNS, \
+    FEED_STATE_ROOT, FEED_MULTI_SIG, FEED_OFFSET_FILE, readFeedOffset
+
+
+def test_feed_read_from_offset(tmpdir):
+    feed = ReadReplicaFeed(str(tmpdir), 'feed')
+    assert not feed.exists
+    assert list(feed.read(0)) == []
+
+    feed.append([{'seqNo': 1}], stateRoot='root1', multiSig={'a': 1})
+    feed.append([{'seqNo': 2}])
+    assert feed.flush() == 2
+    records = list(feed.read(0))
+    assert [r[FEED_TXNS] for r, _ in records] == [[{'seqNo': 1}],
+                                                  [{'seqNo': 2}]]
+    assert records[0][0][FEED_STATE_ROOT] == 'root1'
+    assert records[0][0][FEED_MULTI_SIG] == {'a': 1}
+    assert records[1][0][FEED_STATE_ROOT] is None
+
+    offset = records[0][1]
+    assert [r for r, _ in feed.read(offset)] == [records[1][0]]
+    assert list(feed.read(records[1][1])) == []
+    assert len(list(feed.read(0, limit=1))) == 1
+    assert feed.lastSeqNo() == 2
+
+
+def test_records_written_only_when_flushed(tmpdir):
+    feed = ReadReplicaFeed(str(tmpdir), 'feed')
+    feed.append([{'seqNo': 1}])
+    assert not feed.exists
+    assert feed.flush() == 1
+    assert feed.flush() == 0
+    assert len(list(feed.read(0))) == 1
+
+
+def test_feed_skips_partially_written_record(tmpdir):
+    feed = ReadReplicaFeed(str(tmpdir), 'feed')
+    feed.append([{'seqNo': 1}])
+    feed.flush()
+    with open(feed.segments[-1][1], 'a') as f:
+        f.write('{"txns": [')
+    assert len(list(feed.read(0))) == 1
+    assert feed.lastSeqNo() == 1
+
+    # The node restarted, the partial record is dropped before appending
+    restarted = ReadReplicaFeed(str(tmpdir), 'feed')
+    restarted.append([{'seqNo': 2}])
+    restarted.flush()
+    assert [r[FEED_TXNS] for r, _ in feed.read(0)] == [[{'seqNo': 1}],
+                                                       [{'seqNo': 2}]]
+
+
+def test_feed_bootstrap_in_chunks(tmpdir):
+    feed = ReadReplicaFeed(str(tmpdir), 'feed')
+    txns = [{'seqNo': i} for i in range(1, 6)]
+    feed.bootstrap(iter(txns), 2, 'root', None)
+    records = [r for r, _ in feed.read(0)]
+    assert [len(r[FEED_TXNS]) for r in records] == [2, 2, 1]
+    assert [r[FEED_STATE_ROOT] for r in records] == [None, None, 'root']
+    assert feed.lastSeqNo() == 5
+
+
+def test_feed_continues_in_segments(tmpdir):
+    feed = ReadReplicaFeed(str(tmpdir), 'feed', segmentSize=40)
+    for seqNo in range(1, 6):
+        feed.append([{'seqNo': seqNo}])
+        feed.flush()
+    assert len(feed.segments) > 1
+    assert feed.segments[0][0] == 0
+    assert feed.endOffset == sum(os.path.getsize(path)
+                                 for _, path in feed.segments)
+    records = list(feed.read(0))
+    assert [r[FEED_TXNS][0]['seqNo'] for r, _ in records] == [1, 2, 3, 4, 5]
+    # Offsets are of the whole feed, reading continues in the next segment
+    assert [r[FEED_TXNS][0]['seqNo'] for r, _ in
+            feed.read(records[1][1])] == [3, 4, 5]
+    assert feed.isComplete
+
+
+def test_segments_read_by_replica_removed(tmpdir):
+    feed = ReadReplicaFeed(str(tmpdir), 'feed', segmentSize=40)
+    for seqNo in range(1, 6):
+        feed.append([{'seqNo': seqNo}])
+        feed.flush()
+    records = list(feed.read(0))
+    segments = feed.segments
+
+    assert feed.removeRead(0) == 0
+    assert feed.removeRead(segments[1][0]) == 1
+    assert feed.segments == segments[1:]
+    assert not feed.isComplete
+    with pytest.raises(ValueError):
+        list(feed.read(0))
+    assert [r for r, _ in feed.read(segments[1][0])] == \
+        [r for r, offset in records if offset > segments[1][0]]
+
+    # The last segment is kept, the node appends to it
+    assert feed.removeRead(feed.endOffset) == len(segments) - 2
+    assert len(feed.segments) == 1
+    assert feed.lastSeqNo() == 5
+
+
+def test_offset_acknowledged_by_replica(tmpdir):
+    assert readFeedOffset(str(tmpdir)) == 0
+    tmpdir.join(FEED_OFFSET_FILE).write('123')
+    assert readFeedOffset(str(tmpdir)) == 123
@@ -0,0 +1,188 @@
+import pytest
+from common.serializers import serialization
+from common.serializers.serialization import state_roots_serializer
+from crypto.bls.bls_multi_signature import MultiSignature, \
+    MultiSignatureValue
+from ledger.compact_merkle_tree import CompactMerkleTree
+from plenum.bls.bls_store import BlsStore
+from plenum.common.constants import TXN_TYPE, TARGET_NYM, TXN_TIME, \
+    IDENTIFIER, VERKEY, RAW, KeyValueStorageType, DOMAIN_LEDGER_ID
+from plenum.common.ledger import Ledger
+from plenum.common.types import f
+from state.pruning_state import PruningState
+from storage.kv_in_memory import KeyValueStorageInMemory
+
+from indy_common.constants import NYM, ATTRIB
+from indy_common.state import domain
+from indy_node.persistence.attribute_store import AttributeStore
+from indy_node.persistence.author_index import AuthorIndex
+from indy_node.persistence.idr_cache import IdrCache
+from indy_node.persistence.state_root_index import StateRootIndex
+from indy_node.server.domain_req_handler import DomainReqHandler
+from indy_node.server.domain_state_regenerator import \
+    DomainStateRegenerator
+
+
+def make_handler():
+    return DomainReqHandler(ledger=None,
+                            state=PruningState(KeyValueStorageInMemory()),
+                            config=None,
+                            requestProcessor=None,
+                            idrCache=IdrCache('Cache',
+                                              KeyValueStorageInMemory()),
+                            attributeStore=AttributeStore(
+                                KeyValueStorageInMemory()),
+                            bls_store=None,
+                            authorIndex=AuthorIndex(
+                                'Index', KeyValueStorageInMemory()),
+                            stateRootIndex=StateRootIndex(
+                                KeyValueStorageInMemory()))
+
+
+def make_txn(seqNo):
+    did = 'did{}'.format(seqNo % 5)
+    if seqNo % 4 == 0:
+        return {TXN_TYPE: ATTRIB, TARGET_NYM: did, IDENTIFIER: did,
+                RAW: '{{"name":"{}"}}'.format(seqNo),
+                TXN_TIME: 1000 + seqNo // 2}
+    return {TXN_TYPE: NYM, TARGET_NYM: did, IDENTIFIER: 'trustee',
+            VERKEY: '~vk{}'.format(seqNo), TXN_TIME: 1000 + seqNo // 2}
+
+
+@pytest.fixture()
+def ledger(tmpdir):
+    ledger = Ledger(CompactMerkleTree(), dataDir=str(tmpdir),
+                    fileName='domain_transactions')
+    yield ledger
+    ledger.stop()
+
+
+@pytest.fixture()
+def attr_values():
+    return AttributeStore(KeyValueStorageInMemory())
+
+
+@pytest.fixture()
+def expected():
+    return make_handler()
+
+
+def add_txns(ledger, attr_values, expected, count):
+    for seqNo in range(ledger.size + 1, ledger.size + count + 1):
+        txn = make_txn(seqNo)
+        if RAW in txn:
+            attr_values.set(domain.hash_of(txn[RAW]), txn[RAW])
+        ledger.add(DomainReqHandler.transform_txn_for_ledger(txn))
+        txn[f.SEQ_NO.nm] = seqNo
+        expected.updateState([txn], isCommitted=True)
+        expected.state.commit(rootHash=expected.state.headHash)
+
+
+def check_regenerated(handler, expected):
+    root = bytes(handler.state.committedHeadHash)
+    assert root == bytes(expected.state.committedHeadHash)
+    assert handler.idrCache.committedStateRoot == root
+    for i in range(5):
+        did = 'did{}'.format(i)
+        assert handler.idrCache.get(did, isCommitted=True) == \
+            expected.idrCache.get(did, isCommitted=True)
+    for timestamp in range(1000, 1020):
+        assert handler.stateRootIndex.rootAt(timestamp, root) == \
+            expected.stateRootIndex.rootAt(timestamp, root)
+
+
+def test_regenerate_domain_state(ledger, attr_values, expected):
+    add_txns(ledger, attr_values, expected, 30)
+    handler = make_handler()
+    regenerator = DomainStateRegenerator(handler, attr_values, chunkSize=7,
+                                         workers=2, txnsPerTask=5)
+    stats = regenerator.regenerate(ledger)
+    assert stats['txns'] == 30
+    assert stats['resumed_after'] == 0
+    assert stats['state_root'] == state_roots_serializer.serialize(
+        bytes(expected.state.committedHeadHash))
+    check_regenerated(handler, expected)
+    for seqNo in range(4, 31, 4):
+        raw = make_txn(seqNo)[RAW]
+        assert handler.attributeStore.get(domain.hash_of(raw)) == raw
+
+
+def test_regeneration_resumes_from_last_chunk(ledger, attr_values, expected):
+    add_txns(ledger, attr_values, expected, 20)
+    handler = make_handler()
+    DomainStateRegenerator(handler, attr_values, chunkSize=7,
+                           workers=2).regenerate(ledger)
+
+    add_txns(ledger, attr_values, expected, 10)
+    regenerator = DomainStateRegenerator(handler, attr_values, chunkSize=7,
+                                         workers=2)
+    assert regenerator.checkpoint == 20
+    stats = regenerator.regenerate(ledger)
+    assert stats['resumed_after'] == 20
+    assert stats['txns'] == 10
+    check_regenerated(handler, expected)
+
+
+def test_state_not_made_by_regeneration_is_not_resumed(
+        ledger, attr_values, expected):
+    add_txns(ledger, attr_values, expected, 10)
+    regenerator = DomainStateRegenerator(expected, attr_values)
+    assert regenerator.checkpoint is None
+    with pytest.raises(ValueError):
+        regenerator.regenerate(ledger)
+
+
+def test_txn_not_matching_merkle_tree_is_detected(ledger, attr_values,
+                                                  expected):
+    add_txns(ledger, attr_values, expected, 10)
+    ledger._transactionLog.put('6', ledger.serialize_for_txn_log(
+        DomainReqHandler.transform_txn_for_ledger(make_txn(7))))
+    regenerator = DomainStateRegenerator(make_handler(), attr_values,
+                                         workers=2)
+    with pytest.raises(ValueError, match='txn 6'):
+        regenerator.regenerate(ledger)
+
+
+def test_unknown_attribute_value_is_detected(ledger, expected):
+    add_txns(ledger, AttributeStore(KeyValueStorageInMemory()), expected, 5)
+    regenerator = DomainStateRegenerator(
+        make_handler(), AttributeStore(KeyValueStorageInMemory()), workers=1)
+    with pytest.raises(ValueError, match='txn 4'):
+        regenerator.regenerate(ledger)
+
+
+class Pool:
+    def verify(self, multiSig):
+        return multiSig.signature == 'valid'
+
+
+def test_state_root_verified_by_multi_signature(ledger, attr_values,
+                                                expected):
+    add_txns(ledger, attr_values, expected, 5)
+    bls_store = BlsStore(key_value_type=KeyValueStorageType.Memory,
+                         data_location=None,
+                         key_value_storage_name="BlsInMemoryStore",
+                         serializer=serialization.multi_sig_store_serializer)
+    state_root = state_roots_serializer.serialize(
+        bytes(expected.state.committedHeadHash))
+    assert DomainStateRegenerator.verifiedBy(bls_store, state_root,
+                                             ledger, Pool()) is None
+
+    def sign(txn_root, signature='valid'):
+        bls_store.put(MultiSignature(
+            signature, ['Alpha', 'Beta', 'Gamma'],
+            MultiSignatureValue(ledger_id=DOMAIN_LEDGER_ID,
+                                state_root_hash=state_root,
+                                pool_state_root_hash='1' * 32,
+                                txn_root_hash=txn_root,
+                                timestamp=1005)))
+
+    sign(ledger.root_hash)
+    assert DomainStateRegenerator.verifiedBy(bls_store, state_root, ledger,
+                                             Pool())
+    sign(ledger.root_hash, signature='forged')
+    assert DomainStateRegenerator.verifiedBy(bls_store, state_root,
+                                             ledger, Pool()) is False
+    sign('2' * 32)
+    assert DomainStateRegenerator.verifiedBy(bls_store, state_root,
+                                             ledger, Pool()) is False
@@ -0,0 +1,78 @@
+import pytest
+from crypto.bls.bls_multi_signature import MultiSignature, \
+    MultiSignatureValue
+from ledger.compact_merkle_tree import CompactMerkleTree
+from plenum.common.constants import TXN_TYPE, NODE, DATA, ALIAS, BLS_KEY, \
+    SERVICES, VALIDATOR, TARGET_NYM, DOMAIN_LEDGER_ID
+from plenum.common.ledger import Ledger
+
+from indy_node.server.pool_multi_sig import PoolMultiSigVerifier
+
+
+class Verifier:
+    def __init__(self):
+        self.keys = None
+
+    def verify_multi_sig(self, signature, message, pks):
+        self.keys = pks
+        return signature == 'valid'
+
+
+def node_txn(alias, **data):
+    data[ALIAS] = alias
+    return {TXN_TYPE: NODE, TARGET_NYM: 'nym' + alias, DATA: data}
+
+
+@pytest.fixture()
+def pool_ledger(tmpdir):
+    ledger = Ledger(CompactMerkleTree(), dataDir=str(tmpdir),
+                    fileName='pool_transactions')
+    for alias in ('Alpha', 'Beta', 'Gamma', 'Delta', 'Epsilon'):
+        ledger.add(node_txn(alias, **{SERVICES: [VALIDATOR],
+                                      BLS_KEY: 'key' + alias}))
+    ledger.add(node_txn('Gamma', **{BLS_KEY: 'newKeyGamma'}))
+    ledger.add(node_txn('Epsilon', **{SERVICES: []}))
+    ledger.add(node_txn('Zeta', **{SERVICES: [VALIDATOR]}))
+    yield ledger
+    ledger.stop()
+
+
+def multi_sig(signature, participants):
+    return MultiSignature(
+        signature, participants,
+        MultiSignatureValue(ledger_id=DOMAIN_LEDGER_ID,
+                            state_root_hash='1' * 32,
+                            pool_state_root_hash='2' * 32,
+                            txn_root_hash='3' * 32,
+                            timestamp=1000))
+
+
+def test_validator_keys_are_the_latest(pool_ledger):
+    assert PoolMultiSigVerifier.validatorKeys(pool_ledger) == {
+        'Alpha': 'keyAlpha', 'Beta': 'keyBeta', 'Gamma': 'newKeyGamma',
+        'Delta': 'keyDelta', 'Zeta': None}
+
+
+def test_multi_sig_verified_with_keys_of_participants(pool_ledger):
+    verifier = Verifier()
+    pool = PoolMultiSigVerifier(pool_ledger, verifier)
+    assert pool.verify(multi_sig('valid', ['Alpha', 'Beta', 'Gamma', 'Delta']))
+    assert verifier.keys == ['keyAlpha', 'keyBeta', 'newKeyGamma',
+                             'keyDelta']
+    assert not pool.verify(multi_sig('forged',
+                                     ['Alpha', 'Beta', 'Gamma', 'Delta']))
+
+
+def test_multi_sig_of_too_few_validators_is_not_verified(pool_ledger):
+    verifier = Verifier()
+    pool = PoolMultiSigVerifier(pool_ledger, verifier)
+    # 5 validators, 4 are needed
+    assert not pool.verify(multi_sig('valid', ['Alpha', 'Beta', 'Gamma']))
+    assert not pool.verify(multi_sig('valid',
+                                     ['Alpha', 'Alpha', 'Beta', 'Gamma']))
+    # Not a validator or without a key
+    assert not pool.verify(multi_sig('valid',
+                                     ['Alpha', 'Beta', 'Gamma', 'Epsilon']))
+    assert not pool.verify(multi_sig('valid',
+                                     ['Alpha', 'Beta', 'Gamma', 'Zeta']))
+    assert verifier.keys is None
@@ -0,0 +1,33 @@
+import pytest
+from stp_core.network.port_dispenser import genHa
+
+from indy_node.server.node_startup import StoreOpener
+from indy_node.test.helper import TestNode
+
+
+def test_stores_opened_on_start_closed_when_node_fails_to_start(
+        tdirWithPoolTxns, tdirWithDomainTxns, tdirWithNodeKeepInited,
+        poolTxnNodeNames, tconf, tdir, allPluginsPath,
+        node_config_helper_class, monkeypatch):
+    closed = []
+    close = StoreOpener.close
+
+    def close_and_record(opener):
+        closed.append(opener)
+        close(opener)
+
+    def fail(node):
+        raise RuntimeError('failed to start')
+
+    monkeypatch.setattr(StoreOpener, 'close', close_and_record)
+    monkeypatch.setattr(TestNode, 'checkAuthorIndexMatchesState', fail)
+    name = poolTxnNodeNames[0]
+    with pytest.raises(RuntimeError):
+        TestNode(name,
+                 config_helper=node_config_helper_class(name, tconf,
+                                                        chroot=tdir),
+                 config=tconf,
+                 pluginPaths=allPluginsPath,
+                 ha=genHa(),
+                 cliha=genHa())
+    assert len(closed) == 1
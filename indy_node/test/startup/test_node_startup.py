@@ -0,0 +1,44 @@
+import pytest
+
+from indy_node.server.node_startup import StartupProfile, StoreOpener
+
+
+class Store:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def failToOpen():
+    raise IOError('locked')
+
+
+def test_phase_timed_first_time_it_runs():
+    profile = StartupProfile()
+    with profile.phase('load'):
+        with profile.phase('load'):
+            pass
+    first = profile.phases['load']
+    with profile.phase('load'):
+        pass
+    profile.initDone()
+    assert profile.stats == {'init_seconds': profile.initSeconds,
+                             'phases': {'load': first}}
+    assert profile.initSeconds >= first
+
+
+def test_stores_taken_opened_or_closed():
+    unused = Store('unused')
+    opener = StoreOpener(2, {'a': lambda: Store('a'),
+                             'unused': lambda: unused,
+                             'broken': failToOpen})
+    assert opener.take('a', lambda: Store('default')).name == 'a'
+    # Not opened in the background
+    assert opener.take('a', lambda: Store('default')).name == 'default'
+    with pytest.raises(IOError):
+        opener.take('broken', lambda: Store('default'))
+    opener.close()
+    assert unused.closed
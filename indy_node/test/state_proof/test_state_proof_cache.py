@@ -0,0 +1,35 @@
+from plenum.common.constants import PROOF_NODES
+
+from indy_node.server.state_proof_cache import StateProofCache
+
+
+def make_proof(size):
+    return {PROOF_NODES: 'a' * size}
+
+
+def test_proof_returned_for_same_root_and_path():
+    cache = StateProofCache(maxBytes=100)
+    proof = make_proof(10)
+    cache.put(b'root1', b'path', proof)
+    assert cache.get(b'root1', b'path') is proof
+    assert cache.get(b'root1', b'other_path') is None
+    assert cache.stats['hits'] == 1
+    assert cache.stats['misses'] == 1
+
+
+def test_cache_dropped_when_root_changes():
+    cache = StateProofCache(maxBytes=100)
+    cache.put(b'root1', b'path1', make_proof(10))
+    assert cache.get(b'root2', b'path1') is None
+    cache.put(b'root2', b'path2', make_proof(10))
+    assert cache.get(b'root1', b'path1') is None
+    assert cache.stats['count'] == 1
+
+
+def test_cache_bounded_by_bytes():
+    cache = StateProofCache(maxBytes=25)
+    for i in range(5):
+        cache.put(b'root', str(i).encode(), make_proof(10))
+    assert cache.stats['size'] <= 25
+    assert cache.get(b'root', b'4') is not None
+    assert cache.get(b'root', b'0') is None
@@ -1,5 +1,6 @@
 import base64
 import time
+from copy import deepcopy
 
 import base58
 import pytest
@@ -10,14 +11,23 @@ from plenum.bls.bls_store import BlsStore
 from plenum.common.constants import TXN_TYPE, TARGET_NYM, RAW, DATA, ORIGIN, \
     IDENTIFIER, NAME, VERSION, ROLE, VERKEY, KeyValueStorageType, \
     STATE_PROOF, ROOT_HASH, MULTI_SIGNATURE, PROOF_NODES, TXN_TIME, CURRENT_PROTOCOL_VERSION, DOMAIN_LEDGER_ID
+from plenum.common.exceptions import InvalidClientRequest
+from plenum.common.ledger import Ledger
+from plenum.persistence.util import txnsWithSeqNo
 from plenum.common.types import f
 from indy_common.constants import \
-    ATTRIB, REF, SIGNATURE_TYPE, CLAIM_DEF, SCHEMA
+    ATTRIB, REF, SIGNATURE_TYPE, CLAIM_DEF, SCHEMA, GET_NYMS, GET_ATTRS, \
+    DESTS, ATTRS, GET_SCHEMAS, GET_CLAIM_DEFS, FROM, LIMIT, NEXT, \
+    PASS_STATE_VALUE, STATE_VALUE, TIMESTAMP, NYM
+from indy_client.client.client import Client
 from indy_common.types import Request
 from indy_node.persistence.attribute_store import AttributeStore
+from indy_node.persistence.author_index import AuthorIndex
 from indy_node.persistence.idr_cache import IdrCache
+from indy_node.persistence.state_root_index import StateRootIndex
 from indy_node.server.domain_req_handler import DomainReqHandler
 from plenum.common.util import get_utc_epoch
+from ledger.compact_merkle_tree import CompactMerkleTree
 from state.pruning_state import PruningState
 from storage.kv_in_memory import KeyValueStorageInMemory
 from indy_common.state import domain
@@ -42,7 +52,11 @@ def request_handler(bls_store):
                             requestProcessor=None,
                             idrCache=cache,
                             attributeStore=attr_store,
-                            bls_store=bls_store)
+                            bls_store=bls_store,
+                            authorIndex=AuthorIndex(
+                                'Index', KeyValueStorageInMemory()),
+                            stateRootIndex=StateRootIndex(
+                                KeyValueStorageInMemory()))
 
 
 def extract_proof(result, expected_multi_sig):
@@ -70,8 +84,9 @@ def save_multi_sig(request_handler):
 
 def is_proof_verified(request_handler,
                       proof, path,
-                      value, seq_no, txn_time, ):
-    encoded_value = domain.encode_state_value(value, seq_no, txn_time)
+                      value, seq_no, txn_time, binary=False):
+    encoded_value = domain.encode_state_value(value, seq_no, txn_time,
+                                              binary=binary)
     proof_nodes = base64.b64decode(proof[PROOF_NODES])
     root_hash = base58.b58decode(proof[ROOT_HASH])
     verified = request_handler.state.verify_state_proof(
@@ -173,6 +188,49 @@ def test_state_proofs_for_get_claim_def(request_handler):
                              key_components, seq_no, txn_time)
 
 
+def test_state_proofs_for_binary_encoded_claim_def(request_handler):
+    request_handler.binaryStateValuesSinceSeqNo = 5
+    nym = 'Gw6pDLhcBcoQesN72qfotTgFa7cbuqZpkX3Xo6pLhPhv'
+    seq_no = 5
+    txn_time = int(time.time())
+    key_components = {'primary': {'n': '1234567890' * 60, 'z': '1'}}
+    txn = {
+        IDENTIFIER: nym,
+        TXN_TYPE: CLAIM_DEF,
+        TARGET_NYM: nym,
+        REF: 1,
+        f.SEQ_NO.nm: seq_no,
+        DATA: key_components,
+        TXN_TIME: txn_time,
+    }
+    request_handler._addClaimDef(txn)
+    request_handler.state.commit()
+    multi_sig = save_multi_sig(request_handler)
+
+    request = Request(
+        operation={
+            IDENTIFIER: nym,
+            ORIGIN: nym,
+            REF: 1,
+            SIGNATURE_TYPE: 'CL'
+        },
+        signatures={},
+        protocolVersion=CURRENT_PROTOCOL_VERSION
+    )
+    result = request_handler.handleGetClaimDefReq(request)
+    proof = extract_proof(result, multi_sig)
+    assert result[DATA] == key_components
+    assert result[f.SEQ_NO.nm] == seq_no
+
+    path = domain.make_state_path_for_claim_def(nym, 1, 'CL')
+    assert is_proof_verified(request_handler,
+                             proof, path,
+                             key_components, seq_no, txn_time, binary=True)
+    assert not is_proof_verified(request_handler,
+                                 proof, path,
+                                 key_components, seq_no, txn_time)
+
+
 def test_state_proofs_for_get_schema(request_handler):
     # Adding schema
     nym = 'Gw6pDLhcBcoQesN72qfotTgFa7cbuqZpkX3Xo6pLhPhv'
@@ -264,6 +322,61 @@ def test_state_proofs_for_get_nym(request_handler):
     assert verified
 
 
+def test_state_proofs_for_get_nym_as_of_time(request_handler):
+    nym = 'Gw6pDLhcBcoQesN72qfotTgFa7cbuqZpkX3Xo6pLhPhv'
+    txn_time = int(time.time()) - 100
+    multi_sigs = []
+    for seq_no, verkey in enumerate(["~7TYfekw4GUagBnBVCqPjiC",
+                                     "~6Rac6wVrBzqZi2P9QyXuN3"], 1):
+        txn = {
+            TXN_TYPE: NYM,
+            TARGET_NYM: nym,
+            VERKEY: verkey,
+            f.IDENTIFIER.nm: nym,
+            f.SEQ_NO.nm: seq_no,
+            TXN_TIME: txn_time + seq_no * 10,
+        }
+        request_handler.updateState([txn], isCommitted=True)
+        request_handler.state.commit()
+        multi_sigs.append(save_multi_sig(request_handler))
+
+    def get_nym(timestamp):
+        request = Request(
+            operation={
+                TARGET_NYM: nym,
+                TIMESTAMP: timestamp
+            },
+            signatures={},
+            protocolVersion=CURRENT_PROTOCOL_VERSION
+        )
+        return request_handler.handleGetNymReq(request)
+
+    # Verkey before the rotation
+    result = get_nym(txn_time + 15)
+    proof = extract_proof(result, multi_sigs[0])
+    data = request_handler.stateSerializer.deserialize(result[DATA])
+    assert data[VERKEY] == "~7TYfekw4GUagBnBVCqPjiC"
+    assert result[f.SEQ_NO.nm] == 1
+    path = request_handler.nym_to_state_key(nym)
+    del data[TARGET_NYM]
+    assert request_handler.state.verify_state_proof(
+        base58.b58decode(proof[ROOT_HASH]),
+        path,
+        request_handler.stateSerializer.serialize(data),
+        base64.b64decode(proof[PROOF_NODES]),
+        serialized=True
+    )
+
+    # Verkey after the rotation
+    result = get_nym(txn_time + 25)
+    extract_proof(result, multi_sigs[1])
+    data = request_handler.stateSerializer.deserialize(result[DATA])
+    assert data[VERKEY] == "~6Rac6wVrBzqZi2P9QyXuN3"
+
+    with pytest.raises(InvalidClientRequest):
+        get_nym(txn_time)
+
+
 def test_no_state_proofs_if_protocol_version_less(request_handler):
     nym = 'Gw6pDLhcBcoQesN72qfotTgFa7cbuqZpkX3Xo6pLhPhv'
     role = "2"
@@ -291,3 +404,363 @@ def test_no_state_proofs_if_protocol_version_less(request_handler):
     )
     result = request_handler.handleGetNymReq(request)
     assert STATE_PROOF not in result
+
+
+def test_state_proofs_for_get_nyms(request_handler):
+    nyms = ['Gw6pDLhcBcoQesN72qfotTgFa7cbuqZpkX3Xo6pLhPhv',
+            'CzkavE58zgX7rUMrzSinLr',
+            'WRfXPg8dantKVubE3HX8pw']
+    txn_time = int(time.time())
+    for seq_no, nym in enumerate(nyms[:2], start=1):
+        data = {
+            f.IDENTIFIER.nm: nym,
+            ROLE: None,
+            VERKEY: "~7TYfekw4GUagBnBVCqPjiC",
+            f.SEQ_NO.nm: seq_no,
+            TXN_TIME: txn_time,
+        }
+        request_handler.updateNym(nym, data)
+    request_handler.state.commit()
+    multi_sig = save_multi_sig(request_handler)
+
+    request = Request(
+        operation={
+            TXN_TYPE: GET_NYMS,
+            DESTS: nyms
+        },
+        signatures={},
+        protocolVersion=CURRENT_PROTOCOL_VERSION
+    )
+    result = request_handler.handleGetNymsReq(request)
+    proof = extract_proof(result, multi_sig)
+    assert len(result[DATA]) == 3
+    assert result[DATA][2][DATA] is None
+
+    # One combined proof verifies every requested nym, including absent one
+    proof_nodes = base64.b64decode(proof[PROOF_NODES])
+    root_hash = base58.b58decode(proof[ROOT_HASH])
+    for path, value in domain.prepare_get_nyms_for_state(result):
+        assert request_handler.state.verify_state_proof(
+            root_hash, path, value, proof_nodes, serialized=True)
+
+
+def test_state_proofs_for_get_attrs(request_handler):
+    nym = 'Gw6pDLhcBcoQesN72qfotTgFa7cbuqZpkX3Xo6pLhPhv'
+    raw_attributes = ['{"last_name":"Anderson"}', '{"first_name":"Thomas"}']
+    txn_time = int(time.time())
+    for seq_no, raw_attribute in enumerate(raw_attributes):
+        txn = {
+            TXN_TYPE: ATTRIB,
+            TARGET_NYM: nym,
+            RAW: raw_attribute,
+            f.SEQ_NO.nm: seq_no,
+            TXN_TIME: txn_time,
+        }
+        request_handler._addAttr(txn)
+    request_handler.state.commit()
+    multi_sig = save_multi_sig(request_handler)
+
+    request = Request(
+        operation={
+            TXN_TYPE: GET_ATTRS,
+            ATTRS: [{TARGET_NYM: nym, RAW: 'last_name'},
+                    {TARGET_NYM: nym, RAW: 'first_name'}]
+        },
+        signatures={},
+        protocolVersion=CURRENT_PROTOCOL_VERSION
+    )
+    result = request_handler.handleGetAttrsBatchReq(request)
+    proof = extract_proof(result, multi_sig)
+    assert [item[DATA] for item in result[DATA]] == raw_attributes
+
+    proof_nodes = base64.b64decode(proof[PROOF_NODES])
+    root_hash = base58.b58decode(proof[ROOT_HASH])
+    for path, value in domain.prepare_get_attrs_for_state(result):
+        assert request_handler.state.verify_state_proof(
+            root_hash, path, value, proof_nodes, serialized=True)
+
+
+def test_state_proof_served_from_cache_until_commit(request_handler):
+    nym = 'Gw6pDLhcBcoQesN72qfotTgFa7cbuqZpkX3Xo6pLhPhv'
+    data = {
+        f.IDENTIFIER.nm: nym,
+        ROLE: "2",
+        VERKEY: "~7TYfekw4GUagBnBVCqPjiC",
+        f.SEQ_NO.nm: 1,
+        TXN_TIME: int(time.time()),
+    }
+    request_handler.updateNym(nym, data)
+    request_handler.state.commit()
+    save_multi_sig(request_handler)
+    request = Request(
+        operation={
+            TARGET_NYM: nym
+        },
+        signatures={},
+        protocolVersion=CURRENT_PROTOCOL_VERSION
+    )
+
+    first = request_handler.handleGetNymReq(request)
+    second = request_handler.handleGetNymReq(request)
+    assert first[STATE_PROOF] == second[STATE_PROOF]
+    assert request_handler.proofCache.stats['hits'] == 1
+
+    request_handler.proofCache.clear()
+    request_handler.handleGetNymReq(request)
+    assert request_handler.proofCache.stats['hits'] == 1
+
+
+@pytest.mark.parametrize('binary', [False, True])
+def test_claim_def_state_value_passed_through(request_handler, binary):
+    nym = 'Gw6pDLhcBcoQesN72qfotTgFa7cbuqZpkX3Xo6pLhPhv'
+    txn_time = int(time.time())
+    key_components = {"primary": {"n": "1" * 100}}
+    request_handler.binaryStateValuesSinceSeqNo = 0 if binary else None
+    request_handler._addClaimDef({
+        IDENTIFIER: nym,
+        TXN_TYPE: CLAIM_DEF,
+        TARGET_NYM: nym,
+        REF: 1,
+        SIGNATURE_TYPE: 'CL',
+        f.SEQ_NO.nm: 2,
+        DATA: key_components,
+        TXN_TIME: txn_time,
+    })
+    request_handler.state.commit()
+    multi_sig = save_multi_sig(request_handler)
+    request = Request(
+        operation={
+            ORIGIN: nym,
+            REF: 1,
+            SIGNATURE_TYPE: 'CL',
+            PASS_STATE_VALUE: True
+        },
+        signatures={},
+        protocolVersion=CURRENT_PROTOCOL_VERSION
+    )
+    result = request_handler.handleGetClaimDefReq(request)
+    assert result[DATA] is None
+
+    # The value is proven as passed and decoded by the client
+    encoded = domain.state_value_from_reply(result[STATE_VALUE])
+    assert domain.decode_state_value(encoded) == (key_components, 2, txn_time)
+    proof = extract_proof(result, multi_sig)
+    path, _ = domain.prepare_get_claim_def_for_state(result)
+    assert request_handler.state.verify_state_proof(
+        base58.b58decode(proof[ROOT_HASH]), path, encoded,
+        base64.b64decode(proof[PROOF_NODES]), serialized=True)
+
+
+def test_claim_def_value_served_from_cache_with_fresh_proof(request_handler):
+    nym = 'Gw6pDLhcBcoQesN72qfotTgFa7cbuqZpkX3Xo6pLhPhv'
+    txn_time = int(time.time())
+    key_components = {"primary": {"n": "1" * 100}}
+    request_handler._addClaimDef({
+        IDENTIFIER: nym,
+        TXN_TYPE: CLAIM_DEF,
+        TARGET_NYM: nym,
+        REF: 1,
+        SIGNATURE_TYPE: 'CL',
+        f.SEQ_NO.nm: 2,
+        DATA: key_components,
+        TXN_TIME: txn_time,
+    })
+    request_handler.state.commit()
+    save_multi_sig(request_handler)
+    request = Request(
+        operation={
+            ORIGIN: nym,
+            REF: 1,
+            SIGNATURE_TYPE: 'CL'
+        },
+        signatures={},
+        protocolVersion=CURRENT_PROTOCOL_VERSION
+    )
+    first = request_handler.handleGetClaimDefReq(request)
+
+    # Another write changes the committed root but not the claim def
+    request_handler.updateNym(nym, {
+        f.IDENTIFIER.nm: nym,
+        VERKEY: "~7TYfekw4GUagBnBVCqPjiC",
+        f.SEQ_NO.nm: 3,
+        TXN_TIME: txn_time,
+    })
+    request_handler.state.commit()
+    multi_sig = save_multi_sig(request_handler)
+    second = request_handler.handleGetClaimDefReq(request)
+
+    assert second[DATA] == first[DATA] == key_components
+    assert request_handler.writeOnceValueCache.stats['hits'] == 1
+    proof = extract_proof(second, multi_sig)
+    assert proof[ROOT_HASH] != first[STATE_PROOF][ROOT_HASH]
+    path = domain.make_state_path_for_claim_def(nym, 1, 'CL')
+    assert is_proof_verified(request_handler,
+                             proof, path,
+                             key_components, 2, txn_time)
+
+
+def test_schema_written_again_before_commit_not_served_from_cache(
+        tmpdir, request_handler):
+    request_handler.ledger = Ledger(CompactMerkleTree(),
+                                    dataDir=str(tmpdir), fileName='domain')
+    nym = 'Gw6pDLhcBcoQesN72qfotTgFa7cbuqZpkX3Xo6pLhPhv'
+    txn_time = int(time.time())
+    schema_key = {NAME: 'schema_a', VERSION: '1.0'}
+    attrs = {"attr_names": ["name"]}
+
+    def apply_batch(count):
+        # Identical SCHEMAs pass validation until the first one is committed
+        txns = [{TXN_TYPE: SCHEMA, IDENTIFIER: nym,
+                 DATA: {**schema_key, **attrs}, TXN_TIME: txn_time}
+                for _ in range(count)]
+        (start, end), _ = request_handler.ledger.appendTxns(
+            deepcopy(txns))
+        request_handler.updateState(txnsWithSeqNo(start, end, txns))
+        return count, \
+            base58.b58encode(bytes(request_handler.state.headHash)), \
+            Ledger.hashToStr(request_handler.ledger.uncommittedRootHash)
+
+    def get_schema():
+        request = Request(operation={TARGET_NYM: nym, DATA: schema_key},
+                          signatures={},
+                          protocolVersion=CURRENT_PROTOCOL_VERSION)
+        return request_handler.handleGetSchemaReq(request)
+
+    first_batch = apply_batch(1)
+    second_batch = apply_batch(2)
+    request_handler.commit(*first_batch)
+    assert get_schema()[f.SEQ_NO.nm] == 1
+    request_handler.commit(*second_batch)
+    multi_sig = save_multi_sig(request_handler)
+    result = get_schema()
+    assert result[f.SEQ_NO.nm] == 3
+    path = domain.make_state_path_for_schema(nym, 'schema_a', '1.0')
+    assert is_proof_verified(request_handler,
+                             extract_proof(result, multi_sig), path,
+                             attrs, 3, txn_time)
+    request_handler.ledger.stop()
+
+
+def test_state_proofs_for_get_schemas_pages(request_handler):
+    nym = 'Gw6pDLhcBcoQesN72qfotTgFa7cbuqZpkX3Xo6pLhPhv'
+    other_nym = 'CzkavE58zgX7rUMrzSinLr'
+    txn_time = int(time.time())
+    versions = ['1.0', '1.1', '2.0']
+    for seq_no, (author, version) in enumerate(
+            [(nym, v) for v in versions] + [(other_nym, '1.0')], start=1):
+        txn = {
+            TXN_TYPE: SCHEMA,
+            IDENTIFIER: author,
+            f.SEQ_NO.nm: seq_no,
+            DATA: {NAME: 'schema_a', VERSION: version,
+                   'attr_names': ['name']},
+            TXN_TIME: txn_time,
+        }
+        request_handler._addSchema(txn, isCommitted=True)
+    request_handler.state.commit()
+    multi_sig = save_multi_sig(request_handler)
+
+    def get_page(start):
+        request = Request(
+            operation={
+                TXN_TYPE: GET_SCHEMAS,
+                TARGET_NYM: nym,
+                FROM: start,
+                LIMIT: 2
+            },
+            signatures={},
+            protocolVersion=CURRENT_PROTOCOL_VERSION
+        )
+        return request_handler.handleGetSchemasReq(request)
+
+    first = get_page(None)
+    assert [s[DATA][VERSION] for s in first[DATA]] == ['1.0', '1.1']
+    assert first[NEXT] == 'schema_a:2.0'
+    second = get_page(first[NEXT])
+    assert [s[DATA][VERSION] for s in second[DATA]] == ['2.0']
+    assert second[DATA][0][f.SEQ_NO.nm] == 3
+    assert second[NEXT] is None
+
+    # One combined proof verifies every schema of the page
+    proof = extract_proof(first, multi_sig)
+    proof_nodes = base64.b64decode(proof[PROOF_NODES])
+    root_hash = base58.b58decode(proof[ROOT_HASH])
+    for path, value in domain.prepare_get_schemas_for_state(first):
+        assert request_handler.state.verify_state_proof(
+            root_hash, path, value, proof_nodes, serialized=True)
+
+
+def test_state_proofs_for_get_claim_defs(request_handler):
+    authors = ['Gw6pDLhcBcoQesN72qfotTgFa7cbuqZpkX3Xo6pLhPhv',
+               'CzkavE58zgX7rUMrzSinLr']
+    txn_time = int(time.time())
+    for seq_no, (author, ref) in enumerate(
+            [(authors[0], 12), (authors[1], 12), (authors[0], 1)], start=1):
+        txn = {
+            IDENTIFIER: author,
+            TXN_TYPE: CLAIM_DEF,
+            TARGET_NYM: author,
+            REF: ref,
+            DATA: {"primary": {"n": str(seq_no)}},
+            SIGNATURE_TYPE: 'CL',
+            f.SEQ_NO.nm: seq_no,
+            TXN_TIME: txn_time,
+        }
+        request_handler._addClaimDef(txn, isCommitted=True)
+    request_handler.state.commit()
+    multi_sig = save_multi_sig(request_handler)
+
+    request = Request(
+        operation={
+            TXN_TYPE: GET_CLAIM_DEFS,
+            REF: 12
+        },
+        signatures={},
+        protocolVersion=CURRENT_PROTOCOL_VERSION
+    )
+    result = request_handler.handleGetClaimDefsReq(request)
+    # Claim defs of schema 1 are not listed for schema 12
+    assert sorted(c[ORIGIN] for c in result[DATA]) == sorted(authors)
+    assert result[NEXT] is None
+
+    proof = extract_proof(result, multi_sig)
+    proof_nodes = base64.b64decode(proof[PROOF_NODES])
+    root_hash = base58.b58decode(proof[ROOT_HASH])
+    for path, value in domain.prepare_get_claim_defs_for_state(result):
+        assert request_handler.state.verify_state_proof(
+            root_hash, path, value, proof_nodes, serialized=True)
+
+
+def test_batched_reply_without_every_requested_key_is_not_valid(
+        request_handler):
+    nyms = ['Gw6pDLhcBcoQesN72qfotTgFa7cbuqZpkX3Xo6pLhPhv',
+            'CzkavE58zgX7rUMrzSinLr']
+    request = Request(
+        operation={
+            TXN_TYPE: GET_NYMS,
+            DESTS: nyms
+        },
+        signatures={},
+        protocolVersion=CURRENT_PROTOCOL_VERSION
+    )
+    result = request_handler.handleGetNymsReq(request)
+    assert Client.has_every_requested_key(result)
+    assert not Client.has_every_requested_key({**result, DATA: []})
+    assert not Client.has_every_requested_key(
+        {**result, DATA: result[DATA][:1]})
+    assert not Client.has_every_requested_key(
+        {**result, DATA: [result[DATA][0], result[DATA][0]]})
+
+    request = Request(
+        operation={
+            TXN_TYPE: GET_ATTRS,
+            ATTRS: [{TARGET_NYM: nyms[0], RAW: 'last_name'},
+                    {TARGET_NYM: nyms[0], RAW: 'first_name'}]
+        },
+        signatures={},
+        protocolVersion=CURRENT_PROTOCOL_VERSION
+    )
+    result = request_handler.handleGetAttrsBatchReq(request)
+    assert Client.has_every_requested_key(result)
+    assert not Client.has_every_requested_key(
+        {**result, DATA: result[DATA][1:]})
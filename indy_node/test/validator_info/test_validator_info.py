@@ -26,6 +26,13 @@ STATUS_FILENAME = '{}_info.json'.format(TEST_NODE_NAME.lower())
 def test_validator_info_file_schema_is_valid(info):
     assert isinstance(info, dict)
     assert 'config' in info['metrics']['transaction-count']
+    assert 'state-proof' in info['metrics']['caches']
+    assert 'state-value' in info['metrics']['caches']
+    assert 'compression_ratio' in info['metrics']['storage']['attributes']
+    assert 'rejected' in info['metrics']['read-admission']
+    assert 'getIdrCache' in info['metrics']['startup']['phases']
+    assert 'committed' in info['metrics']['caches']['idr-cache']
+    assert 'latency' in info['metrics']
     assert 'software' in info
     assert 'indy-node' in info['software']
     assert 'sovrin' in info['software']
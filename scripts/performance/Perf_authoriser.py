@@ -0,0 +1,65 @@
+#! /usr/bin/env python3
+"""
+Microbenchmark of Authoriser.authorised: the compiled decision table against
+a lookup of 'typ_field_oldVal_newVal' keys in AuthMap, which is how rules
+were matched before they were compiled.
+To run: python3 Perf_authoriser.py [-n <calls per case>]
+"""
+import argparse
+import timeit
+
+from plenum.common.constants import STEWARD, TRUSTEE, VERKEY, ROLE, \
+    SERVICES, NODE_IP, VALIDATOR
+from indy_common.auth import Authoriser, normaliseAuthValue
+from indy_common.constants import NYM, NODE, POOL_UPGRADE, ACTION, START, \
+    OWNER
+
+parser = argparse.ArgumentParser(description='Compares the compiled '
+                                             'Authoriser with AuthMap key '
+                                             'lookups')
+parser.add_argument('-n', help='Number of calls per case, the default is '
+                               '100000', action='store', type=int,
+                    default=100000)
+parser.add_argument('-r', help='Number of repeats, the best one is reported, '
+                               'the default is 5', action='store', type=int,
+                    default=5)
+
+
+def keyLookup(typ, field, actorRole, oldVal=None, newVal=None,
+              isActorOwnerOfSubject=None):
+    key = '_'.join([typ, field, normaliseAuthValue(oldVal),
+                    normaliseAuthValue(newVal)])
+    if key not in Authoriser.AuthMap:
+        key = '_'.join([typ, field, '<any>', '<any>'])
+        if key not in Authoriser.AuthMap:
+            return False, ''
+    roles = Authoriser.AuthMap[key]
+    if actorRole not in roles:
+        return False, ''
+    if len(roles[actorRole]) == 0:
+        return True, ''
+    r = OWNER in roles[actorRole] and isActorOwnerOfSubject
+    return r, ''
+
+
+CASES = [
+    ('NYM role', (NYM, ROLE, TRUSTEE, None, STEWARD, False)),
+    ('NYM verkey', (NYM, VERKEY, None, 'oldVerkey', 'newVerkey', True)),
+    ('NODE services', (NODE, SERVICES, STEWARD, [VALIDATOR], [], True)),
+    ('NODE node_ip', (NODE, NODE_IP, STEWARD, '10.0.0.1', '10.0.0.2', True)),
+    ('POOL_UPGRADE action', (POOL_UPGRADE, ACTION, TRUSTEE, None, START,
+                             False)),
+]
+
+
+def main(args):
+    print('{:<24}{:>12}{:>12}'.format('case', 'keys, s', 'compiled, s'))
+    for name, callArgs in CASES:
+        times = [min(timeit.repeat(lambda: f(*callArgs), number=args.n,
+                                   repeat=args.r))
+                 for f in (keyLookup, Authoriser.authorised)]
+        print('{:<24}{:>12.4f}{:>12.4f}'.format(name, *times))
+
+
+if __name__ == '__main__':
+    main(parser.parse_args())
@@ -71,6 +71,7 @@ setup(
              'scripts/reset_client',
              'scripts/start_indy_node',
              'scripts/start_node_control_tool',
+             'scripts/start_indy_read_replica',
              'scripts/clear_node.py',
              'scripts/get_keys',
              'scripts/generate_indy_pool_transactions',
@@ -88,6 +89,9 @@ setup(
              'scripts/restart_upgrade_agent.bat',
              'scripts/install_nssm.bat',
              'scripts/read_ledger',
+             'scripts/rebuild_domain_stores',
+             'scripts/regenerate_domain_state',
+             'scripts/domain_snapshot',
              'scripts/test_some_write_keys_others_read_them',
              'scripts/test_users_write_and_read_own_keys',
              'scripts/validator-info',